@@ -0,0 +1,69 @@
+import os, sys, argparse
+
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '..')
+sys.path.append( mymodule_dir )
+from core.config import *
+from core.build import Target, Builder
+
+# The aggregate figures as build targets (core/build.py): python aggregate_plots/build.py [target ...] rebuilds what changed
+# into FIGURES_DIR/{target}. Every target declares the run directories its script reads, keep them in line with the paths
+# the script builds when it changes.
+MININET = f"{HOME_DIR}/cctestbed/mininet"
+GAUNTLET = f"{HOME_DIR}/cctestbed/gauntlet"
+
+TARGETS = [
+    Target('header_lines', 'aggregate_plots/plot_header_lines.py'),
+    Target('header_markers', 'aggregate_plots/plot_header_markers.py'),
+    Target('header_combined_lines', 'aggregate_plots/plot_header_combined_lines.py'),
+    Target('figure2', 'aggregate_plots/figure2_sending_behaviour/plot.py',
+           runs=[f"{MININET}/results_fairness_intra_rtt/fifo/Dumbell_*_2flows_*/run*"]),
+    Target('figure4', 'aggregate_plots/figure4_fairness_intra_bw/plot.py',
+           runs=[f"{MININET}/results_fairness_bw_async/fifo/*/run*"]),
+    Target('figure5', 'aggregate_plots/figure5_intra_parking_lot/plot.py',
+           runs=[f"{MININET}/results_parking_lot/sfq/ParkingLot_*/run*"]),
+    Target('figure6', 'aggregate_plots/figure6_friendly_intra_rtt/plot.py',
+           runs=[f"{MININET}/results_friendly_intra_rtt_async/fifo/*/run*"]),
+    Target('figure7', 'aggregate_plots/figure7_friendly_goodput_evolution/plot.py',
+           runs=[f"{MININET}/results_friendly_intra_rtt_async/fifo/*/run*",
+                 f"{MININET}/results_friendly_intra_rtt_async_inverse/fifo/*/run*"]),
+    Target('figure8', 'aggregate_plots/figure8_cubic_flows/plot.py',
+           runs=[f"{MININET}/results_friendly_intra_rtt_flows/fifo/*/run*"]),
+    # the per-run tables once, the scatter plots redrawn from them
+    Target('figure9_tables', 'aggregate_plots/figure9_efficiency/tables.py',
+           runs=[f"{MININET}/results_fairness_aqm/fifo/Dumbell_*_4flows_*/run*"], outputs=['aqm_*.csv']),
+    Target('figure9', 'aggregate_plots/figure9_efficiency/plot.py',
+           deps=['figure9_tables'], args=['{figure9_tables}']),
+    Target('figure10', 'aggregate_plots/figure10_responsiveness_goodput_cdf/plot.py',
+           runs=[f"{MININET}/results_responsiveness_bw_rtt/fifo/*/run*", f"{MININET}/results_responsiveness_loss/fifo/*/run*"]),
+    Target('figure11', 'aggregate_plots/figure11_responsiveness_rate_evolution/plot.py',
+           runs=[f"{MININET}/results_responsiveness_bw_rtt/fifo/*/run*", f"{MININET}/results_responsiveness_loss/fifo/*/run*"]),
+    Target('figure12', 'aggregate_plots/figure12_convergence/plot.py',
+           runs=[f"{MININET}/results_fairness_aqm/fq_codel/Dumbell_*_4flows_*/run*"]),
+    Target('inter_rtt', 'aggregate_plots/inter_rtt/plot.py',
+           runs=[f"{MININET}/results_leo/inter_rtt/*/run*"]),
+    Target('intra_rtt', 'aggregate_plots/intra_rtt/plot.py',
+           runs=[f"{GAUNTLET}/results_fairness_inter_rtt/fifo/*/run*"]),
+    Target('responsiveness', 'aggregate_plots/responsiveness/plot.py',
+           runs=[f"{MININET}/results_leo/Dumbbell_*/run*"]),
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the aggregate figures whose scripts or runs changed.")
+    parser.add_argument('targets', nargs='*', help="targets to build, with their dependencies (default: all)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="targets built at once (default: FIGURE_JOBS, or one per core)")
+    parser.add_argument('-o', '--out', default=None, help="output directory (default: FIGURES_DIR)")
+    parser.add_argument('-f', '--force', action='store_true', help="rebuild even if up to date")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="only tell what is out of date")
+    parser.add_argument('-l', '--list', action='store_true', help="list the targets")
+    args = parser.parse_args()
+
+    if args.list:
+        for target in TARGETS:
+            print(f"{target.name}: {os.path.relpath(target.script, mymodule_dir)}" + (f" (after {', '.join(target.deps)})" if target.deps else ""))
+        sys.exit(0)
+    builder = Builder(TARGETS, out_dir=args.out, jobs=args.jobs)
+    status = builder.build(args.targets or None, force=args.force, dry_run=args.dry_run)
+    for name, result in status.items():
+        print(f"{name:24s}{result}")
+    sys.exit(1 if any(result in ('failed', 'skipped') for result in status.values()) else 0)
@@ -16,6 +16,9 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series
 
 def get_df(ROOT_PATH, PROTOCOLS, RUNS, BW, DELAY, QMULT):
     BDP_IN_BYTES = int(BW * (2 ** 20) * 2 * DELAY * (10 ** -3) / 8)
@@ -33,16 +36,8 @@ def get_df(ROOT_PATH, PROTOCOLS, RUNS, BW, DELAY, QMULT):
             bw_capacities = [x[-1][1] for x in bw_capacities]
             optimal_mean = sum(bw_capacities) / len(bw_capacities)
 
-            if os.path.exists(PATH + '/csvs/x1.csv'):
-                receiver = pd.read_csv(PATH + '/csvs/x1.csv').reset_index(drop=True)
-
-                receiver['time'] = receiver['time'].apply(lambda x: int(float(x)))
-
-                receiver = receiver[(receiver['time'] > start_time) & (receiver['time'] < end_time)]
-
-                receiver = receiver.drop_duplicates('time')
-
-                receiver = receiver.set_index('time')
+            if has_csv(PATH, "x1"):
+                receiver = bin_series(load_csv(PATH, "x1", time_range=(start_time - 1, end_time + 1)), start=start_time, end=end_time, inclusive='neither')
                 protocol_mean = receiver.mean()['bandwidth']
                 data.append([protocol, run, protocol_mean, optimal_mean])
 
@@ -15,6 +15,9 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series
 
 BW = 50
 DELAY = 50
@@ -47,12 +50,8 @@ for protocol in PROTOCOLS_EXTENSION:
     min_rtts = list(filter(lambda elem: elem[6] == 'netem', min_rtts))
     min_rtts = [x[-1][2] for x in min_rtts]
 
-    if os.path.exists(f"{PATH}/csvs/c1.csv"):
-        sender = pd.read_csv(f"{PATH}/csvs/c1.csv").reset_index(drop=True)
-        sender['time'] = sender['time'].apply(lambda x: int(float(x)))
-        sender = sender[(sender['time'] > start_time) & (sender['time'] < end_time)]
-        sender = sender.drop_duplicates('time')
-        sender = sender.set_index('time')
+    if has_csv(PATH, "c1"):
+        sender = bin_series(load_csv(PATH, "c1"), start=start_time, end=end_time, inclusive='neither')
         ax.plot(sender.index + 1, sender['bandwidth'], color=COLORS_EXTENSION[protocol], linewidth=LINEWIDTH, label=PROTOCOLS_FRIENDLY_NAMES[protocol])
 
 
@@ -90,12 +89,8 @@ for protocol in PROTOCOLS_EXTENSION:
     losses = list(filter(lambda elem: elem[6] == 'netem', losses))
     losses = [x[-1][-2] for x in losses]
 
-    if os.path.exists(f"{PATH}/csvs/c1.csv"):
-        sender = pd.read_csv(f"{PATH}/csvs/c1.csv").reset_index(drop=True)
-        sender['time'] = sender['time'].apply(lambda x: int(float(x)))
-        sender = sender[(sender['time'] > start_time) & (sender['time'] < end_time)]
-        sender = sender.drop_duplicates('time')
-        sender = sender.set_index('time')
+    if has_csv(PATH, "c1"):
+        sender = bin_series(load_csv(PATH, "c1"), start=start_time, end=end_time, inclusive='neither')
         ax.plot(sender.index + 1, sender['bandwidth'], color=COLORS_EXTENSION[protocol], linewidth=LINEWIDTH, label=PROTOCOLS_FRIENDLY_NAMES[protocol])
 
 ax.step(list(range(start_time, end_time + 1, 10)), bw_capacities, where='post', color='black', linewidth=0.5, label='Bandwidth', alpha=0.5)
@@ -9,6 +9,9 @@ mymodule_dir = os.path.join(script_dir, "../..")
 sys.path.append(mymodule_dir)
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series
 plt.style.use("science")
 plt.rcParams["text.usetex"] = True
 plt.rcParams["font.size"]   = 13
@@ -35,15 +38,10 @@ def get_goodput_data(bw, delay, qmult, runs, aqm, num_flows=4):
         for run in RUNS:
            PATH = f"{EXPERIMENT_PATH}/{aqm}/Dumbell_{bw}mbit_{delay}ms_{int(qmult * BDP_IN_PKTS)}pkts_0loss_{4}flows_22tcpbuf_{protocol}/run{run}"
            for n in range(4):
-              csv_path = f"{PATH}/csvs/x{n+1}.csv"
-              if os.path.exists(csv_path):
-                 receiver_total = pd.read_csv(csv_path).reset_index(drop=True)
-                 receiver_total = receiver_total[['time', 'bandwidth']]
-                 receiver_total['time'] = receiver_total['time'].apply(lambda x: int(float(x)))
+              if has_csv(PATH, f"x{n+1}"):
+                 receiver_total = load_csv(PATH, f"x{n+1}", columns=['time', 'bandwidth'], time_range=(start_time + n*25 - 1, end_time + n*25 + 1))
                  # Filter time range per flow
-                 receiver_total = receiver_total[(receiver_total['time'] >= (start_time + n*25)) & (receiver_total['time'] <= (end_time + n*25))]
-                 receiver_total = receiver_total.drop_duplicates('time')
-                 receiver_total = receiver_total.set_index('time')
+                 receiver_total = bin_series(receiver_total, start=start_time + n*25, end=end_time + n*25)
                  receivers[n+1].append(receiver_total)
               else:
                  print("Folder %s not found" % PATH)
@@ -23,12 +23,15 @@ mymodule_dir = os.path.join(script_dir, '../..')
 sys.path.append(mymodule_dir)
 from core.config import *
 from core.plotting import *
+from core.store import has_csv
+from core.cache import load_csv, cached_file
+from core.utils import open_raw
 COORD_KEYS = ('x1', 'y1', 'x2', 'y2')
 plt.rcParams['ytick.labelsize'] = 7
 
 
 def load_pacing(path):
-    with open(path, 'r') as f:
+    with open_raw(path) as f:
         lines = f.read().splitlines()
 
     df = pd.DataFrame({'raw': lines})
@@ -115,18 +118,18 @@ def plot_one(QMULT, RUN):
     for protocol in PROTOCOLS_EXTENSION:
         PATH = f"{ROOT_PATH}/Dumbell_{BW}mbit_{DELAY}ms_{int(mult * BDP_IN_PKTS)}pkts_0loss_2flows_22tcpbuf_{protocol}/run{RUN}" 
         if protocol != 'vivace-uspace' and protocol != 'bbr3':
-            p1 = f"{PATH}/csvs/c1_ss.csv" if os.path.exists(f"{PATH}/csvs/c1_ss.csv") else f"{PATH}/csvs/c1.csv"
-            p2 = f"{PATH}/csvs/c2_ss.csv" if os.path.exists(f"{PATH}/csvs/c2_ss.csv") else f"{PATH}/csvs/c2.csv"
+            n1 = "c1_ss" if has_csv(PATH, "c1_ss") else "c1"
+            n2 = "c2_ss" if has_csv(PATH, "c2_ss") else "c2"
 
-            sender1 = pd.read_csv(p1, usecols=['time','cwnd'])
-            sender2 = pd.read_csv(p2, usecols=['time','cwnd'])
+            sender1 = load_csv(PATH, n1, columns=['time','cwnd'])
+            sender2 = load_csv(PATH, n2, columns=['time','cwnd'])
 
             sender1['time'] = sender1['time'].astype(float)
             sender2['time'] = sender2['time'].astype(float)
         else:
-            if os.path.exists(f"{PATH}/csvs/c1.csv") and os.path.exists(f"{PATH}/csvs/c2.csv"):
-                sender1 = pd.read_csv(f"{PATH}/csvs/c1.csv").reset_index(drop=True) if protocol == 'vivace-uspace' else load_pacing(f"{PATH}/c1_ss.csv").reset_index(drop=True)
-                sender2 = pd.read_csv(f"{PATH}/csvs/c2.csv").reset_index(drop=True) if protocol == 'vivace-uspace' else load_pacing(f"{PATH}/c2_ss.csv").reset_index(drop=True)
+            if has_csv(PATH, "c1") and has_csv(PATH, "c2"):
+                sender1 = load_csv(PATH, "c1").reset_index(drop=True) if protocol == 'vivace-uspace' else cached_file(load_pacing, f"{PATH}/c1_ss.csv").reset_index(drop=True)
+                sender2 = load_csv(PATH, "c2").reset_index(drop=True) if protocol == 'vivace-uspace' else cached_file(load_pacing, f"{PATH}/c2_ss.csv").reset_index(drop=True)
 
                 sender1 = sender1[['time', 'bandwidth']]
                 sender2 = sender2[['time', 'bandwidth']]
@@ -13,6 +13,9 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series, align
 
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/mininet/results_fairness_bw_async/fifo" 
 BWS = [10,20,30,40,50,60,70,80,90,100]
@@ -28,7 +31,6 @@ for mult in QMULTS:
         for delay in DELAYS:
            start_time = 25
            end_time = 100
-           keep_last_seconds = 25
 
            BDP_IN_BYTES = int(bw * (2 ** 20) * 2 * delay * (10 ** -3) / 8)
            BDP_IN_PKTS = BDP_IN_BYTES / 1500
@@ -36,25 +38,12 @@ for mult in QMULTS:
            goodput_ratios_total = []
            for run in RUNS:
                PATH = f"{EXPERIMENT_PATH}/Dumbell_{bw}mbit_{delay}ms_{int(mult * BDP_IN_PKTS)}pkts_0loss_2flows_22tcpbuf_{protocol}/run{run}" 
-               if os.path.exists(f"{PATH}/csvs/x1.csv") and os.path.exists(f"{PATH}/csvs/x2.csv"):
-                  receiver1_total = pd.read_csv(f"{PATH}/csvs/x1.csv").reset_index(drop=True)
-                  receiver2_total = pd.read_csv(f"{PATH}/csvs/x2.csv").reset_index(drop=True)
-                  receiver1_total['time'] = receiver1_total['time'].apply(lambda x: int(float(x)))
-                  receiver2_total['time'] = receiver2_total['time'].apply(lambda x: int(float(x)))
+               if has_csv(PATH, "x1") and has_csv(PATH, "x2"):
+                  # first sample of every whole second strictly inside (start_time, end_time)
+                  receiver1_total = bin_series(load_csv(PATH, "x1", time_range=(start_time - 1, end_time + 1)), start=start_time, end=end_time, inclusive='neither')
+                  receiver2_total = bin_series(load_csv(PATH, "x2", time_range=(start_time - 1, end_time + 1)), start=start_time, end=end_time, inclusive='neither')
 
-                  receiver1_total = receiver1_total[(receiver1_total['time'] > start_time) & (receiver1_total['time'] < end_time)]
-                  receiver2_total = receiver2_total[(receiver2_total['time'] > start_time) & (receiver2_total['time'] < end_time)]
-
-                  receiver1_total = receiver1_total.drop_duplicates('time')
-                  receiver2_total = receiver2_total.drop_duplicates('time')
-
-                  receiver1 = receiver1_total[receiver1_total['time'] >= end_time - keep_last_seconds].reset_index(drop=True)
-                  receiver2 = receiver2_total[receiver2_total['time'] >= end_time - keep_last_seconds].reset_index(drop=True)
-
-                  receiver1_total = receiver1_total.set_index('time')
-                  receiver2_total = receiver2_total.set_index('time')
-
-                  total = receiver1_total.join(receiver2_total, how='inner', lsuffix='1', rsuffix='2')[['bandwidth1', 'bandwidth2']]
+                  total = align({'bandwidth1': receiver1_total['bandwidth'], 'bandwidth2': receiver2_total['bandwidth']})
                   goodput_ratios_total.append(total.min(axis=1)/total.max(axis=1))
                else:
                   print(f"Folder {PATH} not found.")
@@ -14,6 +14,9 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series
 
 ROOT_PATH = f"{HOME_DIR}/cctestbed/mininet/results_parking_lot/sfq" 
 BWS = [100]
@@ -43,25 +46,14 @@ for mult in QMULTS:
                 goodput_ratios_total_tmp = []
                 for run in RUNS:
                     PATH = f"{ROOT_PATH}/ParkingLot_{bw}mbit_{delay}ms_{int(mult * BDP_IN_PKTS)}pkts_0loss_{FLOWS}flows_22tcpbuf_{protocol}/run{run}"
-                    receiver_file_spine = f"{PATH}/csvs/x1.csv"
-                    receiver_files_ribs = [f"{PATH}/csvs/x{i}.csv" for i in range(2, FLOWS + 1)]
-                    if all(os.path.exists(f) for f in receiver_files_ribs) and os.path.exists(receiver_file_spine):
-                        receivers_ribs_unprocessed = [pd.read_csv(f).reset_index(drop=True) for f in receiver_files_ribs]
-                        receiver_spine = pd.read_csv(receiver_file_spine).reset_index(drop=True)
+                    receiver_file_spine = "x1"
+                    receiver_files_ribs = [f"x{i}" for i in range(2, FLOWS + 1)]
+                    if all(has_csv(PATH, f) for f in receiver_files_ribs) and has_csv(PATH, receiver_file_spine):
+                        receivers_ribs_unprocessed = [load_csv(PATH, f, time_range=(start_time - 1, end_time + 1)).reset_index(drop=True) for f in receiver_files_ribs]
+                        receiver_spine = load_csv(PATH, receiver_file_spine, time_range=(start_time - 1, end_time + 1)).reset_index(drop=True)
                         
-                        receiver_spine['time'] = receiver_spine['time'].apply(lambda x: int(float(x)))
-                        receiver_spine = receiver_spine[(receiver_spine['time'] >= start_time)]
-                        receiver_spine = receiver_spine[(receiver_spine['time'] < end_time)].reset_index(drop=True)   
-                        receiver_spine = receiver_spine.drop_duplicates('time')
-                        receiver_spine = receiver_spine.set_index('time')
-                        receivers_ribs = []
-                        for rib in receivers_ribs_unprocessed:
-                            rib['time'] = rib['time'].apply(lambda x: int(float(x)))
-                            rib = rib[(rib['time'] >= start_time)]
-                            rib = rib[(rib['time'] < end_time)]
-                            rib = rib.drop_duplicates('time')
-                            rib = rib.set_index('time')
-                            receivers_ribs.append(rib)
+                        receiver_spine = bin_series(receiver_spine, start=start_time, end=end_time, inclusive='left')
+                        receivers_ribs = [bin_series(rib, start=start_time, end=end_time, inclusive='left') for rib in receivers_ribs_unprocessed]
 
                         
                         combined_ribs = pd.concat([rib['bandwidth'] for rib in receivers_ribs], axis=1, keys=[f'Rib{i+1}' for i in range(len(receivers_ribs))])
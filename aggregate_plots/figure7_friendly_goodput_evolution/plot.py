@@ -12,6 +12,9 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series
 
 
 
@@ -127,22 +130,18 @@ if __name__ == "__main__":
                   for run in RUNS:
                      PATH = f"{ROOT_PATH}/Dumbell_{BW}mbit_{DELAY}ms_{int(mult * BDP_IN_PKTS)}pkts_0loss_{FLOWS}flows_22tcpbuf_{protocol}/run{run}" 
                      for n in range(FLOWS):
-                        if os.path.exists(f"{PATH}/csvs/c{(n+1)}.csv"):
-                           sender = pd.read_csv(f"{PATH}/csvs/c{(n+1)}.csv")
+                        if has_csv(PATH, f"c{(n+1)}"):
+                           sender = load_csv(PATH, f"c{(n+1)}")
                            senders[n+1].append(sender)
                         else:
                            prin = f"{PATH}/csvs/c{(n+1)}.csv"
                            print(f"Folder not {prin} found")
 
-                        if os.path.exists(f"{PATH}/csvs/x{(n+1)}.csv"):
-                           receiver_total = pd.read_csv(f"{PATH}/csvs/x{(n+1)}.csv").reset_index(drop=True)
+                        if has_csv(PATH, f"x{(n+1)}"):
+                           receiver_total = load_csv(PATH, f"x{(n+1)}").reset_index(drop=True)
                            receiver_total = receiver_total[['time', 'bandwidth']]
-                           receiver_total['time'] = receiver_total['time'].apply(lambda x: int(float(x)))
                            receiver_total['bandwidth'] = receiver_total['bandwidth'].ewm(alpha=0.5).mean()
-
-                           receiver_total = receiver_total[(receiver_total['time'] >= (start_time)) & (receiver_total['time'] <= (end_time))]
-                           receiver_total = receiver_total.drop_duplicates('time')
-                           receiver_total = receiver_total.set_index('time')
+                           receiver_total = bin_series(receiver_total, start=start_time, end=end_time)
                            receivers[n+1].append(receiver_total)
                         else:
                            print("Folder not found")
@@ -13,6 +13,9 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.store import has_csv
+from core.cache import load_csv
+from core.resample import bin_series, align
 sys.dont_write_bytecode = True
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/mininet/results_friendly_intra_rtt_flows/fifo" 
 PROTOCOLS_EXTENSION = ['orca', 'sage', 'astraea', 'vivace-uspace', 'bbr3' ]
@@ -35,22 +38,16 @@ for mult in QMULTS:
                 delay_ratios_total = []
                 for run in RUNS:
                     PATH = f"{EXPERIMENT_PATH}/Dumbell_{bw}mbit_{DELAY}ms_{int(mult * BDP_IN_PKTS)}pkts_0loss_{flows}flows_22tcpbuf_{protocol}/run{run}" 
-                    csvs = [f"{PATH}/csvs/x{i}.csv" for i in range(1, flows+1)]
-                    if not all(os.path.exists(p) for p in csvs):
+                    csvs = [f"x{i}" for i in range(1, flows+1)]
+                    if not all(has_csv(PATH, name) for name in csvs):
                         print(f"Missing CSVs in {PATH}, skipping")
                         continue
                     # load each flow into a DataFrame, index by time
                     dfs = {}
-                    for i, path in enumerate(csvs, start=1):
-                        df = pd.read_csv(path)
-                        df['time'] = df['time'].astype(float).astype(int)
-                        df = (
-                            df[(df.time > start_time) & (df.time < end_time)]
-                            .drop_duplicates('time')
-                            .set_index('time')
-                        )
+                    for i, name in enumerate(csvs, start=1):
+                        df = bin_series(load_csv(PATH, name, time_range=(start_time - 1, end_time + 1)), start=start_time, end=end_time, inclusive='neither')
                         dfs[f"bw{i}"] = df.bandwidth
-                    total = pd.concat(dfs, axis=1, join='inner')
+                    total = align(dfs)
                     total = total[(total > 0).any(axis=1)]  # drop all-zero rows
 
                     # compute avg of flows 2…FLOWS
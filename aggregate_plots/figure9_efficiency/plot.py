@@ -18,6 +18,7 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from tables import write_tables, DELAYS
 
 def confidence_ellipse(x, y, ax, n_std=1.0, facecolor='none', **kwargs):
     if x.size != y.size:
@@ -38,164 +39,6 @@ def confidence_ellipse(x, y, ax, n_std=1.0, facecolor='none', **kwargs):
     ellipse.set_transform(transf + ax.transData)
     return ax.add_patch(ellipse)
 
-def data_to_df(folder, delays, bandwidths, qmults, aqms, protocols):
-    data=[]
-    efficiency_fairness_data = []
-    start_time = 0
-    end_time = 100
-    for aqm in aqms:
-        for qmult in qmults:
-            for delay in delays:
-                for BW in bandwidths:
-                    for protocol in protocols:
-                        BDP_IN_BYTES = int(BW * (2 ** 20) * 2 * delay * (10 ** -3) / 8)
-                        BDP_IN_PKTS = BDP_IN_BYTES / 1500
-                        for run in RUNS:
-                            PATH = folder + f"/{aqm}/Dumbell_{BW}mbit_{delay}ms_{int(qmult * BDP_IN_PKTS)}pkts_0loss_{4}flows_22tcpbuf_{protocol}/run{run}" 
-                            flows = []
-                            retr_flows = []
-                            delay_flows = []
-                            for n in range(4):
-                                if os.path.exists(f"{PATH}/csvs/x{(n + 1)}.csv"):
-                                    receiver_total = pd.read_csv(f"{PATH}/csvs/x{(n + 1)}.csv").reset_index(drop=True)
-                                    receiver_total = receiver_total[['time', 'bandwidth']]
-                                    receiver_total['time'] = receiver_total['time'].apply(lambda x: int(float(x)))
-
-                                    receiver_total = receiver_total[(receiver_total['time'] >= (start_time + n * 25)) & (
-                                                receiver_total['time'] <= (end_time + n * 25))]
-                                    receiver_total = receiver_total.drop_duplicates('time')
-                                    receiver_total = receiver_total.set_index('time')
-                                    flows.append(receiver_total)
-                                    bandwidth_mean = receiver_total.mean().values[0]
-                                    bandwidth_std = receiver_total.std().values[0]
-                                else:
-                                    print(f"Folder {PATH} not found")
-                                    receiver_total = None
-                                    bandwidth_mean = None
-                                    bandwidth_std = None
-
-                                if protocol == 'vivace-uspace' or protocol == 'astraea':
-                                    sender = pd.read_csv(f"{PATH}/csvs/c{(n + 1)}.csv")
-                                else:
-                                    sender = pd.read_csv(f"{PATH}/csvs/c{(n + 1)}_ss.csv")
-                                sender = sender[['time', 'srtt']]
-                                sender = sender[(sender['time'] >= (start_time + n * 25)) & (sender['time'] <= (end_time + n * 25))]
-
-                                # We need to resample this data to 1 Hz frequency: Truncate time value to seconds, groupby.mean()
-                                sender['time'] = sender['time'].apply(lambda x: int(x))
-                                sender = sender.groupby('time').mean()
-                                if len(sender) > 0:
-                                    delay_flows.append(sender)
-                                delay_mean = sender.mean().values[0]
-                                delay_std = sender.std().values[0]
-                        
-
-                                if os.path.exists(f"{PATH}/sysstat/etcp_c{(n + 1)}.log") and protocol != 'vivace-uspace':
-                                    systat = pd.read_csv(f"{PATH}/sysstat/etcp_c{(n + 1)}.log", sep=';').rename(
-                                        columns={"# hostname": "hostname"})
-                                    retr = systat[['timestamp', 'retrans/s']]
-
-                                    if n == 0:
-                                        start_timestamp = retr['timestamp'].iloc[0]
-
-                                    retr.loc[:, 'timestamp'] = retr['timestamp'] - start_timestamp + 1
-
-                                    retr = retr.rename(columns={'timestamp': 'time'})
-                                    retr['time'] = retr['time'].apply(lambda x: int(float(x)))
-                                    retr = retr[(retr['time'] >= (start_time + n * 25)) & (
-                                                retr['time'] <= (end_time + n * 25))]
-                                    retr = retr.drop_duplicates('time')
-
-                                    retr = retr.set_index('time')
-                                    retr_flows.append(retr*1500*8/(1024*1024))
-                                    retr_mean = retr.mean().values[0]
-                                    retr_std = retr.std().values[0]
-                                if os.path.exists(f"{PATH}/csvs/c{(n + 1)}.csv") and protocol == 'vivace-uspace':
-                                    systat = pd.read_csv(f"{PATH}/csvs/c{(n + 1)}.csv").rename(
-                                        columns={"retr": "retrans/s"})
-                                    retr = systat[['time', 'retrans/s']]
-                                    retr['time'] = retr['time'].apply(lambda x: int(float(x)))
-                                    retr = retr[
-                                        (retr['time'] >= (start_time + n * 25)) & (retr['time'] <= (end_time + n * 25))]
-                                    retr = retr.drop_duplicates('time')
-                                    retr = retr.set_index('time')
-                                    retr_flows.append(retr*1500*8/(1024*1024))
-                                    retr_mean = retr.mean().values[0]
-                                    retr_std = retr.std().values[0]
-                               
-                                if os.path.exists(PATH + '/sysstat/dev_root.log'):
-                                    systat = pd.read_csv(PATH + '/sysstat/dev_root.log', sep=';').rename(
-                                        columns={"# hostname": "hostname"})
-                                    util = systat[['timestamp', 'IFACE', 'txkB/s', '%ifutil']]
-
-                                    start_timestamp = util['timestamp'].iloc[0]
-
-                                    #util['timestamp'] = util['timestamp'] - start_timestamp + 1
-                                    util.loc[:, 'timestamp'] = util['timestamp'] - start_timestamp + 1
-
-
-                                    util = util.rename(columns={'timestamp': 'time'})
-                                    util['time'] = util['time'].apply(lambda x: int(float(x)))
-                                    util = util[(util['time'] >= (start_time)) & (util['time'] < (end_time))]
-                                    util_if = util[util['IFACE'] == "s2-eth2"]
-                                    util_if = util_if[['time', 'txkB/s']]
-                                    util_if = util_if.set_index('time')
-                                    util_mean = util_if.mean().values[0]*8/1024
-                                    util_std = util_if.std().values[0]*8/1024
-                                else:
-                                    util_mean = None
-                                    util_std = None
-
-
-                                data_point = [aqm, qmult, delay, BW, protocol, run, n, bandwidth_mean, bandwidth_std, delay_mean, delay_std, retr_mean, retr_std, util_mean, util_std]
-                                data.append(data_point)
-
-                            if len(flows) > 0:
-                                if os.path.exists(f"{PATH}/sysstat/dev_root.log"):
-                                    systat = pd.read_csv(f"{PATH}/sysstat/dev_root.log", sep=';').rename(
-                                        columns={"# hostname": "hostname"})
-                                    util = systat[['timestamp', 'IFACE', 'txkB/s', '%ifutil']]
-
-                                    start_timestamp = util['timestamp'].iloc[0]
-
-                                    util.loc[:, 'timestamp'] = util['timestamp'] - start_timestamp + 1
-
-                                    util = util.rename(columns={'timestamp': 'time'})
-                                    util['time'] = util['time'].apply(lambda x: int(float(x)))
-                                    util = util[(util['time'] >= (start_time)) & (util['time'] < (end_time))]
-                                    util_if = util[util['IFACE'] == "s2-eth2"]
-                                    util_if = util_if[['time', 'txkB/s']]
-                                    util_if = util_if.set_index('time')
-                                    util_mean = util_if.mean().values[0] * 8 / 1024
-                                    util_std = util_if.std().values[0] * 8 / 1024
-                                else:
-                                    util_mean = None
-                                    util_std = None
-
-                                #df_merged = reduce(lambda left, right: pd.merge(left, right, on=['time'],how='inner'), flows)
-                                df_merged = pd.concat(flows).reset_index(drop=True)     
-                                df_merged_sum = df_merged.sum(axis=1)
-                                df_merged_ratio = df_merged.min(axis=1) / df_merged.max(axis=1)
-
-                                #df_retr_merged = reduce(lambda left, right: pd.merge(left, right, on=['time'],how='inner'), retr_flows)
-
-                                df_retr_merged = pd.concat(retr_flows).reset_index(drop=True)
-                                df_retr_merged_sum = df_retr_merged.sum(axis=1)
-                                #df_delay_merged = reduce(lambda left, right: pd.merge(left, right, on=['time'],how='inner'), delay_flows)
-                                df_delay_merged = pd.concat(delay_flows).reset_index(drop=True)  
-                                df_delay_merged_mean = df_delay_merged.mean(axis=1)
-
-                                efficiency_metric1 = (df_merged_sum/BW) / (
-                                            df_delay_merged_mean / (2 * delay))
-                                efficiency_metric2 = (df_merged_sum/BW - df_retr_merged_sum/BW)/(df_delay_merged_mean/(2*delay))
-
-                                efficiency_fairness_data.append([aqm, qmult, delay, BW, protocol, run, df_delay_merged_mean.mean(), df_merged_sum.mean(),df_merged_sum.std(),df_merged_ratio.mean(),df_merged_ratio.std(),df_retr_merged_sum.mean(),df_retr_merged_sum.std(), efficiency_metric1.mean(), efficiency_metric1.std(), efficiency_metric2.mean(), efficiency_metric2.std(), util_mean, util_std])
-
-    COLUMNS1 = ['aqm', 'qmult', 'min_delay', 'bandwidth', 'protocol', 'run', 'flow','goodput_mean', 'goodput_std', 'delay_mean', 'delay_std', 'retr_mean', 'retr_std', 'util_mean', 'util_std']
-    COLUMNS2 = ['aqm', 'qmult', 'min_delay', 'bandwidth', 'protocol', 'run', 'delay_mean' ,'efficiency_mean','efficiency_std', 'fairness_mean', 'fairness_std', 'retr_mean', 'retr_std', 'efficiency1_mean', 'efficiency1_std', 'efficiency2_mean', 'efficiency2_std', 'util_mean', 'util_std']
-    return pd.DataFrame(data,columns=COLUMNS1), pd.DataFrame(efficiency_fairness_data,columns=COLUMNS2),
-
-
 def plot_data(data, filename, ylim=None):
     LINEWIDTH = 1
     fig, axes = plt.subplots(nrows=3, ncols=1, figsize=(4, 3), sharex=True, sharey=True)
@@ -229,22 +72,20 @@ def plot_data(data, filename, ylim=None):
 
 
 if __name__ == "__main__":
-    EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/mininet/results_fairness_aqm"
-    DELAYS = [10, 100]
-    RUNS = [1, 2, 3, 4, 5]
-    
+    # the per-run tables come from tables.py: built here, or already built into the directory given (aggregate_plots/build.py)
+    if len(sys.argv) > 1:
+        TABLES_DIR = sys.argv[1]
+    else:
+        TABLES_DIR = '.'
+        write_tables(TABLES_DIR)
+
     MARKER_MAP = {10: '^',
                  100: '*'}
     proto_handles = [
         Line2D([], [], color=COLORS_EXTENSION[p], linewidth=1) for p in PROTOCOLS_EXTENSION
     ]
     proto_labels = [PROTOCOLS_FRIENDLY_NAMES[p] for p in PROTOCOLS_EXTENSION]
-    #AQM_LIST = ['fifo', 'codel', 'fq']
-    AQM_LIST = ['fifo']
-    df1,df2 = data_to_df(EXPERIMENT_PATH, DELAYS, [100], QMULTS, AQM_LIST, PROTOCOLS_EXTENSION)
-    df1.to_csv('aqm_data.csv', index=False)
-    df2.to_csv('aqm_efficiency_fairness.csv', index=False)
-    df = pd.read_csv('aqm_efficiency_fairness.csv', index_col=None).dropna()
+    df = pd.read_csv(f"{TABLES_DIR}/aqm_efficiency_fairness.csv", index_col=None).dropna()
     df = df[df['aqm'] == 'fifo']
     df['aqm'] = pd.to_numeric(df['aqm'], errors='coerce')
     data = df.groupby(['min_delay','qmult','protocol']).mean()
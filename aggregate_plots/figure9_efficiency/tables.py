@@ -0,0 +1,60 @@
+import pandas as pd
+import os, sys
+
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '../..')
+sys.path.append( mymodule_dir )
+from core.config import *
+from core.metrics import run_summary
+
+# Intermediate tables of figure 9, their own target in aggregate_plots/build.py so the scatter plots are redrawn without
+# going back to the runs: aqm_data.csv (per flow) and aqm_efficiency_fairness.csv (per run)
+EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/mininet/results_fairness_aqm"
+DELAYS = [10, 100]
+RUNS = [1, 2, 3, 4, 5]
+#AQM_LIST = ['fifo', 'codel', 'fq']
+AQM_LIST = ['fifo']
+TABLES = ('aqm_data.csv', 'aqm_efficiency_fairness.csv')
+UTIL_WINDOW = (0, 100)
+
+def data_to_df(folder, delays, bandwidths, qmults, aqms, protocols):
+    # per-flow and per-run metrics of core/metrics.py. Flows are measured over their active interval [25n, 25n + 100), the
+    # window this figure always cut, the bottleneck utilisation over the first UTIL_WINDOW seconds as it always was. Computed
+    # with this figure's bw/RTT/interface, so the summary.json process_raw_outputs keeps is read, never written
+    data=[]
+    efficiency_fairness_data = []
+    for aqm in aqms:
+        for qmult in qmults:
+            for delay in delays:
+                for BW in bandwidths:
+                    for protocol in protocols:
+                        BDP_IN_BYTES = int(BW * (2 ** 20) * 2 * delay * (10 ** -3) / 8)
+                        BDP_IN_PKTS = BDP_IN_BYTES / 1500
+                        for run in RUNS:
+                            PATH = folder + f"/{aqm}/Dumbell_{BW}mbit_{delay}ms_{int(qmult * BDP_IN_PKTS)}pkts_0loss_{4}flows_22tcpbuf_{protocol}/run{run}" 
+                            try:
+                                summary = run_summary(PATH, bw=BW, base_rtt=2 * delay, iface='s2-eth2', util_window=UTIL_WINDOW, write=False)
+                            except (OSError, ValueError, KeyError):
+                                print(f"Folder {PATH} not found")
+                                continue
+                            total = summary['run']
+                            for n in range(4):
+                                flow = summary['flows'].get(f"c{(n + 1)}", {})
+                                data_point = [aqm, qmult, delay, BW, protocol, run, n, flow.get('goodput_mean'), flow.get('goodput_std'), flow.get('rtt_mean'), flow.get('rtt_std'), flow.get('retr_mean'), flow.get('retr_std'), total.get('util_mean'), total.get('util_std')]
+                                data.append(data_point)
+
+                            if summary['flows']:
+                                efficiency_fairness_data.append([aqm, qmult, delay, BW, protocol, run, total.get('rtt_mean'), total.get('goodput_mean'), total.get('goodput_std'), total.get('fairness_mean'), total.get('fairness_std'), total.get('retr_mean'), total.get('retr_std'), total.get('efficiency1_mean'), total.get('efficiency1_std'), total.get('efficiency2_mean'), total.get('efficiency2_std'), total.get('util_mean'), total.get('util_std')])
+
+    COLUMNS1 = ['aqm', 'qmult', 'min_delay', 'bandwidth', 'protocol', 'run', 'flow','goodput_mean', 'goodput_std', 'delay_mean', 'delay_std', 'retr_mean', 'retr_std', 'util_mean', 'util_std']
+    COLUMNS2 = ['aqm', 'qmult', 'min_delay', 'bandwidth', 'protocol', 'run', 'delay_mean' ,'efficiency_mean','efficiency_std', 'fairness_mean', 'fairness_std', 'retr_mean', 'retr_std', 'efficiency1_mean', 'efficiency1_std', 'efficiency2_mean', 'efficiency2_std', 'util_mean', 'util_std']
+    return pd.DataFrame(data,columns=COLUMNS1), pd.DataFrame(efficiency_fairness_data,columns=COLUMNS2),
+
+
+def write_tables(out_dir='.'):
+    df1,df2 = data_to_df(EXPERIMENT_PATH, DELAYS, [100], QMULTS, AQM_LIST, PROTOCOLS_EXTENSION)
+    for df, name in zip((df1, df2), TABLES):
+        df.to_csv(f"{out_dir}/{name}", index=False)
+
+if __name__ == "__main__":
+    write_tables(sys.argv[1] if len(sys.argv) > 1 else '.')
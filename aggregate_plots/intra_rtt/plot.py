@@ -12,6 +12,8 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.cache import read_csv
+from core.resample import bin_series, align
 
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/gauntlet/results_fairness_inter_rtt/fifo" 
 
@@ -39,24 +41,14 @@ for mult in QMULTS:
                     if x1_file and x2_file:
                         x1_path = x1_file[0]
                         x2_path = x2_file[0]
-                        receiver1_total = pd.read_csv(x1_path).reset_index(drop=True)
-                        receiver2_total = pd.read_csv(x2_path).reset_index(drop=True)
-
-                        receiver1_total['time'] = receiver1_total['time'].apply(lambda x: int(float(x)))
-                        receiver2_total['time'] = receiver2_total['time'].apply(lambda x: int(float(x)))
+                        receiver1_total = read_csv(x1_path).reset_index(drop=True)
+                        receiver2_total = read_csv(x2_path).reset_index(drop=True)
 
                         print(receiver2_total)
-                        receiver1_total = receiver1_total[(receiver1_total['time'] > start_time) & (receiver1_total['time'] < end_time)]
-                        receiver2_total = receiver2_total[(receiver2_total['time'] > start_time) & (receiver2_total['time'] < end_time)]
-
-                        receiver1_total = receiver1_total.drop_duplicates('time')
-                        receiver2_total = receiver2_total.drop_duplicates('time')
-
-
-                        receiver1_total = receiver1_total.set_index('time')
-                        receiver2_total = receiver2_total.set_index('time')
+                        receiver1_total = bin_series(receiver1_total, start=start_time, end=end_time, inclusive='neither')
+                        receiver2_total = bin_series(receiver2_total, start=start_time, end=end_time, inclusive='neither')
 
-                        total = receiver1_total.join(receiver2_total, how='inner', lsuffix='1', rsuffix='2')[['bandwidth1', 'bandwidth2']]
+                        total = align({'bandwidth1': receiver1_total['bandwidth'], 'bandwidth2': receiver2_total['bandwidth']})
                         total = total[(total['bandwidth1'] > 0) | (total['bandwidth2'] > 0)] # if one datapoint contains a nan from the divide by 0, the enire datapoint will not be plotted.
                         
                         goodput_ratios_total.append(total.min(axis=1)/total.max(axis=1))
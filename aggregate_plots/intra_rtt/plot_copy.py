@@ -18,6 +18,8 @@ sys.path.append(mymodule_dir)
 
 from core.config import *      # PROTOCOLS_EXTENSION, PROTOCOLS_MARKERS_EXTENSION, COLORS_EXTENSION, PROTOCOLS_FRIENDLY_NAMES, HOME_DIR, etc.
 from core.plotting import *    # plot_points
+from core.cache import read_csv
+from core.resample import bin_series
 
 # --------- Experiment configuration ---------
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/gauntlet/results_fairness_intra_rtt/fifo"
@@ -75,28 +77,16 @@ def load_goodput_and_rtt_ratios_for_run(csv_dir: str, protocol: str, delay_ms: i
     c2_path = c2_files[0]
 
     # --- load ---
-    r1g = pd.read_csv(x1_path).reset_index(drop=True)
-    r2g = pd.read_csv(x2_path).reset_index(drop=True)
-    r1s = pd.read_csv(c1_path).reset_index(drop=True)
-    r2s = pd.read_csv(c2_path).reset_index(drop=True)
+    r1g = read_csv(x1_path).reset_index(drop=True)
+    r2g = read_csv(x2_path).reset_index(drop=True)
+    r1s = read_csv(c1_path).reset_index(drop=True)
+    r2s = read_csv(c2_path).reset_index(drop=True)
 
-    # integer-second time
-    for df in (r1g, r2g, r1s, r2s):
-        df['time'] = df['time'].apply(lambda x: int(float(x)))
-
-    # steady-state window (matches your new script)
+    # steady-state window (matches your new script), first sample of every whole second
     start_time = 3 * delay_ms
     end_time   = 4 * delay_ms - 1
 
-    def window(df):
-        return (df[(df['time'] > start_time) & (df['time'] <= end_time)]
-                .drop_duplicates('time')
-                .set_index('time'))
-
-    r1g = window(r1g)
-    r2g = window(r2g)
-    r1s = window(r1s)
-    r2s = window(r2s)
+    r1g, r2g, r1s, r2s = (bin_series(df, start=start_time, end=end_time, inclusive='right') for df in (r1g, r2g, r1s, r2s))
 
     # align common times
     times = r1g.index.intersection(r2g.index).intersection(r1s.index).intersection(r2s.index)
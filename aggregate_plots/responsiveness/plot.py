@@ -16,6 +16,8 @@ mymodule_dir = os.path.join( script_dir, '../..')
 sys.path.append( mymodule_dir )
 from core.config import *
 from core.plotting import * 
+from core.cache import read_csv
+from core.resample import bin_series
 
 def get_df(ROOT_PATH, PROTOCOLS, RUNS, BW, DELAY, QMULT):
     BDP_IN_BYTES = int(BW * (2 ** 20) * 2 * DELAY * (10 ** -3) / 8)
@@ -51,12 +53,7 @@ def get_df(ROOT_PATH, PROTOCOLS, RUNS, BW, DELAY, QMULT):
                 else:
                     csv_file = candidates[0]
 
-                receiver = pd.read_csv(csv_file).reset_index(drop=True)
-
-                receiver["time"] = receiver["time"].apply(lambda x: int(float(x)))
-                receiver = receiver[(receiver["time"] > start_time) & (receiver["time"] < end_time)]
-                receiver = receiver.drop_duplicates("time")
-                receiver = receiver.set_index("time")
+                receiver = bin_series(read_csv(csv_file), start=start_time, end=end_time, inclusive='neither')
 
                 protocol_mean = receiver.mean()["bandwidth"]
                 data.append([protocol, run, protocol_mean, optimal_mean])
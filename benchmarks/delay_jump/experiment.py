@@ -36,6 +36,8 @@ RUNS = list(range(1, len(STEPS) + 1))
 
 DURATION = 50
 MAX_JOBS = 5
+# per-ACK cwnd/rtt from the tcp:tcp_probe tracepoint, flows are told apart by address so only with MAX_JOBS = 1
+TCP_PROBE = False
 RESULT_PATH = "cctestbed/benchmarks/resutls_delay_jump_threading"
 
 _run_id_lock = threading.Lock()
@@ -72,6 +74,8 @@ def run_threeading_step_delay(topology: str, protocol: str, params, bw: int, del
     em.configure_network()
     em.configure_traffic()
     #em.set_monitors([f"s1{params['ex_idx']}-eth1", f"s2{params['ex_idx']}-eth2", 'sysstat'])
+    if TCP_PROBE:
+        em.set_tcp_probe()
     em.run()
     em.dump_info()
     with _mn_clean_lock:
@@ -104,6 +108,8 @@ if __name__ == '__main__':
                             jobs.append((protocol, bw, bw, delay, delay2, qmult, run))
 
     random.shuffle(jobs)
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(_worker, *job) for job in jobs]
         for fut in as_completed(futures):
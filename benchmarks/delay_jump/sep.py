@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-import os, sys, re, glob
+import os, sys
 from typing import List, Tuple, Dict, Iterable
 import numpy as np
 import pandas as pd
@@ -24,6 +24,9 @@ script_dir = os.path.dirname(__file__)
 mymodule_dir = os.path.join(script_dir, '../..')
 sys.path.append(mymodule_dir)
 from core.config import *  # HOME_DIR, etc.
+from core.catalog import find_runs, index_runs
+from core.cache import load_csv
+from core.resample import bin_series
 
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/benchmarks/resutls_delay_jump_threading"
 
@@ -52,136 +55,59 @@ def _require(name: str, seq: Iterable):
         raise ValueError(f"{name} is empty. Provide at least one value.")
     return seq
 
-def find_run_dirs(base_dir: str) -> List[str]:
-    pat = os.path.join(base_dir, "Dumbell_*mbit_*ms_to_*ms_*pkts_*loss_*flows_*_*", "run*")
-    return sorted(glob.glob(pat))
-
-def parse_meta_from_path(path: str) -> Dict[str, object] | None:
+def run_meta(row) -> Dict[str, object] | None:
     """
-    Parse metadata from a run directory path using simple string operations,
-    so protocol names can safely contain underscores.
-
-    Expected directory structure (parent of run dir):
-      Dumbell_{bw}mbit_{delay}ms_to_{delay2}ms_{...pkts...}_{...loss...}_{flows}flows_{protocol}_{aqm}
+    bw, delay (base RTT), delay2 (the delay the link jumps to), flows, protocol, aqm and run of a catalog row, None for runs
+    without a delay change.
     """
-    try:
-        # Path ends in ".../Dumbell_.../runX"
-        path = path.rstrip("/")
-
-        # --- Run number ---
-        run_name = os.path.basename(path)
-        if not run_name.startswith("run"):
-            return None
-        run = int(run_name[3:])
-
-        # --- Experiment directory name ---
-        exp_dir = os.path.basename(os.path.dirname(path))
-        prefix = "Dumbell_"
-        if not exp_dir.startswith(prefix):
-            return None
-
-        s = exp_dir[len(prefix):]  # strip "Dumbell_"
-
-        # bw: "{bw}mbit_..."
-        i = s.find("mbit_")
-        if i == -1:
-            return None
-        bw = int(s[:i])
-        s = s[i + len("mbit_"):]
-
-        # delay: "{delay}ms_to_..."
-        i = s.find("ms_to_")
-        if i == -1:
-            return None
-        delay = int(s[:i])
-        s = s[i + len("ms_to_"):]
-
-        # delay2: "{delay2}ms_..."
-        i = s.find("ms_")
-        if i == -1:
-            return None
-        delay2 = int(s[:i])
-        s = s[i + len("ms_"):]
-        # now s looks like: "{pkts}pkts_{loss}loss_{flows}flows_{protocol}_{aqm}"
-
-        # find "flows_"
-        flows_pos = s.find("flows_")
-        if flows_pos == -1:
-            return None
-
-        before_flows = s[:flows_pos]      # "..._{flows}"
-        after_flows  = s[flows_pos + len("flows_"):]  # "{protocol}_{aqm}"
-
-        # flows is the last underscore-separated token before "flows_"
-        last_us = before_flows.rfind("_")
-        if last_us == -1:
-            return None
-        flows_str = before_flows[last_us + 1:]
-        flows = int(flows_str)
-
-        # protocol and aqm: protocol can contain underscores, aqm is after the last "_"
-        last_us2 = after_flows.rfind("_")
-        if last_us2 == -1:
-            return None
-        protocol = after_flows[:last_us2]
-        aqm = after_flows[last_us2 + 1:]
-
-        return {
-            "bw":       bw,
-            "delay":    delay,
-            "delay2":   delay2,
-            "flows":    flows,
-            "protocol": protocol,
-            "aqm":      aqm,
-            "run":      run,
-        }
-
-    except Exception:
-        # Any parsing failure => this path is not a valid run dir for us
+    jumps = [c for c in row["changes"] if c.get("delay") is not None]
+    if not jumps or pd.isna(row["rtt"]):
         return None
-def pick_latest(dirs: List[str], pattern: str) -> str | None:
-    matches: List[str] = []
-    for d in dirs:
-        matches.extend(glob.glob(os.path.join(d, pattern)))
-    if not matches:
-        return None
-    return max(matches, key=os.path.getmtime)
+    return {
+        "bw":       row["bw"],
+        "delay":    int(row["rtt"]),
+        "delay2":   float(jumps[-1]["delay"]),
+        "flows":    row["n_flows"],
+        "protocol": row["protocol"],
+        "aqm":      row["aqm"],
+        "run":      row["run"],
+    }
 
 # Loaders
 
 def _normalize_time_col(df: pd.DataFrame, candidates=('time','t','sec','seconds')) -> str | None:
     for c in candidates:
         if c in df.columns:
-            df['time'] = df[c].apply(lambda x: int(float(x)))
+            df['time'] = df[c]
             return 'time'
     return None
 
-def load_goodput_series(run_dir: str) -> pd.DataFrame | None:
-    search_dirs = [os.path.join(run_dir, "csvs"), run_dir]
-    x_path = pick_latest(search_dirs, "x1*.csv") or pick_latest(search_dirs, "x2*.csv")
-    if not x_path:
-        return None
+def _load(run_dir: str, name: str) -> pd.DataFrame | None:
     try:
-        df = pd.read_csv(x_path).reset_index(drop=True)
-    except Exception:
-        return None
-    tcol = _normalize_time_col(df)
-    bcol = next((c for c in ('bandwidth','throughput','goodput','rate_mbps','bw') if c in df.columns), None)
-    if not tcol or not bcol:
+        return load_csv(run_dir, name).reset_index(drop=True)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
         return None
-    return df[['time', bcol]].rename(columns={bcol: 'bandwidth'})
 
-def load_rtt_series_pair(run_dir: str) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
-    search_dirs = [os.path.join(run_dir, "csvs"), run_dir]
-    c1 = pick_latest(search_dirs, "c1*_ss.csv") or pick_latest(search_dirs, "c1*.csv")
-    c2 = pick_latest(search_dirs, "c2*_ss.csv") or pick_latest(search_dirs, "c2*.csv")
+def load_goodput_series(run_dir: str, flows: list) -> pd.DataFrame | None:
+    # receiver of the first data flow that has output
+    for flow in flows:
+        df = _load(run_dir, flow[1])
+        if df is None:
+            continue
+        tcol = _normalize_time_col(df)
+        bcol = next((c for c in ('bandwidth','throughput','goodput','rate_mbps','bw') if c in df.columns), None)
+        if not tcol or not bcol:
+            return None
+        return df[['time', bcol]].rename(columns={bcol: 'bandwidth'})
+    return None
+
+def load_rtt_series_pair(run_dir: str, flows: list) -> Tuple[pd.DataFrame | None, pd.DataFrame | None]:
     out = []
-    for path in (c1, c2):
-        if not path:
-            out.append(None); continue
-        try:
-            df = pd.read_csv(path).reset_index(drop=True)
-        except Exception:
+    for flow in (flows + [None, None])[:2]:
+        df = None if flow is None else _load(run_dir, f"{flow[0]}_ss")
+        if df is None and flow is not None:
+            df = _load(run_dir, flow[0])
+        if df is None:
             out.append(None); continue
         tcol = _normalize_time_col(df)
         rcol = 'rtt' if 'rtt' in df.columns else None
@@ -194,8 +120,7 @@ def load_rtt_series_pair(run_dir: str) -> Tuple[pd.DataFrame | None, pd.DataFram
 
 def mean_goodput_in_window(df: pd.DataFrame, start: int, end: int) -> float | None:
     if df is None or df.empty: return None
-    w = df.drop_duplicates('time')
-    w = w[(w['time'] >= start) & (w['time'] <= end)]
+    w = bin_series(df, start=start, end=end)
     if w.empty: return None
     return float(w['bandwidth'].mean())
 
@@ -203,8 +128,7 @@ def mean_rtt_in_window(c1: pd.DataFrame | None, c2: pd.DataFrame | None, start:
     vals = []
     for df in (c1, c2):
         if df is None or df.empty: continue
-        w = df.drop_duplicates('time')
-        w = w[(w['time'] >= start) & (w['time'] <= end)]
+        w = bin_series(df, start=start, end=end)
         if not w.empty:
             vals.append(float(w['rtt'].mean()))
     if not vals:
@@ -333,29 +257,27 @@ def main():
     runs   = _require("FILTER_RUNS", FILTER_RUNS)
     delays = _require("FILTER_DELAYS", FILTER_DELAYS)
 
-    run_dirs = find_run_dirs(EXPERIMENT_PATH)
-    if not run_dirs:
-        print(f"No run directories found under: {EXPERIMENT_PATH}")
+    # one indexed query instead of walking and decoding directory names, runs from before the catalog are indexed once
+    query = dict(bw=bws, protocol=prots, aqm=aqms, run=runs, rtt=delays)
+    rows = find_runs(EXPERIMENT_PATH, **query)
+    if rows.empty and index_runs(EXPERIMENT_PATH):
+        rows = find_runs(EXPERIMENT_PATH, **query)
+    if rows.empty:
+        print(f"No runs found under: {EXPERIMENT_PATH}")
         return
 
-    records: list[tuple[str, Dict[str, object]]] = []
-    for rd in run_dirs:
-        meta = parse_meta_from_path(rd)
-        if not meta:
-            continue
-        if (meta["bw"] in bws and
-            meta["protocol"] in prots and
-            meta["aqm"] in aqms and
-            meta["run"] in runs and
-            meta["delay"] in delays):
-            records.append((rd, meta))
+    records: list[tuple[str, list, Dict[str, object]]] = []
+    for _, row in rows.iterrows():
+        meta = run_meta(row)
+        if meta:
+            records.append((row["path"], row["flows"], meta))
 
     if not records:
         print("No matching runs after filters. Check your FILTER_* values.")
         return
 
     base_delays = list(dict.fromkeys(delays))
-    step_ratios = sorted({round(m["delay2"] / m["delay"], 6) for _, m in records})
+    step_ratios = sorted({round(m["delay2"] / m["delay"], 6) for _, _, m in records})
     delay_to_i = {d: i for i, d in enumerate(base_delays)}
     step_to_j  = {r: j for j, r in enumerate(step_ratios)}
     shape = (len(base_delays), len(step_ratios))
@@ -363,11 +285,11 @@ def main():
     buckets_gp_by_proto : Dict[str, Dict[Tuple[int, float], List[float]]] = {p:{} for p in prots}
     buckets_rt_by_proto : Dict[str, Dict[Tuple[int, float], List[float]]] = {p:{} for p in prots}
 
-    for rd, meta in records:
+    for rd, flows, meta in records:
         ratio = round(meta["delay2"] / meta["delay"], 6)
-        df_g = load_goodput_series(rd)
+        df_g = load_goodput_series(rd, flows)
         gp = mean_goodput_in_window(df_g, WINDOW_START, WINDOW_END)
-        c1, c2 = load_rtt_series_pair(rd)
+        c1, c2 = load_rtt_series_pair(rd, flows)
         rt = mean_rtt_in_window(c1, c2, WINDOW_START, WINDOW_END)
         rt_ratio = (rt / meta["delay2"]) if (rt is not None and meta["delay2"] > 0) else None
         key = (meta["delay"], ratio)
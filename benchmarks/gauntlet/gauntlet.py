@@ -7,6 +7,7 @@ from core.analysis import *
 from core.utils import *
 from core.emulation import *
 from core.config import *
+from core.plot_pool import PlotPool
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from mininet.net import Mininet
 from mininet.cli import CLI
@@ -19,7 +20,8 @@ except ImportError:
 _run_id_lock = threading.Lock()
 _mn_clean_lock = threading.Lock()
 _run_id_counter = itertools.count(1)
-_print_lock = threading.Lock()
+# renders the plots of finished runs while the threads go on with the next emulation, set up in __main__
+plot_pool = None
 
 PROTOCOLS = ['sage'] #, 'bic', 'cdg', 'cubic', 'htcp', 'highspeed', 'hybla', 'illinois', 'vegas', 'veno', 'westwood', 'yeah']
 
@@ -39,7 +41,7 @@ RUNS = list(range(1, 6))
 # DELAYS = [20]
 # QMULTS = [2]
 # RUNS = [6]
-MAX_JOBS = 6
+MAX_JOBS = 6  # concurrent emulations, plotting runs on PLOT_JOBS processes
 
 
 def next_ex_idx() -> int:
@@ -89,11 +91,7 @@ def run_thread_fairness_aqm(protocol, params, bw, delay, qmult, run, aqm='fifo',
     change_all_user_permissions(path)
     process_raw_outputs(path)
     change_all_user_permissions(path)
-    with _print_lock:
-        plot_all_mn(path)
-    with _print_lock:
-        plot_all_cpu(path)
-    change_all_user_permissions(path)
+    plot_pool.submit(path)
     
 def run_thread_fairness_inter_rtt(protocol, params, bw, delay, qmult, run, aqm='fifo',):
     bdp_in_bytes = int(bw * (2 ** 20) * delay * (10 ** -3) / 8)
@@ -123,11 +121,7 @@ def run_thread_fairness_inter_rtt(protocol, params, bw, delay, qmult, run, aqm='
     change_all_user_permissions(path)
     process_raw_outputs(path)
     change_all_user_permissions(path)
-    with _print_lock:
-        plot_all_mn(path)
-    with _print_lock:
-        plot_all_cpu(path)
-    change_all_user_permissions(path)
+    plot_pool.submit(path)
 
 def run_thread_fairness_intra_rtt(protocol, params, bw, delay, qmult, run, aqm='fifo'):
     bdp_in_bytes = int(bw * (2 ** 20) * delay * (10 ** -3) / 8)
@@ -155,11 +149,7 @@ def run_thread_fairness_intra_rtt(protocol, params, bw, delay, qmult, run, aqm='
     change_all_user_permissions(path)
     process_raw_outputs(path)
     change_all_user_permissions(path)
-    with _print_lock:
-        plot_all_mn(path)
-    with _print_lock:
-        plot_all_cpu(path)
-    change_all_user_permissions(path)
+    plot_pool.submit(path)
     
 def run_thread_fairness_bw(protocol, params, bw, delay, qmult, run, aqm='fifo'):
     bdp_in_bytes = int(bw*(2**20)*delay*(10**-3)/8)
@@ -189,11 +179,7 @@ def run_thread_fairness_bw(protocol, params, bw, delay, qmult, run, aqm='fifo'):
     change_all_user_permissions(path)
     process_raw_outputs(path)
     change_all_user_permissions(path)
-    with _print_lock:
-        plot_all_mn(path)
-    with _print_lock:
-        plot_all_cpu(path)
-    change_all_user_permissions(path)
+    plot_pool.submit(path)
     
 
 
@@ -221,6 +207,9 @@ if __name__ == '__main__':
                                 jobs.append((experiment, protocol, bw, delay, qmult, run))
 
     random.shuffle(jobs)
+    plot_pool = PlotPool(PLOT_JOBS)
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(_worker, *job) for job in jobs]
 
@@ -254,4 +243,7 @@ if __name__ == '__main__':
                 finally:
                     done += 1
                     render(done, total)
-            print()  # newline at end
\ No newline at end of file
+            print()  # newline at end
+
+    # wait for the plots still being rendered
+    plot_pool.close()
@@ -27,6 +27,8 @@ RUNS = [1, 2, 3]
 PROTOCOLS = ['sage_reanimated']
 
 MAX_JOBS = 10
+# per-ACK cwnd/rtt from the tcp:tcp_probe tracepoint, flows are told apart by address so only with MAX_JOBS = 1
+TCP_PROBE = False
 
 # EXPERIMENT_PATH = f"cctestbed/benchmarks/results_intra_rtt_threading"
 # BWS    = [180]
@@ -70,6 +72,8 @@ def run_emulation(topology: str, protocol: str, params, bw: int, delay:int, qmul
     em.configure_network()
     em.configure_traffic()
     # em.set_monitors([f"s1{params['ex_idx']}-eth1", f"s2{params['ex_idx']}-eth2", 'sysstat'])
+    if TCP_PROBE:
+        em.set_tcp_probe()
     em.run()
     em.dump_info()
     with _mn_clean_lock:
@@ -101,6 +105,8 @@ if __name__ == '__main__':
                         jobs.append((protocol, bw, delay, qmult, run))
     random.shuffle(jobs)
     printC(f"Total jobs: {len(jobs)}", "green", INFO)
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(_worker, *job) for job in jobs]
         for fut in as_completed(futures):
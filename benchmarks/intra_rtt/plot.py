@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import os, sys, glob
+import os, sys
 from typing import Optional, List, Tuple
 
 import numpy as np
@@ -21,6 +21,9 @@ sys.path.append(mymodule_dir)
 
 from core.config import *
 from core.plotting import *
+from core.catalog import find_runs, index_runs
+from core.cache import load_csv
+from core.resample import bin_series
 
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/benchmarks/results_intra_rtt_threading"
 
@@ -51,53 +54,34 @@ DELAY_SEQ_CMAP = LinearSegmentedColormap.from_list(
 )
 
 # ------------ Helpers ------------
-def pick_latest(dirs: List[str], pattern: str) -> Optional[str]:
-    matches: List[str] = []
-    for d in dirs:
-        matches.extend(glob.glob(os.path.join(d, pattern)))
-    if not matches:
+def _load(PATH: str, name: str) -> Optional[pd.DataFrame]:
+    try:
+        return load_csv(PATH, name).reset_index(drop=True)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
         return None
-    return max(matches, key=os.path.getmtime)
 
-def load_pair_timeseries(PATH: str, protocol: str, delay_ms: int) -> Tuple[Optional[pd.Series], Optional[pd.Series]]:
-    search_dirs = [os.path.join(PATH, "csvs"), PATH]
-
-    x1_path = pick_latest(search_dirs, "x1*.csv")
-    x2_path = pick_latest(search_dirs, "x2*.csv")
+def load_pair_timeseries(PATH: str, flows: list, protocol: str, delay_ms: int) -> Tuple[Optional[pd.Series], Optional[pd.Series]]:
+    if len(flows) < 2:
+        return None, None
+    # hosts carry the emulation index (x1<ex_idx>, ...), the catalog has their names
+    (c1, x1), (c2, x2) = flows[0][:2], flows[1][:2]
+    r1g = _load(PATH, x1)
+    r2g = _load(PATH, x2)
 
     # c-files depend on protocol naming
     if protocol in ("vivace-uspace", "astraea"):
-        c1_pattern = "c1*.csv"
-        c2_pattern = "c2*.csv"
+        r1s, r2s = _load(PATH, c1), _load(PATH, c2)
     else:
-        c1_pattern = "c1*_ss.csv"
-        c2_pattern = "c2*_ss.csv"
+        r1s, r2s = _load(PATH, f"{c1}_ss"), _load(PATH, f"{c2}_ss")
 
-    c1_path = pick_latest(search_dirs, c1_pattern)
-    c2_path = pick_latest(search_dirs, c2_pattern)
-
-    if not all([x1_path, x2_path, c1_path, c2_path]):
+    if any(df is None for df in (r1g, r2g, r1s, r2s)):
         return None, None
 
-    # Load CSVs
-    r1g = pd.read_csv(x1_path).reset_index(drop=True)
-    r2g = pd.read_csv(x2_path).reset_index(drop=True)
-    r1s = pd.read_csv(c1_path).reset_index(drop=True)
-    r2s = pd.read_csv(c2_path).reset_index(drop=True)
-
-    # Ensure integer-second time
-    for df in (r1g, r2g, r1s, r2s):
-        df['time'] = df['time'].apply(lambda x: int(float(x)))
-
-    # Steady-state window
+    # Steady-state window, first sample of every whole second in (start_time, end_time]
     start_time =  delay_ms
     end_time   = 2 * delay_ms - 1
 
-    def w(df):
-        return df[(df['time'] > start_time) & (df['time'] <= end_time)] \
-                .drop_duplicates('time').set_index('time')
-
-    r1g, r2g, r1s, r2s = w(r1g), w(r2g), w(r1s), w(r2s)
+    r1g, r2g, r1s, r2s = (bin_series(df, start=start_time, end=end_time, inclusive='right') for df in (r1g, r2g, r1s, r2s))
 
     # Align intersection of timestamps
     times = r1g.index.intersection(r2g.index).intersection(r1s.index).intersection(r2s.index)
@@ -127,22 +111,13 @@ def load_pair_timeseries(PATH: str, protocol: str, delay_ms: int) -> Tuple[Optio
 
     return goodput_ratio, delay_ratio
 
-def compute_cell_ratios(bw: int, delay_ms: int, protocol: str, aqm: str, runs: List[int]) -> Tuple[float, float]:
-    # BDP in bytes, then packets (MSS=1500B). Buffer = 1×BDP.
-    BDP_BYTES = int(bw * (2 ** 20) * delay_ms * 1e-3 / 8)
-    BDP_PKTS  = BDP_BYTES / 1500.0
-    q_pkts    = int(QMULT * BDP_PKTS)
-
+def compute_cell_ratios(runs: pd.DataFrame, protocol: str, delay_ms: int) -> Tuple[float, float]:
     goodput_samples = []
     delay_samples   = []
 
-    for run in runs:
-        PATH = (
-            f"{EXPERIMENT_PATH}/Dumbell_{bw}mbit_{delay_ms}ms_"
-            f"{q_pkts}pkts_0loss_2flows_{protocol}_{aqm}aqm/run{run}"
-        )
-        #print(f"Processing {PATH}")
-        gr, dr = load_pair_timeseries(PATH, protocol, delay_ms)
+    for _, row in runs.iterrows():
+        #print(f"Processing {row['path']}")
+        gr, dr = load_pair_timeseries(row["path"], row["flows"], protocol, delay_ms)
         if gr is None or dr is None:
             continue
         goodput_samples.append(gr.values)
@@ -256,6 +231,13 @@ def main():
     bw_to_j    = {bw: j for j, bw in enumerate(BWS)}
     delay_to_i = {d: i for i, d in enumerate(DELAYS)}
 
+    # every run of the grid in one catalog query, runs from before the catalog are indexed once
+    query = dict(protocol=PROTOCOLS, aqm=AQMS, bw=BWS, rtt=DELAYS, run=RUNS, loss=LOSSES, n_flows=2)
+    catalog = find_runs(EXPERIMENT_PATH, **query)
+    if catalog.empty and index_runs(EXPERIMENT_PATH):
+        catalog = find_runs(EXPERIMENT_PATH, **query)
+    cells = {key: runs for key, runs in catalog.groupby(["protocol", "aqm", "bw", "rtt", "qsize_pkts"])}
+
     for aqm in AQMS:
         for protocol in PROTOCOLS:
             goodput_ratio_mat = np.full((len(DELAYS), len(BWS)), np.nan, dtype=float)
@@ -263,7 +245,11 @@ def main():
 
             for bw in BWS:
                 for d in DELAYS:
-                    mean_goodput_ratio, mean_delay_ratio = compute_cell_ratios(bw, d, protocol, aqm, RUNS)
+                    # BDP in bytes, then packets (MSS=1500B). Buffer = QMULT×BDP.
+                    BDP_BYTES = int(bw * (2 ** 20) * d * 1e-3 / 8)
+                    q_pkts    = max(int(QMULT * BDP_BYTES), 1500) // 1500
+                    runs = cells.get((protocol, aqm, bw, d, q_pkts), catalog.iloc[:0])
+                    mean_goodput_ratio, mean_delay_ratio = compute_cell_ratios(runs, protocol, d)
                     i = delay_to_i[d]; j = bw_to_j[bw]
                     goodput_ratio_mat[i, j] = mean_goodput_ratio
                     delay_ratio_mat[i, j]   = mean_delay_ratio
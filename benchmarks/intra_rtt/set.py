@@ -22,6 +22,8 @@ sys.path.append(mymodule_dir)
 
 from core.config import *
 from core.plotting import *
+from core.cache import read_csv
+from core.resample import bin_series
 
 EXPERIMENT_PATH = f"{HOME_DIR}/cctestbed/benchmarks/results_intra_rtt_threading"
 
@@ -82,24 +84,16 @@ def load_pair_timeseries(PATH: str, protocol: str, delay_ms: int) -> Tuple[Optio
         return None, None
 
     # Load CSVs
-    r1g = pd.read_csv(x1_path).reset_index(drop=True)
-    r2g = pd.read_csv(x2_path).reset_index(drop=True)
-    r1s = pd.read_csv(c1_path).reset_index(drop=True)
-    r2s = pd.read_csv(c2_path).reset_index(drop=True)
+    r1g = read_csv(x1_path).reset_index(drop=True)
+    r2g = read_csv(x2_path).reset_index(drop=True)
+    r1s = read_csv(c1_path).reset_index(drop=True)
+    r2s = read_csv(c2_path).reset_index(drop=True)
 
-    # Ensure integer-second time
-    for df in (r1g, r2g, r1s, r2s):
-        df['time'] = df['time'].apply(lambda x: int(float(x)))
-
-    # Steady-state window
+    # Steady-state window, first sample of every whole second in (start_time, end_time]
     start_time =  delay_ms
     end_time   = 2 * delay_ms - 1
 
-    def w(df):
-        return df[(df['time'] > start_time) & (df['time'] <= end_time)] \
-                .drop_duplicates('time').set_index('time')
-
-    r1g, r2g, r1s, r2s = w(r1g), w(r2g), w(r1s), w(r2s)
+    r1g, r2g, r1s, r2s = (bin_series(df, start=start_time, end=end_time, inclusive='right') for df in (r1g, r2g, r1s, r2s))
 
     # Align intersection of timestamps
     times = r1g.index.intersection(r2g.index).intersection(r1s.index).intersection(r2s.index)
@@ -0,0 +1,94 @@
+import os, sys, time, random, argparse
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '../..')
+sys.path.append( mymodule_dir )
+import pandas as pd
+from core.parsers import parse_ss_to_csv, parse_ss_to_csv_generic
+
+# Synthetic `ss -OHtin | ts` output of two bbr flows sampled every 10 ms, whole lines up to --size-mb (the reported MB/s
+# are of that size).
+# The regex parser is timed on a --generic-mb prefix (it takes minutes per GB), the fixed-schema parser on the whole file,
+# and both outputs of the prefix are compared column by column.
+
+LINE = ("{t:.6f},0.01, ESTAB 0      {q}      10.0.0.{h}:{sport} 10.0.0.{d}:5201 bbr wscale:9,9 rto:{rto} rtt:{rtt:.3f}/{rttvar:.3f} "
+        "ato:40 mss:1448 pmtu:1500 rcvmss:536 advmss:1448 cwnd:{cwnd} ssthresh:{ssthresh} bytes_sent:{sent} bytes_retrans:{retx} "
+        "bytes_acked:{acked} segs_out:{segs} segs_in:{segs_in} data_segs_out:{segs} "
+        "bbr:(bw:{bw}bps,mrtt:{mrtt:.3f},pacing_gain:1.25,cwnd_gain:2) send {send}bps lastsnd:4 lastrcv:{t_ms} lastack:4 "
+        "pacing_rate {pacing}bps delivery_rate {delivery}bps delivered:{segs} busy:{t_ms}ms rwnd_limited:{rwnd}ms(0.{rwnd}%) "
+        "unacked:{unacked} retrans:0/{retrans} lost:{lost} sacked:{sacked} dsack_dups:{retrans} reordering:3 reord_seen:{retrans} "
+        "rcv_space:14480 rcv_ssthresh:64088 notsent:{notsent} minrtt:{mrtt:.3f} snd_wnd:{wnd}\n")
+
+def generate(path: str, size_mb: int) -> None:
+    rng = random.Random(1)
+    t, sent = 1700000000.0, 0
+    target, written = size_mb << 20, 0
+    with open(path, 'wb') as f:
+        while written < target:
+            lines = []
+            for _ in range(10000):
+                t += 0.01
+                for h, sport in ((1, 11111), (2, 11112)):
+                    sent += rng.randint(10000, 200000)
+                    retrans = rng.randint(0, 50)
+                    lines.append(LINE.format(t=t, q=rng.randint(0, 99999), h=h, d=h + 100, sport=sport, rto=rng.choice([204, 208, 212]),
+                                             rtt=rng.uniform(20, 80), rttvar=rng.uniform(0.1, 5), cwnd=rng.randint(10, 2000),
+                                             ssthresh=rng.randint(10, 2000), sent=sent, retx=retrans * 1448, acked=sent - 1448,
+                                             segs=sent // 1448, segs_in=sent // 2896, bw=rng.randint(10**6, 10**9), mrtt=rng.uniform(20, 25),
+                                             send=rng.randint(10**6, 10**9), t_ms=int((t - 1700000000.0) * 1000), pacing=rng.randint(10**6, 10**9),
+                                             delivery=rng.randint(10**6, 10**9), rwnd=rng.randint(0, 9), unacked=rng.randint(0, 2000),
+                                             retrans=retrans, lost=rng.randint(0, 10), sacked=rng.randint(0, 100),
+                                             notsent=rng.randint(0, 10**6), wnd=rng.randint(10**4, 10**7)))
+            data = "".join(lines).encode()
+            if written + len(data) > target:
+                # cut after the last whole line that still fits
+                data = data[:data.rfind(b'\n', 0, target - written) + 1]
+                if not data:
+                    break
+            f.write(data)
+            written += len(data)
+
+def timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+def compare(old_csv: str, new_csv: str) -> list:
+    old, new = pd.read_csv(old_csv), pd.read_csv(new_csv)
+    mismatched = [c for c in old.columns if c in new.columns and not
+                  ((old[c] == new[c]) | (old[c].isna() & new[c].isna()) | (pd.to_numeric(old[c], errors='coerce') - pd.to_numeric(new[c], errors='coerce')).abs().lt(1e-9)).all()]
+    return mismatched + [f"missing {c}" for c in old.columns if c not in new.columns]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Regex ss parser vs fixed-schema chunked parser on a synthetic ss file.")
+    parser.add_argument("--path", default="/tmp/ss_benchmark.csv", help="Synthetic ss file, generated if it is missing.")
+    parser.add_argument("--size-mb", type=int, default=2048, help="Size of the synthetic file (default: 2048).")
+    parser.add_argument("--generic-mb", type=int, default=64, help="Prefix the regex parser is timed on (default: 64).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes of the fixed-schema parser (default: all cores).")
+    args = parser.parse_args()
+
+    # a file left by a run with another --size-mb is generated again, within a line of the requested size it is reused
+    if not os.path.exists(args.path) or not (args.size_mb << 20) - 4096 < os.path.getsize(args.path) <= args.size_mb << 20:
+        print(f"Generating {args.size_mb} MB of ss output in {args.path}")
+        generate(args.path, args.size_mb)
+    size_mb = os.path.getsize(args.path) / 2**20
+
+    prefix = f"{args.path}.prefix"
+    with open(args.path, 'rb') as fin, open(prefix, 'wb') as fout:
+        fout.write(fin.read(args.generic_mb << 20))
+        fout.write(fin.readline())
+
+    t_generic = timed(parse_ss_to_csv_generic, prefix, f"{prefix}.generic.csv")
+    t_prefix = timed(parse_ss_to_csv, prefix, f"{prefix}.fast.csv", workers=1)
+    mismatched = compare(f"{prefix}.generic.csv", f"{prefix}.fast.csv")
+    t_serial = timed(parse_ss_to_csv, args.path, f"{args.path}.fast.csv", workers=1)
+    t_parallel = timed(parse_ss_to_csv, args.path, f"{args.path}.fast.csv", workers=args.workers)
+
+    print(f"{'parser':<34}{'MB':>10}{'seconds':>10}{'MB/s':>10}")
+    print(f"{'regex (parse_ss_to_csv_generic)':<34}{args.generic_mb:>10}{t_generic:>10.1f}{args.generic_mb / t_generic:>10.1f}")
+    print(f"{'fixed schema, 1 worker':<34}{args.generic_mb:>10}{t_prefix:>10.1f}{args.generic_mb / t_prefix:>10.1f}")
+    print(f"{'fixed schema, 1 worker':<34}{size_mb:>10.0f}{t_serial:>10.1f}{size_mb / t_serial:>10.1f}")
+    print(f"{f'fixed schema, {args.workers} workers':<34}{size_mb:>10.0f}{t_parallel:>10.1f}{size_mb / t_parallel:>10.1f}")
+    print(f"speed-up over regex: {(size_mb / t_parallel) / (args.generic_mb / t_generic):.1f}x")
+    print("columns differing from the regex parser: " + (", ".join(mismatched) if mismatched else "none"))
+    for f in (prefix, f"{prefix}.generic.csv", f"{prefix}.fast.csv", f"{args.path}.fast.csv"):
+        os.remove(f)
@@ -0,0 +1,132 @@
+import numpy as np
+
+# Streaming statistics over many runs on a common time grid. Every run's series is folded in once, with Welford updates for
+# mean and variance and the P² algorithm (Jain & Chlamtac) for quantiles, so memory depends on the grid length only, never on
+# the number of runs. Series may start at any grid index and the grid grows with the longest series seen so far.
+
+class P2Quantile:
+    """
+    Running estimate of quantile `p` at every grid point: five markers per point, the first five observations are kept exactly.
+    """
+    def __init__(self, p: float, size=0):
+        self.p = p
+        self.dn = np.array([0, p / 2, p, (1 + p) / 2, 1])[:, None]
+        self.q = np.zeros((5, size))
+        self.n = np.tile(np.arange(5.0)[:, None], (1, size))
+        self.np = np.zeros((5, size))
+        self.count = np.zeros(size, dtype=np.int64)
+
+    def grow(self, size: int) -> None:
+        extra = size - len(self.count)
+        if extra <= 0:
+            return
+        self.q = np.hstack([self.q, np.zeros((5, extra))])
+        self.n = np.hstack([self.n, np.tile(np.arange(5.0)[:, None], (1, extra))])
+        self.np = np.hstack([self.np, np.zeros((5, extra))])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+
+    def update(self, start: int, x: np.ndarray) -> None:
+        """
+        Add one observation per grid point for the points start..start+len(x)-1, NaNs are skipped.
+        """
+        self.grow(start + len(x))
+        idx = start + np.flatnonzero(np.isfinite(x))
+        x = x[np.isfinite(x)]
+        count = self.count[idx]
+
+        # the first five observations of a point are stored, the markers start from them sorted
+        filling = count < 5
+        if filling.any():
+            cells, values = idx[filling], x[filling]
+            self.q[count[filling], cells] = values
+            self.count[cells] += 1
+            ready = cells[self.count[cells] == 5]
+            if len(ready):
+                self.q[:, ready] = np.sort(self.q[:, ready], axis=0)
+                p = self.p
+                self.np[:, ready] = np.array([0, 2 * p, 4 * p, 2 + 2 * p, 4])[:, None]
+        cells, x = idx[~filling], x[~filling]
+        if not len(cells):
+            return
+        self.count[cells] += 1
+        q, n = self.q[:, cells], self.n[:, cells]
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        k = (x >= q[1]).astype(np.int64) + (x >= q[2]) + (x >= q[3])
+        n += np.arange(5)[:, None] > k[None, :]
+        desired = self.np[:, cells] + self.dn
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+            if not move.any():
+                continue
+            s = np.sign(d[move])
+            qi, qa, qb = q[i, move], q[i - 1, move], q[i + 1, move]
+            ni, na, nb = n[i, move], n[i - 1, move], n[i + 1, move]
+            parabolic = qi + s / (nb - na) * ((ni - na + s) * (qb - qi) / (nb - ni) + (nb - ni - s) * (qi - qa) / (ni - na))
+            neighbour_q = np.where(s > 0, qb, qa)
+            neighbour_n = np.where(s > 0, nb, na)
+            linear = qi + s * (neighbour_q - qi) / (neighbour_n - ni)
+            q[i, move] = np.where((qa < parabolic) & (parabolic < qb), parabolic, linear)
+            n[i, move] = ni + s
+        self.q[:, cells], self.n[:, cells], self.np[:, cells] = q, n, desired
+
+    def value(self) -> np.ndarray:
+        out = self.q[2].copy()
+        for c in range(5):
+            cells = np.flatnonzero(self.count == c)
+            if not len(cells):
+                continue
+            # fewer than five observations: the exact quantile of what there is
+            out[cells] = np.quantile(self.q[:c, cells], self.p, axis=0) if c else np.nan
+        return out
+
+class RunningStats:
+    """
+    Welford mean and variance plus P² `quantiles` of series folded in one at a time on a grid that grows as needed.
+    """
+    def __init__(self, quantiles=(0.25, 0.5, 0.75)):
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.runs = 0
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    def grow(self, size: int) -> None:
+        extra = size - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+
+    def update(self, start: int, values: np.ndarray) -> None:
+        """
+        Fold in one run's series, values[j] being its value at grid index start + j (NaN where it has none).
+        """
+        self.grow(start + len(values))
+        self.runs += 1
+        valid = np.isfinite(values)
+        idx = start + np.flatnonzero(valid)
+        x = values[valid]
+        self.count[idx] += 1
+        delta = x - self.mean[idx]
+        self.mean[idx] += delta / self.count[idx]
+        self.m2[idx] += delta * (x - self.mean[idx])
+        for estimator in self.quantiles.values():
+            estimator.update(start, values)
+
+    def result(self) -> dict:
+        """
+        {count, mean, std (population, like np.std), q<p> for every quantile} per grid point, NaN where no run had a value.
+        """
+        empty = self.count == 0
+        mean = np.where(empty, np.nan, self.mean)
+        std = np.sqrt(np.divide(self.m2, self.count, out=np.full(len(self), np.nan), where=~empty))
+        out = {'count': self.count.copy(), 'mean': mean, 'std': std}
+        for p, estimator in self.quantiles.items():
+            estimator.grow(len(self))
+            out[f"q{p:g}"] = estimator.value()
+        return out
@@ -1,9 +1,20 @@
 import json, glob
 from core.parsers import *
 from core.utils import *
+from core.tcp_probe import parse_tcp_probe_dir
+from core.store import update_store, load_csv
+from core.flow_parsers import parse_flows, run_flow, parse_sender_ss, iperf_to_csvs
+from core.decimate import decimate
+from core.aggregate import RunningStats
+from core.metrics import run_summary
+from core.catalog import set_status
+from core.sysstat import CPU_METRICS, CPU_SATURATION_PCT, read_cpu_log, core_matrix
 import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.ticker import MultipleLocator, MaxNLocator
 
 def process_raw_out(path: str) -> None:
     change_all_user_permissions(path)
@@ -12,92 +23,52 @@ def process_raw_out(path: str) -> None:
     plot_all_mn(path)
     # plot_all_cpu(path)
 
-def process_raw_outputs(path: str) -> None:
+def process_raw_outputs(path: str, workers=None, force=False) -> None:
+    """
+    Parse every flow of a finished run into csvs/ (see core/flow_parsers.py), one flow per core, then write the run summary
+    (core/metrics.py) and the result store.
+    Processing a run again only re-parses the flows whose raw outputs or parser changed since (all of them with `force`).
+    """
     with open(f"{path}/emulation_info.json", 'r') as fin:
         emulation_info = json.load(fin)
 
     flows = emulation_info['flows']
+    # runs recorded with an experiment epoch carry the measured start of every flow on that time axis
+    epoch = emulation_info.get('epoch', {}).get('realtime')
+    flow_start_times = emulation_info.get('flow_start_times', {})
     flows = list(filter(lambda flow: flow[5] != 'netem' and flow[5] != 'tbf', flows))
     flows.sort(key=lambda x: x[-2])
 
     csv_path = path + "/csvs"
     mkdirp(csv_path)
     change_all_user_permissions(path)
-    first = False
-    for flow in flows:
-        sender = str(flow[0])
-        receiver = str(flow[1])
-        sender_ip = str(flow[2])
-        receiver_ip = str(flow[3])
-        start_time = int(flow[-4])
-        if 'datagen' in flow[-2] or flow[-2] == 'netem' or flow[-2] == 'tbf':
-            continue
-        if 'orca' in flow[-2]:
-            df = parse_orca_output(f"{path}/{sender}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{sender}.csv", index=False)
-            remove(f"{path}/{sender}_output.txt")
-
-            if parse_ss_to_csv(f"{path}/{sender}_ss.csv", f"{csv_path}/{sender}_ss.csv", start_time):
-                remove(f"{path}/{sender}_ss.csv")
-
-            df = parse_orca_output(f"{path}/{receiver}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{receiver}.csv", index=False)
-            remove(f"{path}/{receiver}_output.txt")
-
-        if 'genericcc' in flow[-2]:
-            df = parse_genericcc_output(f"{path}/{sender}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{sender}_ss.csv", index=False)
-            #remove(f"{path}/{sender}_output.txt")
-
-            df = parse_genericcc_output(f"{path}/{receiver}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{receiver}.csv", index=False)
-            #remove(f"{path}/{receiver}_output.txt")
-
-        # elif 'sage' in flow[-2] or 'athena' in flow[-2]:
-        #     df = parse_orca_output(f"{path}/{sender}_output.txt", start_time-4 if first else start_time)
-        #     df.to_csv(f"{csv_path}/{sender}.csv", index=False)
-        #     #remove(f"{path}/{sender}_output.txt")
-
-        #     if parse_ss_to_csv(f"{path}/{sender}_ss.csv", f"{csv_path}/{sender}_ss.csv", start_time-4 if first else start_time):
-        #         remove(f"{path}/{sender}_ss.csv")
-
-        #     df = parse_orca_output(f"{path}/{receiver}_output.txt", start_time)
-        #     df.to_csv(f"{csv_path}/{receiver}.csv", index=False)
-        #     #remove(f"{path}/{receiver}_output.txt")
-
-        elif 'aurora' in flow[-2]:
-            df = parse_aurora_output(f"{path}/{sender}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{sender}.csv", index=False)
-
-            df = parse_aurora_output(f"{path}/{receiver}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{receiver}.csv", index=False)
-        elif 'astraea' in flow[-2]:
-            df = parse_astraea_output(f"{path}/{sender}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{sender}.csv", index=False)
-            remove(f"{path}/{sender}_output.txt")
-
-            df = parse_astraea_output(f"{path}/{receiver}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{receiver}.csv", index=False)
-            remove(f"{path}/{receiver}_output.txt")
-        else:
-            df = parse_iperf_json(f"{path}/{sender}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{sender}.csv", index=False)
-            remove(f"{path}/{sender}_output.txt")
-
-            if parse_ss_to_csv(f"{path}/{sender}_ss.csv", f"{csv_path}/{sender}_ss.csv", start_time):
-                remove(f"{path}/{sender}_ss.csv")
-            
-            df = parse_iperf_json(f"{path}/{receiver}_output.txt", start_time)
-            df.to_csv(f"{csv_path}/{receiver}.csv", index=False)
-            remove(f"{path}/{receiver}_output.txt")
-
-        first = True
+    # flows the live parser already handled are up to date in the manifest and skipped
+    try:
+        parse_flows(path, flows, flow_start_times, epoch, workers=workers, force=force)
+    except RuntimeError:
+        set_status(path, 'failed')
+        raise
+
+    # the summary reads the csvs, so before they may go into the store
+    if RUN_SUMMARY:
+        run_summary(path)
+    if RESULT_STORE:
+        update_store(path, remove_csvs=not KEEP_CSVS)
+    set_status(path, 'processed')
 
 def plot_all_mn(path: str, aqm='fifo') -> None:
     def remove_outliers(df, column, threshold):
         """Remove outliers from a DataFrame column based on a threshold."""
         return df[df[column] < threshold]
-    fig, axs = plt.subplots(7, 1, figsize=(16, 36))
+    def plot_line(ax, x, y, **kwargs):
+        """Plot a series decimated to the pixel columns of the axis, rasterised if it was denser than that."""
+        bins = max(1, int(ax.get_position().width * fig.get_figwidth() * PLOT_DPI))
+        dense = len(x) > 2 * bins
+        x, y = decimate(x, y, bins, PLOT_DECIMATION)
+        return ax.plot(x, y, rasterized=PLOT_RASTERIZE and dense, **kwargs)
+    # plain Figure, no pyplot state: the per-run plots are rendered concurrently (core/plot_pool.py)
+    fig = Figure(figsize=(16, 36))
+    axs = fig.subplots(7, 1)
     with open(os.path.join(path, 'emulation_info.json'), 'r') as f:
         emulation_info = json.load(f)
     flows = []
@@ -113,15 +84,15 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
             flow_client = flow[0]  # Client flow name like 'c1', 'c2', etc.
             flow_server = flow[1]  # Server flow name like 'x1', 'x2', etc.
             try:
-                df_client = pd.read_csv(os.path.join(path, f'csvs/{flow_client}.csv'))
+                df_client = load_csv(path, f'{flow_client}')
             except FileNotFoundError:
                 df_client = pd.DataFrame()
             try:
-                df_ss_client = pd.read_csv(os.path.join(path, f'csvs/{flow_client}_ss.csv'))
+                df_ss_client = load_csv(path, f'{flow_client}_ss')
             except FileNotFoundError:
                 df_ss_client = pd.DataFrame()
             try:
-                df_server = pd.read_csv(os.path.join(path, f'csvs/{flow_server}.csv'))
+                df_server = load_csv(path, f'{flow_server}')
             except FileNotFoundError:
                 df_server = pd.DataFrame()
         
@@ -167,16 +138,16 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
                 ax_loss.set_ylim(0,None)
 
             # Goodput 
-            axs[0].plot(df_server['time'], df_server['bandwidth'], label=f'{flow_server} Goodput')
+            plot_line(axs[0], df_server['time'], df_server['bandwidth'], label=f'{flow_server} Goodput')
             axs[0].set_title("Goodput (Mbps)")
             axs[0].set_ylabel("Goodput (Mbps)")
 
             # RTT
             if 'srtt' in df_client.columns:
-                axs[1].plot(df_client['time'], df_client['srtt'], label=f'{flow_client} RTT')
+                plot_line(axs[1], df_client['time'], df_client['srtt'], label=f'{flow_client} RTT')
                 axs[1].set_title("RTT from Iperf (ms)")
             else:
-                axs[1].plot(df_ss_client['time'], df_ss_client['rtt'], label=f'{flow_client} RTT')
+                plot_line(axs[1], df_ss_client['time'], df_ss_client['rtt'], label=f'{flow_client} RTT')
                 axs[1].set_title("RTT from SS (ms)")
             
             axs[1].set_ylabel("RTT (ms)")
@@ -185,7 +156,7 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
             # Throughput (client) — use df_client if it has it, else fall back to df_ss_client (genericcc _ss)
             src = df_client if {'time','bandwidth'}.issubset(df_client.columns) else df_ss_client
             if {'time','bandwidth'}.issubset(src.columns):
-                axs[2].plot(src['time'], src['bandwidth'], label=f'{flow_client} Throughput')
+                plot_line(axs[2], src['time'], src['bandwidth'], label=f'{flow_client} Throughput')
 
             axs[2].set_title("Throughput (Mbps)")
             axs[2].set_ylabel("Throughput (Mbps)")
@@ -198,24 +169,24 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
 
             # CWND — support cwnd from either file
             if 'cwnd' in df_ss_client.columns:
-                axs[3].plot(df_ss_client['time'], df_ss_client['cwnd'], label=f'{flow_client} CWND')
+                plot_line(axs[3], df_ss_client['time'], df_ss_client['cwnd'], label=f'{flow_client} CWND')
                 axs[3].set_title("Cwnd (packets)")
             elif 'cwnd' in df_client.columns:
-                axs[3].plot(df_client['time'], df_client['cwnd'], label=f'{flow_client} CWND')
+                plot_line(axs[3], df_client['time'], df_client['cwnd'], label=f'{flow_client} CWND')
                 axs[3].set_title("Cwnd (packets)")
 
 
             if 'retr' in df_client.columns:
-                axs[4].plot(df_client['time'], df_client['retr'], label=f'{flow_client} Retransmits')
+                plot_line(axs[4], df_client['time'], df_client['retr'], label=f'{flow_client} Retransmits')
                 axs[4].set_title("Retransmits (packets)")
             elif 'lost' in df_ss_client.columns:
-                axs[4].plot(df_ss_client['time'], df_ss_client['lost'], label=f'{flow_client} Retransmits')
+                plot_line(axs[4], df_ss_client['time'], df_ss_client['lost'], label=f'{flow_client} Retransmits')
                 axs[4].set_title("Retransmits (packets)")
             elif 'loss_snd' in df_ss_client.columns:
-                axs[4].plot(df_ss_client['time'], df_ss_client['loss_snd'], label=f'{flow_client} Loss_snd (%)')
+                plot_line(axs[4], df_ss_client['time'], df_ss_client['loss_snd'], label=f'{flow_client} Loss_snd (%)')
                 axs[4].set_title("Loss (%)")
             elif 'loss_snd' in df_client.columns:
-                axs[4].plot(df_client['time'], df_client['loss_snd'], label=f'{flow_client} Loss_snd (%)')
+                plot_line(axs[4], df_client['time'], df_client['loss_snd'], label=f'{flow_client} Loss_snd (%)')
                 axs[4].set_title("Loss (%)")
     except Exception as e:
         printC(f"Error in plotting data for flows {e}", "red", ERROR)
@@ -223,7 +194,7 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
     
     queue_dir = os.path.join(path, 'queues')
     try:
-        queue_files = [f for f in os.listdir(queue_dir) if f.endswith('.txt')]
+        queue_files = [f for f in os.listdir(queue_dir) if f.endswith(('.txt', '.txt.gz', '.txt.zst', '.parquet'))]
     except FileNotFoundError:
         queue_files = []
     m = re.search(r'_(\d+)pkts_', queue_dir)
@@ -233,20 +204,25 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
 
     for queue_file in queue_files:
         queue_path = os.path.join(queue_dir, queue_file)
-        df_queue = pd.read_csv(queue_path)
+        if queue_file.endswith('.parquet'):
+            df_queue = pd.read_parquet(queue_path)
+        else:
+            with open_raw(queue_path) as fin:
+                df_queue = pd.read_csv(fin)
 
-        # Normalize time
+        # Normalize time, queue samples of runs with an epoch are already on the experiment time axis
         df_queue['time'] = pd.to_numeric(df_queue['time'], errors='coerce')
-        df_queue['time'] = df_queue['time'] - df_queue['time'].min()
+        if 'epoch' not in emulation_info:
+            df_queue['time'] = df_queue['time'] - df_queue['time'].min()
 
         # Plot instantaneous queue size (packets)
         if 'root_pkts' in df_queue.columns:
-            axs[5].plot(df_queue['time'], df_queue['root_pkts'] / 1500,
+            plot_line(axs[5], df_queue['time'], df_queue['root_pkts'] / 1500,
                         label=f'{queue_file} - root')
         axs[5].set_title("Queue size (packets)")
         
         if 'root_drp' in df_queue.columns:
-            axs[6].plot(df_queue['time'],
+            plot_line(axs[6], df_queue['time'],
                     df_queue['root_drp'].diff().fillna(0),
                     linestyle='--', label=f'{queue_file} - root')
             axs[6].set_title("Queue drops (packets)")
@@ -272,28 +248,27 @@ def plot_all_mn(path: str, aqm='fifo') -> None:
         # Adjust time ticks dynamically
         time_max = x_max
         time_interval = max(10, int(x_max / 20))  # Adjust ticks to ~20 intervals
-        ax.xaxis.set_major_locator(plt.MultipleLocator(time_interval))
+        ax.xaxis.set_major_locator(MultipleLocator(time_interval))
 
     # Adjust layout and save the figure
-    plt.tight_layout(rect=[0, 0, 1, 1], pad=1.0)
+    fig.tight_layout(rect=[0, 0, 1, 1], pad=1.0)
     output_file = os.path.join(path, "plot" + '.pdf')
 
-    plt.savefig(output_file)
+    fig.savefig(output_file, dpi=PLOT_DPI)
     printC(f"Plot saved to {output_file}", "green", INFO)
-    plt.close()
 
 def plot_all_cpu(path: str) -> None:
     """
     Generate a single figure with 7 stacked subplots:
       Subplots 1-6: client (cpu_c*.log) aggregate CPU lines only (ALL / -1), one subplot per metric
-      Subplot 7:    root (cpu_root.log) per-core utilization lines (100 - %idle), one line per core
+      Subplot 7:    root (cpu_root.log) per-core utilization heatmap (100 - %idle), time x core, saturated cores in red
     Root is omitted from the first 6 subplots as requested.
     """
     cpu_dir = os.path.join(path, "sysstat")
     client_files = sorted(glob.glob(os.path.join(cpu_dir, "cpu_c*.log")))
     root_file = os.path.join(cpu_dir, "cpu_root.log")
 
-    metrics = ["%user", "%nice", "%system", "%iowait", "%steal", "%idle"]
+    metrics = CPU_METRICS
     metric_titles = {
         "%user": "CPU User (%)",
         "%nice": "CPU Nice (%)",
@@ -303,28 +278,9 @@ def plot_all_cpu(path: str) -> None:
         "%idle": "CPU Idle (%)",
     }
 
-    def _read_cpu_log(file_path: str) -> pd.DataFrame:
-        # sadf -d output is ; delimited; header is usually commented with '#'
-        df = pd.read_csv(
-            file_path,
-            sep=";",
-            comment="#",
-            header=None,
-            names=["hostname", "interval", "timestamp", "CPU"] + metrics,
-            engine="python",
-        )
-        # ensure numeric where expected
-        df["timestamp"] = pd.to_numeric(df["timestamp"], errors="coerce")
-        df["interval"] = pd.to_numeric(df["interval"], errors="coerce")
-        # strip CPU string and keep as original column; also make a numeric copy for filtering
-        cpu_str = df["CPU"].astype(str).str.strip()
-        df["CPU_num"] = pd.to_numeric(cpu_str, errors="coerce")  # cores: 0..N, ALL often = -1 or NaN
-        df["CPU_str"] = cpu_str.str.lower()
-        return df.dropna(subset=["timestamp"])  # drop any header rows that slipped through
-
     # Read all client logs and root log (if present)
-    client_dfs = [(_read_cpu_log(f), os.path.basename(f).replace(".log", "")) for f in client_files]
-    root_df = _read_cpu_log(root_file) if os.path.exists(root_file) else None
+    client_dfs = [(read_cpu_log(f), os.path.basename(f).replace(".log", "")) for f in client_files]
+    root_df = read_cpu_log(root_file) if os.path.exists(root_file) else None
 
     # Determine a global t0 for consistent time alignment across all files
     t0_candidates = []
@@ -337,28 +293,29 @@ def plot_all_cpu(path: str) -> None:
         print("No CPU logs found.")
         return
     t0 = min(t0_candidates)
+    try:
+        with open(os.path.join(path, 'emulation_info.json'), 'r') as f:
+            t0 = json.load(f)['epoch']['realtime']
+    except (OSError, KeyError, ValueError):
+        pass
 
     # Prepare figure: 6 metric subplots + 1 per-core subplot
-    fig, axs = plt.subplots(7, 1, figsize=(16, 30), sharex=True, constrained_layout=True)
+    fig = Figure(figsize=(16, 30), layout='constrained')
+    axs = fig.subplots(7, 1, sharex=True)
 
     # ---- Clients: aggregate-only lines on subplots 1..6 ----
     if client_dfs:
         for df, label in client_dfs:
             if df.empty:
                 continue
-            df = df.copy()
-            df["time"] = df["timestamp"] - t0
-
-            # Aggregate rows: either CPU == "all"/"ALL" OR CPU_num == -1 (some sadf variants)
-            is_agg = (df["CPU_str"] == "all") | (df["CPU_num"] == -1)
-            df_all = df[is_agg]
+            df_all = df[df["cpu"] == -1]
             if df_all.empty:
-                # Fallback: if no explicit ALL/-1, try grouping by timestamp averaging per-core
-                df_all = (df[df["CPU_num"].notna() & (df["CPU_num"] >= 0)]
-                            .groupby("time", as_index=False)[metrics].mean())
+                # Fallback: if no explicit ALL/-1, average the per-core rows of every sample
+                df_all = df[df["cpu"] >= 0].groupby("timestamp", as_index=False)[metrics].mean()
+            time = df_all["timestamp"].to_numpy() - t0
 
             for i, metric in enumerate(metrics):
-                axs[i].plot(df_all["time"], df_all[metric], label=label)
+                axs[i].plot(time, df_all[metric].to_numpy(), label=label)
                 axs[i].set_title(metric_titles[metric])
                 axs[i].set_ylabel("%")
                 axs[i].grid(True)
@@ -371,179 +328,103 @@ def plot_all_cpu(path: str) -> None:
             axs[i].set_ylabel("%")
             axs[i].grid(True)
 
-    # ---- Root per-core on subplot 7 ----
+    # ---- Root per-core heatmap on subplot 7 ----
     ax_pc = axs[6]
-    ax_pc.set_title("Root per-core CPU Utilization (100 - %idle)")
-    ax_pc.set_ylabel("% Busy")
+    ax_pc.set_title(f"Root per-core CPU Utilization (100 - %idle), red: saturated (>= {CPU_SATURATION_PCT}%)")
+    ax_pc.set_ylabel("Core")
     ax_pc.set_xlabel("Time (s)")
-    ax_pc.grid(True)
 
     if root_df is not None and not root_df.empty:
-        df = root_df.copy()
-        df["time"] = df["timestamp"] - t0
-
-        # Per-core rows: numeric CPU >= 0
-        df_cores = df[df["CPU_num"].notna() & (df["CPU_num"] >= 0)]
-        if df_cores.empty:
+        times, cores, busy = core_matrix(root_df)
+        if not len(cores):
             print("Root log found, but no per-core rows detected (CPU values not numeric).")
         else:
-            # Plot one line per core: %busy = 100 - %idle
-            for core_id, core_df in df_cores.groupby("CPU_num"):
-                ax_pc.plot(core_df["time"], 100.0 - core_df["%idle"], label=f"Core {int(core_id)}")
-
-            ax_pc.set_ylim(0, 100)
-            ax_pc.legend(ncol=4, fontsize=9, loc="upper right")
+            # one cell per sample and core, the samples are sadc's fixed interval apart
+            step = np.median(np.diff(times)) if len(times) > 1 else 1.0
+            extent = [times[0] - t0 - step / 2, times[-1] - t0 + step / 2, -0.5, len(cores) - 0.5]
+            cmap = matplotlib.colormaps["viridis"].with_extremes(over="red", bad="white")
+            im = ax_pc.imshow(busy, aspect="auto", origin="lower", interpolation="nearest", extent=extent,
+                              cmap=cmap, vmin=0, vmax=CPU_SATURATION_PCT)
+            ax_pc.yaxis.set_major_locator(MaxNLocator(integer=True, nbins=16))
+            fig.colorbar(im, ax=ax_pc, extend="max", label="% Busy")
     else:
         print("No root CPU log found; skipping per-core subplot.")
 
     # Save figure
     out = os.path.join(path, "cpu_plot.pdf")
-    plt.savefig(out)
-    printC(f"CPU plot (with per-core subplot) saved to {out}", "magenta", INFO)
-    plt.close(fig)
+    fig.savefig(out)
+    printC(f"CPU plot (with per-core heatmap) saved to {out}", "magenta", INFO)
 
 
 
-def plot_avg_across_runs(run_paths, out_path="avg_metrics.png", dt=0.2):
+def plot_avg_across_runs(run_paths, out_path="avg_metrics.png", dt=0.2, band='std'):
     """
-    Aggregate per-node metrics across runs and plot mean ± std as a shaded band.
-    Logical node = FIRST digit of the numeric id (e.g., x11/x12/x13 -> node '1').
-    Expects each run path to contain a 'csvs/' folder with files like:
-      - xNN.csv      -> goodput from 'bandwidth'
-      - cNN_ss.csv   -> rtt + cwnd (needs columns: time,rtt,cwnd)
+    Aggregate per-node metrics across runs and plot the mean with a shaded band, ± std (`band`='std') or the interquartile range ('iqr').
+    Logical node = position of the node's flow among the data flows of its run (emulation_info['flows']), so hosts of the threaded
+    drivers (c1<ex_idx>, x1<ex_idx>, ...) line up across runs whatever their ids. Per node and run:
+      - receiver csv (xNN)     -> goodput from 'bandwidth'
+      - sender ss csv (cNN_ss) -> rtt + cwnd
+    Every csv is read once (from the result store if the run has one) and folded into streaming statistics on a grid of `dt`
+    seconds from 0 (core/aggregate.py), memory does not grow with the number of runs.
     """
 
     # ---------- helpers ----------
-    def _csv_dirs(run_paths):
-        return [os.path.join(p, "csvs") for p in run_paths if os.path.isdir(os.path.join(p, "csvs"))]
-
-    def _raw_node_id(fname):
-        # matches x12.csv, c12_ss.csv -> "12"
-        m = re.search(r'([cx])(\d+)(?:_ss)?\.csv$', os.path.basename(fname))
-        return m.group(2) if m else None
-
-    def _logical_node(raw_id: str) -> str:
-        # first digit is the client index (1..9)
-        return raw_id[0] if raw_id else None
-
-    def _load_x(path):
-        # time, bandwidth (tolerate missing headers)
+    def _run_nodes(path):
+        # [(logical node, sender, receiver)]
         try:
-            df = pd.read_csv(path)
-            if "time" not in df.columns or "bandwidth" not in df.columns:
-                df = pd.read_csv(path, header=None,
-                                 names=["time","bandwidth","bytes","totalgoodput"])
-        except Exception:
-            df = pd.read_csv(path, header=None,
-                             names=["time","bandwidth","bytes","totalgoodput"])
-        return df[["time","bandwidth"]].dropna().sort_values("time")
-
-    def _load_ss(path):
-        # need time, rtt, cwnd (case-insensitive)
-        df = pd.read_csv(path)
-        df.columns = [c.strip().lower() for c in df.columns]
-        need = ["time","rtt","cwnd"]
-        for n in need:
-            if n not in df.columns:
-                raise KeyError(f"Missing column '{n}' in {path}")
-        return df[need].dropna().sort_values("time")
-
-    def _interp_to_grid(df, tgrid, ycol):
-        s = df.set_index("time")[ycol].sort_index()
-        out = np.full_like(tgrid, np.nan, dtype=float)
-        tmin, tmax = s.index.min(), s.index.max()
-        mask = (tgrid >= tmin) & (tgrid <= tmax)
-        if mask.any():
-            out[mask] = np.interp(tgrid[mask], s.index.values, s.values)
-        return out
-
-    def _mean_std_no_warn(M):
-        # M: (runs, T) possibly with NaNs
-        if M.size == 0:
-            return np.array([]), np.array([])
-        counts = np.sum(np.isfinite(M), axis=0)
-        sums = np.nansum(M, axis=0)
-        mean = np.full(M.shape[1], np.nan)
-        nz = counts > 0
-        mean[nz] = sums[nz] / counts[nz]
-        sq_sums = np.nansum(np.square(M), axis=0)
-        var = np.full(M.shape[1], np.nan)
-        var[nz] = (sq_sums[nz] / counts[nz]) - np.square(mean[nz])
-        var[var < 0] = 0.0
-        std = np.sqrt(var)
-        return mean, std
-
-    # ---------- discover all csv dirs ----------
-    csv_dirs = _csv_dirs(run_paths)
-    if not csv_dirs:
-        raise RuntimeError("No csvs/ directories found under the provided run paths.")
-
-    # ---------- first pass: global time range ----------
-    tmins, tmaxs = [], []
-    for d in csv_dirs:
-        for f in glob.glob(os.path.join(d, "x*.csv")) + glob.glob(os.path.join(d, "c*_ss.csv")):
-            try:
-                df = _load_ss(f) if f.endswith("_ss.csv") else _load_x(f)
-                tmins.append(df["time"].min())
-                tmaxs.append(df["time"].max())
-            except Exception:
+            with open(os.path.join(path, "emulation_info.json"), "r") as fin:
+                flows = json.load(fin)["flows"]
+        except (OSError, ValueError, KeyError):
+            # no emulation_info: the ids in the csv names are all there is
+            ids = [re.match(r"x(\d+)\.csv$", os.path.basename(f)) for f in glob.glob(os.path.join(path, "csvs", "x*.csv"))]
+            return [(m.group(1), f"c{m.group(1)}", f"x{m.group(1)}") for m in ids if m]
+        flows = [flow for flow in flows if flow[-2] not in ("tbf", "netem")]
+        return [(str(i + 1), str(flow[0]), str(flow[1])) for i, flow in enumerate(flows)]
+
+    def _load(path, name, columns):
+        try:
+            df = load_csv(path, name, ["time"] + columns)
+        except (FileNotFoundError, ValueError, pd.errors.EmptyDataError):
+            return None
+        if not set(["time"] + columns).issubset(df.columns):
+            return None
+        return df.dropna(subset=["time"]).sort_values("time")
+
+    def _fold(node, df, metrics):
+        # interpolate every column onto the grid points inside its own time range, one np.interp per column
+        t = df["time"].to_numpy(dtype=float)
+        for metric, column in metrics:
+            y = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+            ok = np.isfinite(y)
+            if ok.sum() < 2:
                 continue
+            tt, yy = t[ok], y[ok]
+            k0, k1 = max(0, int(np.ceil(tt[0] / dt))), int(np.floor(tt[-1] / dt))
+            if k1 - k0 < 1:
+                continue
+            stats[metric].setdefault(node, RunningStats()).update(k0, np.interp(np.arange(k0, k1 + 1) * dt, tt, yy))
 
-    if not tmins:
-        raise RuntimeError("No usable CSV data found.")
-
-    tmin, tmax = max(min(tmins), 0.0), max(tmaxs)
-    n = max(2, int((tmax - tmin) / dt))
-    tgrid = np.linspace(tmin, tmax, n)
-
-    # ---------- collect per-LOGICAL-node series for three metrics ----------
-    per_node = {"goodput": {}, "rtt": {}, "cwnd": {}}
-
-    def _accumulate(metric, node, series):
-        # require at least 2 finite samples to keep
-        if np.isfinite(series).sum() >= 2:
-            per_node[metric].setdefault(node, []).append(series)
+    # ---------- one pass over all runs ----------
+    runs = [p for p in run_paths if os.path.isdir(os.path.join(p, "csvs")) or os.path.isdir(os.path.join(p, "store"))]
+    if not runs:
+        raise RuntimeError("No csvs/ directories found under the provided run paths.")
 
-    for d in csv_dirs:
-        # x*.csv -> goodput (bandwidth)
-        for f in glob.glob(os.path.join(d, "x*.csv")):
-            raw = _raw_node_id(f)
-            node = _logical_node(raw)
-            if not node:
-                continue
-            try:
-                df = _load_x(f)
-                arr = _interp_to_grid(df, tgrid, "bandwidth")
-                _accumulate("goodput", node, arr)
-            except Exception:
-                pass
-
-        # c*_ss.csv -> rtt, cwnd
-        for f in glob.glob(os.path.join(d, "c*_ss.csv")):
-            raw = _raw_node_id(f)
-            node = _logical_node(raw)
-            if not node:
-                continue
-            try:
-                df = _load_ss(f)
-                _accumulate("rtt",  node, _interp_to_grid(df, tgrid, "rtt"))
-                _accumulate("cwnd", node, _interp_to_grid(df, tgrid, "cwnd"))
-            except Exception:
-                pass
-
-    # ---------- compute mean/std per logical node (no warnings) ----------
-    stats = {}
-    for metric, nodes in per_node.items():
-        stats[metric] = {}
-        for node, runs in nodes.items():
-            if not runs:
-                continue
-            M = np.vstack(runs)  # (num_runs, len(tgrid))
-            mean, std = _mean_std_no_warn(M)
-            stats[metric][node] = {"mean": mean, "std": std}
+    stats = {"goodput": {}, "rtt": {}, "cwnd": {}}
+    for path in runs:
+        for node, sender, receiver in _run_nodes(path):
+            df = _load(path, receiver, ["bandwidth"])
+            if df is not None:
+                _fold(node, df, [("goodput", "bandwidth")])
+            df = _load(path, f"{sender}_ss", ["rtt", "cwnd"])
+            if df is not None:
+                _fold(node, df, [("rtt", "rtt"), ("cwnd", "cwnd")])
+
+    if not any(stats.values()):
+        raise RuntimeError("No usable CSV data found.")
 
     # ---------- plot in one tall figure (three stacked panels) ----------
-    fig, axes = plt.subplots(3, 1, figsize=(12, 14), sharex=True)
+    fig = Figure(figsize=(12, 14))
+    axes = fig.subplots(3, 1, sharex=True)
     panels = [
         ("goodput", "Goodput (bandwidth)", "bandwidth"),
         ("rtt",     "RTT",                 "rtt [ms]"),
@@ -553,10 +434,15 @@ def plot_avg_across_runs(run_paths, out_path="avg_metrics.png", dt=0.2):
     for ax, (metric, title, ylabel) in zip(axes, panels):
         nodes = stats.get(metric, {})
         for node in sorted(nodes.keys(), key=lambda x: int(x)):
-            mean = nodes[node]["mean"]
-            std  = nodes[node]["std"]
+            result = nodes[node].result()
+            tgrid = np.arange(len(result["mean"])) * dt
+            mean = result["mean"]
+            if band == "iqr":
+                lower, upper = result["q0.25"], result["q0.75"]
+            else:
+                lower, upper = mean - result["std"], mean + result["std"]
             ax.plot(tgrid, mean, label=f"node {node}")
-            ax.fill_between(tgrid, mean - std, mean + std, alpha=0.2)
+            ax.fill_between(tgrid, lower, upper, alpha=0.2)
         ax.set_title(title)
         ax.set_ylabel(ylabel)
         ax.grid(True, alpha=0.3)
@@ -566,5 +452,4 @@ def plot_avg_across_runs(run_paths, out_path="avg_metrics.png", dt=0.2):
     axes[-1].set_xlabel("time [s]")
     fig.tight_layout()
     fig.savefig(out_path, dpi=150)
-    plt.close(fig)
-    printC(f"Saved {out_path}", "cyan_fill", INFO)
\ No newline at end of file
+    printC(f"Saved {out_path}", "cyan_fill", INFO)
@@ -0,0 +1,220 @@
+import os, sys, ast, glob, json, hashlib, subprocess, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from core.utils import *
+from core.manifest import fingerprint, MANIFEST_NAME
+
+# Incremental build of the aggregate figures (targets declared in aggregate_plots/build.py). Every target is a script run in its
+# own directory of FIGURES_DIR, with the run directories it reads (glob patterns), the targets whose outputs it reads (e.g. the
+# intermediate tables of figure 9) and what it writes. Its digest hashes the contents of the script and the repo modules it
+# imports, its arguments, what it reads of every run and the outputs of its dependencies, and a target is only rebuilt when the
+# digest changed or an output is gone. A dependency rebuilt into the same outputs does not rebuild what depends on it.
+# Independent targets build in parallel, each script in its own process. Hashes are cached by size and mtime in
+# {FIGURES_DIR}/build.json (as in the run manifests), so an up to date build only stats files.
+
+BUILD_VERSION = 1
+STATE_NAME = "build.json"
+LOG_NAME = "build.log"
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# what the figures read of a run: the manifest stands for every parsed csv and the store, runs without one fall back to the csvs
+RUN_FILES = (MANIFEST_NAME, 'emulation_info.json')
+
+class Target:
+    """
+    `script` (relative to the repo) run with `args` from its own output directory. `runs` are glob patterns of the run directories
+    it reads, `deps` the targets it reads the outputs of ('{dep}' in `args` becomes that target's directory) and `outputs` glob
+    patterns of the files it writes.
+    """
+    def __init__(self, name: str, script: str, runs=(), deps=(), outputs=('*.pdf',), args=()):
+        self.name = name
+        self.script = os.path.join(REPO_DIR, script)
+        self.runs = tuple(runs)
+        self.deps = tuple(deps)
+        self.outputs = tuple(outputs)
+        self.args = tuple(args)
+
+    def __repr__(self):
+        return f"Target({self.name})"
+
+def code_files(script: str) -> list:
+    """
+    `script` and, recursively, the modules of the repo (or of the script's directory) it imports.
+    """
+    seen, todo = set(), [os.path.abspath(script)]
+    while todo:
+        file = todo.pop()
+        if file in seen or not os.path.isfile(file):
+            continue
+        seen.add(file)
+        with open(file, 'r') as fin:
+            tree = ast.parse(fin.read(), file)
+        modules = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules += [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules += [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        for module in modules:
+            rel = module.replace('.', '/') + '.py'
+            todo += [os.path.join(REPO_DIR, rel), os.path.join(os.path.dirname(file), rel)]
+    return sorted(seen)
+
+def order(targets: list, only=None) -> list:
+    """
+    `targets` (the `only` names and what they depend on, all by default) with every target after its dependencies.
+    Raises ValueError on unknown names and dependency cycles.
+    """
+    by_name = {t.name: t for t in targets}
+    out, state = [], {}
+    def visit(name, path):
+        if name not in by_name:
+            raise ValueError(f"Unknown target {name}" + (f" (a dependency of {path[-1]})" if path else ""))
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for dep in by_name[name].deps:
+            visit(dep, path + [name])
+        state[name] = 'done'
+        out.append(by_name[name])
+    for name in (only or by_name):
+        visit(name, [])
+    return out
+
+class Builder:
+    """
+    Builds targets into `out_dir` (FIGURES_DIR by default), up to `jobs` at once (FIGURE_JOBS, or one per core).
+    """
+    def __init__(self, targets: list, out_dir=None, jobs=None):
+        self.targets = {t.name: t for t in targets}
+        self.out_dir = out_dir or FIGURES_DIR
+        self.jobs = jobs or FIGURE_JOBS or os.cpu_count() or 1
+        self.lock = threading.Lock()
+        self.state = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(f"{self.out_dir}/{STATE_NAME}", 'r') as fin:
+                state = json.load(fin)
+        except (OSError, ValueError):
+            state = {}
+        if state.get('version') != BUILD_VERSION:
+            state = {'version': BUILD_VERSION, 'targets': {}, 'files': {}}
+        return state
+
+    def _save(self) -> None:
+        with self.lock:
+            os.makedirs(self.out_dir, exist_ok=True)
+            tmp = f"{self.out_dir}/{STATE_NAME}.tmp"
+            with open(tmp, 'w') as fout:
+                json.dump(self.state, fout, indent=1)
+            os.replace(tmp, f"{self.out_dir}/{STATE_NAME}")
+
+    def directory(self, name: str) -> str:
+        return f"{self.out_dir}/{name}"
+
+    def _hash(self, file: str) -> str:
+        with self.lock:
+            old = self.state['files'].get(file)
+        fp = fingerprint(file, old)
+        with self.lock:
+            self.state['files'][file] = fp
+        return fp['sha1']
+
+    def _run_files(self, run: str) -> list:
+        files = [f"{run}/{name}" for name in RUN_FILES if os.path.isfile(f"{run}/{name}")]
+        if not os.path.isfile(f"{run}/{MANIFEST_NAME}"):
+            files += sorted(glob.glob(f"{run}/csvs/*.csv"))
+        return files
+
+    def _output_files(self, target: Target) -> list:
+        directory = self.directory(target.name)
+        return sorted({file for pattern in target.outputs for file in glob.glob(f"{directory}/{pattern}")})
+
+    def outputs(self, target: Target) -> dict:
+        return {os.path.relpath(file, self.directory(target.name)): self._hash(file) for file in self._output_files(target)}
+
+    def digest(self, target: Target) -> str:
+        runs = sorted({run for pattern in target.runs for run in glob.glob(pattern) if os.path.isdir(run)})
+        parts = {
+            'code': {os.path.relpath(file, REPO_DIR): self._hash(file) for file in code_files(target.script)},
+            'args': list(target.args),
+            'runs': {run: {os.path.basename(file): self._hash(file) for file in self._run_files(run)} for run in runs},
+            'deps': {dep: self.state['targets'].get(dep, {}).get('outputs') for dep in target.deps},
+        }
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def up_to_date(self, target: Target, digest: str) -> bool:
+        entry = self.state['targets'].get(target.name)
+        if not entry or entry['digest'] != digest:
+            return False
+        return all(os.path.exists(f"{self.directory(target.name)}/{out}") for out in entry['outputs'])
+
+    def make(self, target: Target, force=False, dry_run=False) -> str:
+        """
+        Build `target` if it is out of date (or `force`), its dependencies must be built. Returns 'up to date', 'stale' (with
+        `dry_run`), 'built' or 'failed' (the script's output is in its {directory}/build.log).
+        """
+        digest = self.digest(target)
+        if not force and self.up_to_date(target, digest):
+            return 'up to date'
+        if dry_run:
+            return 'stale'
+        directory = self.directory(target.name)
+        os.makedirs(directory, exist_ok=True)
+        # stale outputs would pass for this build's
+        for file in self._output_files(target):
+            os.remove(file)
+        args = [arg.format(**{dep: self.directory(dep) for dep in target.deps}) for arg in target.args]
+        env = dict(os.environ, MPLBACKEND='Agg')
+        with open(f"{directory}/{LOG_NAME}", 'w') as log:
+            result = subprocess.run([sys.executable, target.script, *args], cwd=directory, env=env, stdout=log, stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            with self.lock:
+                self.state['targets'].pop(target.name, None)
+            return 'failed'
+        outputs = self.outputs(target)
+        if not outputs:
+            printC(f"{target.name} wrote nothing matching {target.outputs}", "yellow", INFO)
+        with self.lock:
+            self.state['targets'][target.name] = {'digest': digest, 'outputs': outputs}
+        return 'built'
+
+    def build(self, only=None, force=False, dry_run=False) -> dict:
+        """
+        Build the `only` targets (all by default) and their dependencies, independent ones in parallel. Returns {name: status},
+        'skipped' for the targets whose dependencies failed.
+        """
+        pending = {t.name: t for t in order(list(self.targets.values()), only)}
+        status = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while pending or running:
+                for name, target in list(pending.items()):
+                    if any(dep not in status for dep in target.deps):
+                        continue
+                    del pending[name]
+                    if dry_run and any(status[dep] == 'stale' for dep in target.deps):
+                        status[name] = 'stale'
+                        continue
+                    if any(status[dep] in ('failed', 'skipped') for dep in target.deps):
+                        status[name] = 'skipped'
+                        continue
+                    running[executor.submit(self.make, target, force, dry_run)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as e:
+                        printC(f"Building {name} failed: {e}", "red", ERRO)
+                        status[name] = 'failed'
+                    if status[name] == 'failed':
+                        printC(f"{name} failed, see {self.directory(name)}/{LOG_NAME}", "red", ERRO)
+                    else:
+                        printC(f"{name}: {status[name]}", "green", INFO)
+                    if not dry_run:
+                        self._save()
+        return status
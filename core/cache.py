@@ -0,0 +1,135 @@
+import os, hashlib, pickle, threading
+from collections import OrderedDict
+import pandas as pd
+from core.utils import *
+from core import store
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Memoised loading of run frames for the figure scripts, which read the same csvs for every panel, metric and parameter sweep.
+# A frame is kept under a key and the (mtime, size) of the files it was parsed from, so it is reused until one of them changes.
+# In memory the cache is an LRU bounded by the frames' size (FRAME_CACHE_MB); with a spill directory (FRAME_CACHE_DIR) every
+# parsed frame is also written there (parquet, pickle without pyarrow) and a later build, another process, reads it instead of
+# parsing again. Callers get a copy, scripts that modify what they loaded do not touch the cached frame.
+
+class FrameCache:
+    """
+    LRU of DataFrames bounded by `max_bytes` in memory, optionally spilled to `spill_dir`.
+    """
+    def __init__(self, max_bytes: int, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.frames = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def stamp(sources: list) -> tuple:
+        # missing files are part of the stamp too, a frame that failed to load is never cached
+        stamps = []
+        for file in sources:
+            try:
+                st = os.stat(file)
+                stamps.append((file, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append((file, None, None))
+        return tuple(stamps)
+
+    def _spill_file(self, key: tuple, stamp: tuple) -> str:
+        digest = hashlib.sha1(repr((key, stamp)).encode()).hexdigest()
+        return f"{self.spill_dir}/{digest}{'.parquet' if pa is not None else '.pkl'}"
+
+    def _read_spill(self, file: str):
+        try:
+            if file.endswith('.parquet'):
+                return pd.read_parquet(file)
+            with open(file, 'rb') as fin:
+                return pickle.load(fin)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_spill(self, file: str, df: pd.DataFrame) -> None:
+        mkdirp(self.spill_dir)
+        try:
+            if file.endswith('.parquet'):
+                pq.write_table(pa.Table.from_pandas(df), file + ".tmp")
+            else:
+                with open(file + ".tmp", 'wb') as fout:
+                    pickle.dump(df, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(file + ".tmp", file)
+        except (OSError, ValueError, TypeError, pickle.PicklingError):
+            # not every frame converts (mixed object columns), it then only lives in memory
+            remove(file + ".tmp")
+
+    def get(self, key: tuple, sources: list, load) -> pd.DataFrame:
+        """
+        The frame under `key`, parsed with load() when it is not cached for the current state of the `sources` files.
+        """
+        stamp = self.stamp(sources)
+        with self.lock:
+            cached = self.frames.get(key)
+            if cached is not None and cached[0] == stamp:
+                self.frames.move_to_end(key)
+                self.hits += 1
+                return cached[1].copy()
+            self.misses += 1
+        df = None
+        spill = self._spill_file(key, stamp) if self.spill_dir else None
+        if spill is not None and os.path.exists(spill):
+            df = self._read_spill(spill)
+        if df is None:
+            df = load()
+            if spill is not None:
+                self._write_spill(spill, df)
+        self.put(key, stamp, df)
+        return df.copy()
+
+    def put(self, key: tuple, stamp: tuple, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        with self.lock:
+            old = self.frames.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self.frames[key] = (stamp, df, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, _, evicted) = self.frames.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self) -> None:
+        with self.lock:
+            self.frames.clear()
+            self.nbytes = 0
+
+frames = FrameCache(FRAME_CACHE_MB * 2 ** 20, FRAME_CACHE_DIR)
+
+def load_csv(path: str, name: str, columns=None, time_range=None) -> pd.DataFrame:
+    """
+    core.store.load_csv through the cache. `columns` and `time_range` are pushed down to the store as before and are part of
+    the key, so a panel only pays for (and only keeps) the columns and window it reads.
+    """
+    sources = store.csv_sources(path, name)
+    key = ('load_csv', os.path.abspath(path), name, None if columns is None else tuple(sorted(columns)),
+           None if time_range is None else tuple(time_range))
+    return frames.get(key, sources, lambda: store.load_csv(path, name, columns, time_range))
+
+def read_csv(file: str, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_csv(file, **kwargs) through the cache, for scripts that read csvs by their file name.
+    """
+    key = ('read_csv', os.path.abspath(file), repr(sorted(kwargs.items())))
+    return frames.get(key, [file], lambda: pd.read_csv(file, **kwargs))
+
+def cached_file(load, file: str, *args) -> pd.DataFrame:
+    """
+    load(file, *args) through the cache, for a script's own parser of a (possibly archived, see find_raw) raw file.
+    """
+    key = ('file', load.__module__, load.__qualname__, os.path.abspath(file)) + args
+    return frames.get(key, [find_raw(file) or file], lambda: load(file, *args))
@@ -0,0 +1,190 @@
+import os, json, glob, time, sqlite3
+from contextlib import closing
+import pandas as pd
+from core.utils import *
+from core.metrics import network_params
+
+# Catalog of runs (an SQLite file, CATALOG): every run registers itself when its emulation_info.json is written (dump_info) and
+# is marked again once processed. A row holds what figure scripts select runs by, taken from the emulation itself rather than
+# from the directory name: topology, bottleneck rate, base RTT, buffer, AQM, loss, the data flows and their protocol, the link
+# changes during the run, the seed, a status and the artifacts present. find_runs selects runs with one indexed query, so a
+# figure over thousands of runs neither walks the results tree nor probes a path per parameter combination.
+# index_runs (re)registers the runs already on disk under a directory, e.g. the ones recorded before the catalog existed.
+
+CATALOG_VERSION = 1
+# columns find_runs filters on, the rest are JSON
+COLUMNS = ['path', 'name', 'run', 'topology', 'protocol', 'n_flows', 'bw', 'rtt', 'qsize_pkts', 'aqm', 'loss', 'seed', 'status', 'registered']
+JSON_COLUMNS = ['flows', 'network', 'changes', 'artifacts']
+# files and directories of a run dir recorded as its artifacts
+ARTIFACTS = ['emulation_info.json', 'manifest.json', 'summary.json', 'csvs', 'store', 'queues', 'sysstat']
+ARTIFACT_SUFFIXES = ('.pdf', '.png')
+LINK_CHANGES = ('tbf', 'netem')
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY, name TEXT, run INTEGER, topology TEXT, protocol TEXT, n_flows INTEGER, bw REAL, rtt REAL,
+    qsize_pkts INTEGER, aqm TEXT, loss REAL, seed INTEGER, status TEXT, registered REAL,
+    flows TEXT, network TEXT, changes TEXT, artifacts TEXT
+)""",
+    "CREATE INDEX IF NOT EXISTS runs_params ON runs (protocol, aqm, bw, rtt)",
+    "CREATE INDEX IF NOT EXISTS runs_name ON runs (name)",
+]
+
+def _connect(db: str) -> sqlite3.Connection:
+    # the threaded drivers register from many threads at once: WAL plus a generous busy timeout instead of a lock
+    if not db:
+        raise ValueError("No run catalog: set CATALOG in core/config.py or pass db")
+    if not os.path.exists(db):
+        mkdirp(os.path.dirname(db) or '.')
+    conn = sqlite3.connect(db, timeout=60)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= CATALOG_VERSION:
+            return conn
+        # create or migrate under the write lock, checking the version again: the first connections of a new catalog
+        # race each other. Only an older layout is dropped, index_runs registers its runs again
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < CATALOG_VERSION:
+            conn.execute("DROP TABLE IF EXISTS runs")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        conn.commit()
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+def _write(db: str, sql: str, args: list) -> int:
+    # catalog writes never fail a run, index_runs registers what is missing later
+    try:
+        with closing(_connect(db)) as conn, conn:
+            return conn.execute(sql, args).rowcount
+    except (sqlite3.Error, OSError) as e:
+        printC(f"Catalog {db} not updated: {e}", "yellow", INFO)
+        return -1
+
+def _artifacts(path: str) -> list:
+    try:
+        names = sorted(entry.name for entry in os.scandir(path))
+    except OSError:
+        return []
+    return [name for name in names if name in ARTIFACTS or name.endswith(ARTIFACT_SUFFIXES)]
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def describe(path: str, info: dict, status: str) -> dict:
+    """
+    The catalog row of the run in `path` with emulation_info `info`. Runs recorded before emulation_info had 'network' have no
+    link parameters (bw, rtt, qsize_pkts, aqm, loss are None).
+    """
+    path = os.path.abspath(path)
+    flows = [f for f in info.get('flows', []) if f[-2] not in LINK_CHANGES]
+    changes = [{'start': f[4], 'node1': f[0], 'node2': f[1], 'bw': f[-1][1], 'delay': f[-1][2]}
+               for f in info.get('flows', []) if f[-2] in LINK_CHANGES and isinstance(f[-1], (list, tuple)) and len(f[-1]) > 2]
+    network = info.get('network') or []
+    bw, rtt = network_params(info)
+    # the bottleneck is the slowest rate limited link, its buffer and AQM are the run's
+    limited = [link for link in network if _float(link.get('bw'))]
+    bottleneck = min(limited, key=lambda link: float(link['bw'])) if limited else {}
+    losses = [_float(link.get('loss')) or 0.0 for link in network]
+    protocols = list(dict.fromkeys(str(f[-2]) for f in flows))
+    run = os.path.basename(path)
+    return {
+        'path': path,
+        'name': os.path.basename(os.path.dirname(path)),
+        'run': int(run[3:]) if run.startswith('run') and run[3:].isdigit() else None,
+        'topology': info.get('topology'),
+        'protocol': '+'.join(protocols) or None,
+        'n_flows': len(flows),
+        'bw': bw,
+        'rtt': rtt,
+        'qsize_pkts': int(bottleneck['qsize'] / 1500) if bottleneck.get('qsize') else None,
+        'aqm': bottleneck.get('aqm'),
+        'loss': max(losses) if losses else None,
+        'seed': info.get('seed'),
+        'status': status,
+        'registered': time.time(),
+        'flows': json.dumps(flows),
+        'network': json.dumps(network),
+        'changes': json.dumps(changes),
+        'artifacts': json.dumps(_artifacts(path)),
+    }
+
+def register(path: str, info=None, status='recorded', db=None) -> None:
+    """
+    Add or replace the run in `path` in the catalog, `info` being its emulation_info (read from the run if not given).
+    """
+    db = db or CATALOG
+    if not db:
+        return
+    if info is None:
+        with open(f"{path}/emulation_info.json", 'r') as fin:
+            info = json.load(fin)
+    row = describe(path, info, status)
+    columns = COLUMNS + JSON_COLUMNS
+    _write(db, f"INSERT OR REPLACE INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+           [row[c] for c in columns])
+
+def set_status(path: str, status: str, db=None) -> None:
+    """
+    Set the status of a registered run (registering it if it is not) and refresh its artifacts.
+    """
+    db = db or CATALOG
+    if not db:
+        return
+    path = os.path.abspath(path)
+    updated = _write(db, "UPDATE runs SET status = ?, artifacts = ? WHERE path = ?", [status, json.dumps(_artifacts(path)), path])
+    if updated == 0 and os.path.exists(f"{path}/emulation_info.json"):
+        register(path, status=status, db=db)
+
+def find_runs(root=None, db=None, **filters) -> pd.DataFrame:
+    """
+    Registered runs below the directory `root` (all of them without), one row each with the COLUMNS and the JSON_COLUMNS
+    decoded, sorted by path. Every keyword filters a column on a value, or on any of a list of values, e.g.
+    find_runs(path, protocol=['cubic', 'bbr'], bw=100, aqm='fifo'). Raises ValueError without a catalog (CATALOG or `db`).
+    """
+    unknown = set(filters) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot filter runs on {sorted(unknown)}, the catalog has {COLUMNS}")
+    where, args = [], []
+    if root is not None:
+        # a range on the primary key rather than LIKE, which cannot use the index
+        prefix = os.path.abspath(root).rstrip('/') + '/'
+        where.append("path >= ? AND path < ?")
+        args += [prefix, prefix[:-1] + '0']
+    for column, value in filters.items():
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        where.append(f"{column} IN ({', '.join('?' * len(values))})")
+        args += values
+    query = f"SELECT * FROM runs {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY path"
+    with closing(_connect(db or CATALOG)) as conn:
+        df = pd.read_sql_query(query, conn, params=args)
+    for column in JSON_COLUMNS:
+        df[column] = df[column].map(json.loads)
+    return df
+
+def index_runs(root: str, db=None) -> int:
+    """
+    Register every run under `root` (a directory with an emulation_info.json), marked 'processed' if it has a manifest, and
+    drop the catalog entries under `root` whose run is gone. Returns the number of runs registered, raises ValueError without
+    a catalog.
+    """
+    db = db or CATALOG
+    if not db:
+        raise ValueError("No run catalog: set CATALOG in core/config.py or pass db")
+    found = sorted(os.path.dirname(os.path.abspath(f)) for f in glob.glob(f"{root}/**/emulation_info.json", recursive=True))
+    for path in found:
+        try:
+            register(path, status='processed' if os.path.exists(f"{path}/manifest.json") else 'recorded', db=db)
+        except (OSError, ValueError) as e:
+            printC(f"Cannot register {path}: {e}", "yellow", INFO)
+    stale = set(find_runs(root, db)['path']) - set(found)
+    if stale:
+        with closing(_connect(db)) as conn, conn:
+            conn.executemany("DELETE FROM runs WHERE path = ?", [[path] for path in stale])
+    return len(found)
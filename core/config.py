@@ -23,3 +23,48 @@ COPA_INSTALL_FOLDER = f"{PARENT_DIR}/CC/copa-kernel"
 SS_PATH = f"{PARENT_DIR}/core/ss"
 
 
+
+# Format monitor samples are converted to at the end of a run: 'csv' (queues/<iface>.txt) or 'parquet' (needs pyarrow)
+SAMPLES_FORMAT = 'csv'
+
+# How sender tcp_info is collected: 'script' (ss scripts in core/ss) or 'sock_diag' (netlink, through the MonitorService)
+SS_COLLECTOR = 'script'
+
+# Compression of raw collector output (ss scripts, node outputs, queue csvs): None, 'gzip' or 'zstd' (needs the zstd binary and zstandard)
+RAW_COMPRESSION = None
+RAW_COMPRESSION_LEVEL = 3
+# Compression raw outputs are archived with once they are parsed (instead of being deleted), None keeps them as they are
+ARCHIVE_COMPRESSION = 'gzip'
+
+# Parse every flow's outputs (and follow the ss script files) in a separate process while the emulation is still running,
+# process_raw_outputs then only handles what the live parser did not finish
+LIVE_PARSING = True
+
+# Per-run diagnostic plots (plot_all_mn): series are decimated to what an axis of PLOT_DPI can show ('minmax' keeps the extremes
+# of every pixel column, 'lttb' the largest-triangle points, None plots every sample). With PLOT_RASTERIZE the line layers that
+# had to be decimated are also rasterised at PLOT_DPI (smaller PDFs that open faster, but slower to write), the rest stays vector
+PLOT_DECIMATION = 'minmax'
+PLOT_RASTERIZE = False
+PLOT_DPI = 200
+# Processes that render the per-run plots of the threaded drivers (core/plot_pool.py), independent of their emulation threads
+PLOT_JOBS = 2
+
+# process_raw_outputs also gathers csvs/ and queues/ into one parquet file per table in store/ (needs pyarrow), read with core.store.
+# Without KEEP_CSVS the csvs are deleted once they are in the store
+RESULT_STORE = True
+KEEP_CSVS = True
+
+# process_raw_outputs also writes {run}/summary.json, the per-run and per-flow metrics the figure scripts aggregate (core/metrics.py)
+RUN_SUMMARY = True
+
+# SQLite catalog every run registers into when its emulation_info.json is written, queried with core.catalog.find_runs (None: off)
+CATALOG = f"{HOME_DIR}/cctestbed/catalog.db"
+
+# Figure scripts load run frames through core/cache.py: parsed frames are kept while their files are unchanged, up to
+# FRAME_CACHE_MB in memory (least recently used first out) and, with FRAME_CACHE_DIR, also spilled to disk for later builds
+FRAME_CACHE_MB = 1024
+FRAME_CACHE_DIR = None
+
+# aggregate_plots/build.py builds the figures into FIGURES_DIR (one directory per target), FIGURE_JOBS at once (None: one per core)
+FIGURES_DIR = f"{HOME_DIR}/cctestbed/figures"
+FIGURE_JOBS = None
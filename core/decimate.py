@@ -0,0 +1,85 @@
+import numpy as np
+
+# Shape-preserving downsampling of time series before they are plotted. A 300 s run sampled every 10 ms has far more points
+# than an axis has pixel columns, so only a few points per column can ever be seen: min_max keeps the extremes of every
+# column (peaks and drops survive exactly), lttb the point of every bucket that spans the largest triangle with its neighbours.
+
+def _floats(x, y) -> tuple:
+    return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+def _finite(x, y) -> np.ndarray:
+    # indices of the points with a finite x and y, in x order
+    keep = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(keep) > 1 and (np.diff(x[keep]) < 0).any():
+        keep = keep[np.argsort(x[keep], kind='stable')]
+    return keep
+
+def _min_max(x, y, bins: int) -> np.ndarray:
+    if len(x) <= 2 * bins or x[-1] == x[0]:
+        return np.arange(len(x))
+    column = np.minimum(((x - x[0]) * (bins / (x[-1] - x[0]))).astype(np.int64), bins - 1)
+    order = np.lexsort((y, column))
+    sorted_columns = column[order]
+    starts = np.flatnonzero(np.r_[True, sorted_columns[1:] != sorted_columns[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    return np.unique(np.concatenate([order[starts], order[ends], [0, len(x) - 1]]))
+
+def min_max(x, y, bins: int) -> tuple:
+    """
+    Keep the first and last point and the minimum and maximum of each of `bins` equal-width x columns, in x order.
+    """
+    x, y = _floats(x, y)
+    keep = _finite(x, y)
+    keep = keep[_min_max(x[keep], y[keep], bins)]
+    return x[keep], y[keep]
+
+def _lttb(x, y, n_out: int) -> np.ndarray:
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def lttb(x, y, n_out: int) -> tuple:
+    """
+    Largest-Triangle-Three-Buckets: `n_out` points of the series, the first and last one included.
+    """
+    x, y = _floats(x, y)
+    keep = _finite(x, y)
+    keep = keep[_lttb(x[keep], y[keep], n_out)]
+    return x[keep], y[keep]
+
+def decimate(x, y, bins: int, method='minmax') -> tuple:
+    """
+    (x, y) reduced to what `bins` pixel columns can show with `method` ('minmax' or 'lttb', None keeps every point).
+    A series that fits in `bins` columns is returned as it is. Otherwise NaN gaps (e.g. a flow that stopped) are kept as
+    one NaN point between the points decimation kept on either side, so they are not drawn as connecting lines.
+    """
+    if method is None or len(x) <= 2 * bins:
+        return np.asarray(x), np.asarray(y)
+    if method == 'minmax':
+        pick = lambda fx, fy: _min_max(fx, fy, bins)
+    elif method == 'lttb':
+        pick = lambda fx, fy: _lttb(fx, fy, 2 * bins)
+    else:
+        raise ValueError(f"Unknown decimation method {method}")
+    x, y = _floats(x, y)
+    finite = np.isfinite(x) & np.isfinite(y)
+    keep = _finite(x, y)
+    keep = keep[pick(x[keep], y[keep])]
+    if finite.all():
+        return x[keep], y[keep]
+    # points with a different count of non-finite points before them lie on either side of a gap
+    gap = np.cumsum(~finite)[keep]
+    breaks = np.flatnonzero(np.diff(gap) != 0) + 1
+    return np.insert(x[keep], breaks, x[keep][breaks]), np.insert(y[keep], breaks, np.nan)
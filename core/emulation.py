@@ -1,10 +1,15 @@
 from core.utils import *
 from core.monitor import *
+from core.tcp_probe import TcpProbeTracer
+from core.live_parser import LiveParser
+from core.catalog import register
 from multiprocessing import Process
 from core.config import *
 import mininet
 import time
 import json
+import re
+import subprocess
 import threading 
 def ifconfig_set_state(iface: str, state: str) -> None:
     # state: "down" or "up"
@@ -30,6 +35,18 @@ class Emulation:
         self.call_second = []
         self.path = path
         self.qmonitors = []
+        self.monitor_interval = 0.1
+        self.monitor_service = None
+        self.adaptive = None
+        self.ss_collector = SS_COLLECTOR
+        self.ss_targets = []
+        # ss script output file by node, for stop_ss
+        self.ss_scripts = {}
+        self.tcp_probe_ports = None
+        self.live_parsing = LIVE_PARSING
+        self.parsed_flows = []
+        self.epoch = None
+        self.flow_start_times = {}
         self.start_time = 0
         self.orca_flows_counter = 0
         self.sage_flows_counter = 0
@@ -364,31 +381,75 @@ class Emulation:
             #printC(host.waitOutput(verbose = True), "red", DEBUG)
             output = host.waitOutput(verbose = True)
             mkdirp(self.path)
-            with open( f"{self.path}/{node_name}_output.txt", 'w') as fout:
+            with open_raw(f"{self.path}/{node_name}_output.txt", "wt") as fout:
                 fout.write(output)
+            # the node is done, so is its tcp_info: close the sock_diag file now so the flow can be parsed before the run ends
+            key = f"{self.path}/{node_name}_ss"
+            if key in self.ss_targets:
+                self.ss_targets.remove(key)
+                monitor_service.remove(key, fmt=None)
+            # same for the ss script, which would otherwise append to the file after the live parse
+            if node_name in self.ss_scripts:
+                self.stop_ss(node_name)
+            if live:
+                live.node_finished(node_name, self.flow_start_times)
+
+        def sleep_until(offset: float) -> None:
+            """
+            Sleep until `offset` seconds after the experiment epoch, so every start and traffic change is on the epoch's time axis.
+            """
+            time.sleep(max(0.0, self.epoch['monotonic'] + offset - time.monotonic()))
 
         def host_thread(call: Command) -> None:
             """
             These threads are used to start the receivers at a specific time, independent of other flows. 
             """
-            time.sleep(call.waiting_time)
+            sleep_until(call.waiting_time)
             call.command(*call.params)
+            self.flow_start_times[call.node] = time.monotonic() - self.epoch['monotonic']
             t = threading.Thread(target=wait_thread, args=(call.node,))
             t.start()
             wait_threads.append(t)
 
         def traffic_change_thread(call: Command) -> None:
-            time.sleep(call.waiting_time)
+            sleep_until(call.waiting_time)
             call.command(*call.params)
 
+        # time zero of every monitor, parser and flow start of this run, saved in emulation_info.json by dump_info.
+        # Taken before call_first so ss scripts started there already know where the adaptive sampling windows are
+        self.epoch = new_epoch()
+
+        # taken before any host_thread runs start_ss: only the main thread may start the sampling process (MonitorService.start),
+        # the threaded drivers start it in __main__
+        monitor_service = MonitorService.get() if self.qmonitors or self.ss_collector == 'sock_diag' else None
+        self.monitor_service = monitor_service
+
+        live = None
+        if self.live_parsing:
+            live = LiveParser(self.path, self.flow_list(), self.epoch['realtime'])
+            live.start()
+
         for call in self.call_first:
             call.command(*call.params)
             t = threading.Thread(target=wait_thread, args=(call.node,))
             t.start()
             wait_threads.append(t)
 
-        for monitor in self.qmonitors:
-            monitor.start()
+        schedule = self.queue_schedule()
+        for iface, netns_pid in self.qmonitors:
+            try:
+                monitor_service.add_queue(f"{self.path}/queues/{iface}", iface, f"{self.path}/queues", self.monitor_interval, netns_pid, self.epoch['monotonic'], schedule)
+            except Exception as e:
+                printC(f"Could not monitor {iface}: {e}", "red", ERRO)
+
+        tracer = None
+        if self.tcp_probe_ports:
+            try:
+                tracer = TcpProbeTracer(self.path, self.tcp_probe_ports, self.epoch['monotonic'])
+                tracer.start_tracing()
+            except Exception as e:
+                printC(f"Could not start tcp_probe tracing: {e}", "red", ERRO)
+                tracer = None
 
         if self.sysstat:
             start_sysstat(1,self.sysstat_length,self.path) 
@@ -417,14 +478,19 @@ class Emulation:
         #here we wait untill all the waitOutput threads are finished, indicating that all flows are done
         for t in wait_threads:
             t.join()
+        if live:
+            self.parsed_flows = live.stop()
 
         if self.pcap:
             stop_tcpdump()  
         printC("All flows have finished", "green_fill", ALL)
         
-        for monitor in self.qmonitors:
-            if monitor is not None:
-                monitor.terminate()
+        for iface, netns_pid in self.qmonitors:
+            monitor_service.remove(f"{self.path}/queues/{iface}")
+        for key in self.ss_targets:
+            monitor_service.remove(key, fmt=None)
+        if tracer:
+            tracer.stop_tracing()
                 
         if self.sysstat:
             if any("r2a" in config.node1 for config in self.network_config):
@@ -434,20 +500,84 @@ class Emulation:
 
 
     def set_monitors(self, monitors, interval_sec=0.1):
+        """
+        Queue monitors are registered with the shared MonitorService when the emulation runs, one (iface, netns_pid) per entry.
+        Switches live in the root namespace, any other node (routers, hosts) is sampled from inside its own namespace.
+        """
         if "sysstat" in monitors:
             self.sysstat = True
             monitors.remove("sysstat")
+        self.monitor_interval = interval_sec
         for monitor in monitors:
             node, interface = monitor.split('-')
-            if 's' in node:
-                iface = f"{node}-{interface}"
-                monitor = Process(target=monitor_qlen, args=(iface, interval_sec,f"{self.path}/queues"))
-                self.qmonitors.append(monitor)
-            elif 'r' in node:
-                iface = f"{node}-{interface}"
-                mininode = self.network.get(node)
-                monitor = Process(target=monitor_qlen_on_router, args=(iface, mininode, interval_sec,f"{self.path}/queues"))
-                self.qmonitors.append(monitor)
+            iface = f"{node}-{interface}"
+            mininode = self.network.get(node)
+            self.qmonitors.append((iface, mininode.pid if mininode.inNamespace else None))
+
+    def set_adaptive_sampling(self, fast_interval_sec=0.001, ss_slow_interval_sec=0.1, ss_fast_interval_sec=0.002, before_sec=0.5, after_sec=2.0):
+        """
+        Sample queues every `fast_interval_sec` and ss every `ss_fast_interval_sec` from `before_sec` before to `after_sec` after
+        every tbf/netem change of the traffic config, and at the steady state rate (set_monitors interval, `ss_slow_interval_sec`) otherwise.
+        """
+        self.adaptive = {'fast_interval_sec': fast_interval_sec, 'ss_slow_interval_sec': ss_slow_interval_sec, 'ss_fast_interval_sec': ss_fast_interval_sec,
+                         'before_sec': before_sec, 'after_sec': after_sec}
+
+    def set_tcp_probe(self, sports=(11111, 4444, 5555)) -> None:
+        """
+        Record every tcp:tcp_probe event (per ACK cwnd, ssthresh, srtt) of sender sockets with a source port in `sports`:
+        11111 is the iperf3 client port, 4444 and 5555 the orca and sage/athena senders. Needs tracefs.
+        """
+        self.tcp_probe_ports = tuple(sports)
+
+    def change_times(self) -> list:
+        """
+        Offsets from the epoch of the link changes scheduled by configure_traffic.
+        """
+        return sorted(call.waiting_time for call in self.call_second if call.node == 'TBF')
+
+    def queue_schedule(self):
+        if not self.adaptive:
+            return None
+        return SamplingSchedule(self.monitor_interval, self.adaptive['fast_interval_sec'], self.change_times(), self.adaptive['before_sec'], self.adaptive['after_sec'])
+
+    def ss_schedule(self, interval: float):
+        if not self.adaptive:
+            return SamplingSchedule(interval)
+        return SamplingSchedule(self.adaptive['ss_slow_interval_sec'], self.adaptive['ss_fast_interval_sec'], self.change_times(), self.adaptive['before_sec'], self.adaptive['after_sec'])
+
+    def start_ss(self, node, interval: float, script='ss_script.sh', sports=(), color="blue") -> None:
+        """
+        Start collecting tcp_info on a sender, with the ss script `script` or, if self.ss_collector is 'sock_diag', over netlink from the MonitorService.
+        `sports` is the source port filter, the iperf3 script filters on 11111 to leave out the control socket.
+        """
+        if self.ss_collector == 'sock_diag':
+            key = f"{self.path}/{node.name}_ss"
+            self.monitor_service.add_sock(key, node.name, self.path, interval, node.pid, self.epoch['monotonic'], self.ss_schedule(interval), sports)
+            self.ss_targets.append(key)
+            return
+        schedule = self.ss_schedule(interval)
+        windows = schedule.windows_arg(self.epoch['realtime'])
+        args = f"{schedule.slow_sec} {raw_path(f'{self.path}/{node.name}_ss.csv')}" + (f" {schedule.fast_sec} {windows}" if windows else "")
+        sscmd = f"{SS_PATH}/{script} {args} &"
+        if RAW_COMPRESSION:
+            sscmd = f"SS_COMPRESS='{RAW_COMPRESSORS[RAW_COMPRESSION].format(level=RAW_COMPRESSION_LEVEL)}' {sscmd}"
+        printC(f"Sending command '{sscmd}' to host {node.name}", color, ALL)
+        node.cmd(sscmd)
+        self.ss_scripts[node.name] = raw_path(f'{self.path}/{node.name}_ss.csv')
+
+    def stop_ss(self, node_name: str, timeout=5.0) -> None:
+        """
+        Stop the ss script of `node_name` and wait until it is gone. On SIGTERM the script writes what it buffered, so the file is
+        complete once this returns. The script is found by its output file, unique to the node and the run.
+        """
+        pattern = re.sub(r'([][\\.^$*+?(){}|])', r'\\\1', self.ss_scripts.pop(node_name))
+        subprocess.run(['pkill', '-TERM', '-f', pattern], check=False)
+        deadline = time.monotonic() + timeout
+        while subprocess.run(['pgrep', '-f', pattern], stdout=subprocess.DEVNULL).returncode == 0:
+            if time.monotonic() > deadline:
+                printC(f"The ss script of {node_name} did not stop within {timeout}s", "red", ERRO)
+                return
+            time.sleep(0.02)
 
     def start_iperf_leocc_client(self, node_name: str, destination_name: str, duration: int, protocol: str, monitor_interval=0.1, port=5201):
         """
@@ -457,9 +587,7 @@ class Emulation:
         """
         node = self.network.get(node_name)
 
-        sscmd = f"{SS_PATH}/ss_script_iperf3.sh 0.01 {self.path}/{node.name}_ss.csv &"
-        printC(f'Sending command {sscmd} to host {node.name}', "red", ALL)
-        node.cmd(sscmd)
+        self.start_ss(node, 0.01, 'ss_script_iperf3.sh', (11111,), "red")
 
         monitor_ping_cmd = f"{LEOCC_INSTALL_FOLDER}/leocc/live_network/monitor_ping {self.network.get(destination_name).IP()} > {self.path}/{node.name}_ping.txt &"
         printC(f'Sending command {monitor_ping_cmd} to host {node.name}', "yellow", ALL)
@@ -486,9 +614,7 @@ class Emulation:
         """
         node = self.network.get(node_name)
 
-        sscmd = f"{SS_PATH}/ss_script_iperf3.sh 0.01 {self.path}/{node.name}_ss.csv &"
-        printC(f'Sending command {sscmd} to host {node.name}', "blue", ALL)
-        node.cmd(sscmd)
+        self.start_ss(node, 0.01, 'ss_script_iperf3.sh', (11111,), "blue")
 
         iperfCmd = f"iperf3 -p {port} --cport=11111 -i {monitor_interval} -C {protocol} --json -t {duration} -c {self.network.get(destination_name).IP()}"     
         printC(f'Sending command {iperfCmd} to host {node.name}', "blue", ALL)
@@ -543,9 +669,7 @@ class Emulation:
         """
         node = self.network.get(node_name)
         
-        sscmd = f"./core/ss/ss_script.sh 0.1 {(self.path + '/' + node.name + '_ss.csv')} &"
-        printC(f"Sending command '{sscmd}' to host {node.name}", "green", ALL)
-        node.cmd(sscmd)
+        self.start_ss(node, 0.1, color="green")
 
         orcacmd = f"sudo -u {USERNAME} EXPERIMENT_PATH={self.path} {ORCA_INSTALL_FOLDER}/sender.sh {port} {self.orca_flows_counter} {duration} {ORCA_INSTALL_FOLDER}"  
         printC(f"Sending command '{orcacmd}' to host {node.name}", "green", ALL)
@@ -564,9 +688,7 @@ class Emulation:
 
     def start_sage_sender(self, node_name, duration, port=5555):
         node = self.network.get(node_name)
-        sscmd = f"{PARENT_DIR}/core/ss/ss_script.sh 0.1 {(self.path + '/' + node.name + '_ss.csv')} &"
-        printC(f"Sending command '{sscmd}' to host {node.name}", "magenta", ALL)
-        node.cmd(sscmd)
+        self.start_ss(node, 0.1, color="magenta")
 
         sagecmd = f"sudo -u {USERNAME} {SAGE_INSTALL_FOLDER}/sender.sh {port} {(self.idx if self.idx else '')}{self.sage_flows_counter} {duration} {SAGE_INSTALL_FOLDER} {HOME_DIR}/venvpy38"#  |& tee -a {self.path}/{node.name}_sage_sender_{(self.idx if self.idx else '')}{self.sage_flows_counter}.txt &"
         printC(f"Sending command '{sagecmd}' to host {node.name}", "magenta", ALL)
@@ -576,9 +698,7 @@ class Emulation:
 
     def start_athena_sender(self, node_name, duration, port=5555):
         node = self.network.get(node_name)
-        sscmd = f"{PARENT_DIR}/core/ss/ss_script.sh 0.1 {(self.path + '/' + node.name + '_ss.csv')} &"
-        printC(f"Sending command '{sscmd}' to host {node.name}", "cyan", ALL)
-        node.cmd(sscmd)
+        self.start_ss(node, 0.1, color="cyan")
 
         sagecmd = f"sudo -u {USERNAME} {SAGE_INSTALL_FOLDER}/sender_athena.sh {port} {(self.idx if self.idx else '')}{self.sage_flows_counter} {duration} {SAGE_INSTALL_FOLDER} {HOME_DIR}/venvpy38"# |& tee -a {self.path}/{node.name}_sage_sender_{(self.idx if self.idx else '')}{self.sage_flows_counter}.txt &"
         printC(f"Sending command '{sagecmd}' to host {node.name}", "cyan", ALL)
@@ -652,14 +772,34 @@ class Emulation:
         printC(f"Sending command '{cmd}' to host {node.name}", "blue", ALL)
         node.sendCmd(cmd)
 
-    def dump_info(self):
-        emulation_info = {}
-        emulation_info['topology'] = str(self.network.topo)
+    def flow_list(self) -> list:
+        """
+        The emulation_info['flows'] entries: source, destination, their IPs, start, duration, protocol, params.
+        """
         flows = []
         for config in self.traffic_config:
             flow = [config.source, config.dest, self.network.get(config.source).IP(), self.network.get(config.dest).IP(), config.start, config.duration, config.protocol, config.params]
             flows.append(flow)
-        emulation_info['flows'] = flows
+        return flows
+
+    def dump_info(self):
+        emulation_info = {}
+        emulation_info['topology'] = str(self.network.topo)
+        emulation_info['flows'] = self.flow_list()
+        # link settings (bw in Mbps, delay in ms) the run summary derives bottleneck rate and base RTT from (core/metrics.py)
+        emulation_info['network'] = [dict(config._asdict()) for config in self.network_config or []]
+        # the threaded drivers seed their random choices with the emulation index
+        emulation_info['seed'] = self.idx
+        if self.epoch:
+            emulation_info['epoch'] = self.epoch
+            emulation_info['flow_start_times'] = self.flow_start_times
+        if self.parsed_flows:
+            emulation_info['parsed_flows'] = self.parsed_flows
+        if self.tcp_probe_ports:
+            emulation_info['tcp_probe_ports'] = self.tcp_probe_ports
+        if self.adaptive:
+            emulation_info['adaptive_sampling'] = dict(self.adaptive, change_times=self.change_times())
         with open(f"{self.path}/emulation_info.json", 'w') as fout:
             json.dump(emulation_info,fout)
+        register(self.path, emulation_info)
 
@@ -0,0 +1,309 @@
+import os, glob, importlib, traceback
+from abc import ABC, abstractmethod
+from multiprocessing import get_context, current_process
+from core.parsers import *
+from core.utils import *
+from core.tcp_probe import parse_tcp_probe_dir
+from core.manifest import Manifest, fingerprint
+from core.store import has_csv
+
+# Registry of per-protocol flow parsers. Every FlowParser subclass names the protocol families it handles (substrings of the
+# flow's protocol, emulation_info['flows'][i][-2]) and how one end's output is read; FlowParser.parse does the file handling
+# all of them share. A new CC is one @register'd class, parse_flows runs the flows of a run on a process pool.
+# Raw outputs are never deleted: once parsed and their collectors stopped they are archived (compress_raw) and the run's
+# manifest (core/manifest.py) records what every flow was parsed from, so processing a run again only re-parses flows whose
+# inputs or parser version changed.
+
+PARSERS = []
+
+def register(cls):
+    """
+    Class decorator adding a FlowParser to the registry. Parsers are matched in registration order.
+    """
+    PARSERS.append(cls())
+    return cls
+
+def parser_modules() -> list:
+    """
+    Modules that register parsers of their own (a driver's, a test's). Parser processes come from a forkserver and do not
+    inherit this process' registry, they import these (import_parsers) before parsing.
+    """
+    return sorted({type(parser).__module__ for parser in PARSERS} - {__name__, '__main__'})
+
+def import_parsers(modules: list) -> None:
+    for module in modules:
+        importlib.import_module(module)
+
+def parser_for(protocol: str) -> 'FlowParser':
+    for parser in PARSERS:
+        if any(family in protocol for family in parser.protocols):
+            return parser
+    return DEFAULT_PARSER
+
+def parse_sender_ss(path: str, sender: str, start_time: float, epoch=None, follower=None) -> None:
+    """
+    csvs/{sender}_ss.csv from whichever collector ran: the sock_diag samples ({sender}_ss.bin) or the ss script text,
+    the latter from the columns `follower` (an SsFollower) already parsed during the run if there is one.
+    """
+    if os.path.exists(f"{path}/{sender}_ss.bin"):
+        if not parse_ss_samples_to_csv(f"{path}/{sender}_ss.bin", f"{path}/csvs/{sender}_ss.csv"):
+            raise ValueError(f"No usable tcp_info samples in {path}/{sender}_ss.bin")
+    elif follower is not None:
+        try:
+            cols = follower.columns()
+        except (OSError, ValueError, EOFError) as e:
+            printC(f"Could not parse the ss output of {sender} in {path}: {e}", "red", ERRO)
+            raise
+        if not ss_columns_to_csv(cols, f"{path}/csvs/{sender}_ss.csv", start_time, epoch):
+            raise ValueError(f"No ss samples in {path}/{sender}_ss.csv")
+    else:
+        # pool workers and the live parser are daemonic and cannot start a pool of their own, they parse on one core
+        if not parse_ss_to_csv(f"{path}/{sender}_ss.csv", f"{path}/csvs/{sender}_ss.csv", start_time, epoch, 1 if current_process().daemon else None):
+            raise ValueError(f"No ss samples in {path}/{sender}_ss.csv")
+
+def iperf_to_csvs(path: str, node: str, start_time: float) -> None:
+    """
+    csvs/{node}.csv from the first stream of an iperf3 output and, for runs with parallel streams,
+    csvs/{node}_streams.csv (every stream) and csvs/{node}_sum.csv (the aggregate).
+    """
+    streams, total = parse_iperf_json_streams(f"{path}/{node}_output.txt", start_time)
+    streams[streams['stream'] == 0].drop(columns='stream').to_csv(f"{path}/csvs/{node}.csv", index=False)
+    if streams['stream'].nunique() > 1:
+        streams.to_csv(f"{path}/csvs/{node}_streams.csv", index=False)
+        total.to_csv(f"{path}/csvs/{node}_sum.csv", index=False)
+
+class FlowParser(ABC):
+    """
+    Parses the raw outputs of both ends of one flow into {path}/csvs. `sender_csv`/`receiver_csv` are the csv names,
+    `sender_ss` adds csvs/{sender}_ss.csv from the ss collector. Bump `version` whenever the csvs a parser writes change,
+    runs processed by an older version are then re-parsed. Subclasses implement read_output.
+    """
+    protocols = ()
+    sender_csv = "{node}.csv"
+    receiver_csv = "{node}.csv"
+    sender_ss = False
+    version = 1
+
+    @abstractmethod
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        """
+        The csv of one end from its raw output `file`, times relative to the flow's `start_time` (or to `epoch`).
+        """
+
+    def ident(self) -> str:
+        return f"{type(self).__name__}/{self.version}"
+
+    def inputs(self, sender: str, receiver: str) -> list:
+        """
+        Raw files the flow is parsed from, relative to the run. The outputs of both ends come first and are required.
+        """
+        files = [f"{sender}_output.txt", f"{receiver}_output.txt"]
+        if self.sender_ss:
+            files += [f"{sender}_ss.bin", f"{sender}_ss.csv"]
+        return files
+
+    def outputs(self, sender: str, receiver: str) -> list:
+        files = [f"csvs/{self.sender_csv.format(node=sender)}", f"csvs/{self.receiver_csv.format(node=receiver)}"]
+        if self.sender_ss:
+            files.append(f"csvs/{sender}_ss.csv")
+        return files
+
+    def parse_end(self, path: str, node: str, csv_name: str, start_time: float, epoch=None) -> None:
+        df = self.read_output(f"{path}/{node}_output.txt", start_time, epoch)
+        df.to_csv(f"{path}/csvs/{csv_name}", index=False)
+
+    def parse(self, path: str, flow: list, start_time: float, epoch=None, follower=None) -> None:
+        """
+        `follower` is the SsFollower of the sender's ss file when the flow was parsed live (core/live_parser.py).
+        """
+        sender, receiver = str(flow[0]), str(flow[1])
+        self.parse_end(path, sender, self.sender_csv.format(node=sender), start_time, epoch)
+        if self.sender_ss:
+            parse_sender_ss(path, sender, start_time, epoch, follower)
+        self.parse_end(path, receiver, self.receiver_csv.format(node=receiver), start_time, epoch)
+
+@register
+class NoOutputParser(FlowParser):
+    # tcpdatagen only generates load and tbf/netem entries are link changes, nothing to parse
+    protocols = ('datagen', 'tbf', 'netem')
+
+    def inputs(self, sender: str, receiver: str) -> list:
+        return []
+
+    def outputs(self, sender: str, receiver: str) -> list:
+        return []
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        return pd.DataFrame()
+
+    def parse(self, path: str, flow: list, start_time: float, epoch=None, follower=None) -> None:
+        pass
+
+@register
+class OrcaParser(FlowParser):
+    protocols = ('orca',)
+    sender_ss = True
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        return parse_orca_output(file, start_time)
+
+@register
+class GenericCCParser(FlowParser):
+    # the sender log carries cwnd and rtt, so it takes the place of the ss csv
+    protocols = ('genericcc',)
+    sender_csv = "{node}_ss.csv"
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        return parse_genericcc_output(file, start_time)
+
+@register
+class AuroraParser(FlowParser):
+    protocols = ('aurora',)
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        return parse_aurora_output(file, start_time)
+
+@register
+class AstraeaParser(FlowParser):
+    protocols = ('astraea',)
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        return parse_astraea_output(file, start_time, epoch)
+
+@register
+class VivaceParser(FlowParser):
+    protocols = ('vivace-uspace',)
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        return parse_vivace_uspace_output(file, start_time)
+
+@register
+class IperfParser(FlowParser):
+    # every kernel CC run through iperf3 (cubic, bbr, leocc, ...), also the parser of protocols no other class claims
+    protocols = ('leocc',)
+    sender_ss = True
+
+    def outputs(self, sender: str, receiver: str) -> list:
+        return super().outputs(sender, receiver) + [f"csvs/{node}_{part}.csv" for node in (sender, receiver) for part in ('streams', 'sum')]
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        streams, _ = parse_iperf_json_streams(file, start_time)
+        return streams[streams['stream'] == 0].drop(columns='stream')
+
+    def parse_end(self, path: str, node: str, csv_name: str, start_time: float, epoch=None) -> None:
+        # also the per-stream and aggregate csvs of parallel streams
+        iperf_to_csvs(path, node, start_time)
+
+DEFAULT_PARSER = next(p for p in PARSERS if isinstance(p, IperfParser))
+
+def _output_exists(path: str, name: str) -> bool:
+    # with KEEP_CSVS off the csvs only live on in the result store
+    return os.path.exists(f"{path}/{name}") or (name.startswith("csvs/") and has_csv(path, name[len("csvs/"):-len(".csv")]))
+
+def _archive(path: str, inputs: dict, fingerprints: dict) -> bool:
+    """
+    Archive the text outputs among `inputs` ({name: file}) with compress_raw, their `fingerprints` follow them. Returns
+    whether anything moved.
+    """
+    moved = False
+    for name, file in inputs.items():
+        if file.endswith('.bin'):
+            continue
+        archived = compress_raw(f"{path}/{name}")
+        if archived != file:
+            fingerprints[name] = fingerprint(archived, sha1=fingerprints[name]['sha1'])
+            moved = True
+    return moved
+
+def run_flow(path: str, flow: list, start_time: float, epoch=None, manifest=None, follower=None, archive=True):
+    """
+    Parse the outputs of both ends of one flow (an emulation_info['flows'] entry) into {path}/csvs with its registered parser,
+    unless `manifest` shows the csvs were written by the same parser version from the same raw outputs. With `archive` the
+    text outputs are archived with compress_raw afterwards, also those of a flow that was up to date. That is only safe once
+    every collector has stopped (process_raw_outputs, after net.stop): the live parser parses with `archive` off while the ss
+    scripts are still appending. Returns the flow's new manifest entry, None if nothing changed.
+    `follower` is the SsFollower of the sender's ss file when the flow is parsed live (core/live_parser.py).
+    """
+    parser = parser_for(flow[-2])
+    sender, receiver = str(flow[0]), str(flow[1])
+    names = parser.inputs(sender, receiver)
+    if archive:
+        # a plain file next to its archive was written after it, read them as one
+        for name in names:
+            if not name.endswith('.bin') and os.path.exists(f"{path}/{name}") and find_archive(f"{path}/{name}"):
+                compress_raw(f"{path}/{name}")
+    inputs = {name: find_raw(f"{path}/{name}") for name in names}
+    probes = sorted(glob.glob(f"{path}/tcp_probe/{flow[2]}_*.bin"))
+    inputs.update({f"tcp_probe/{os.path.basename(file)}": file for file in probes})
+    inputs = {name: file for name, file in inputs.items() if file}
+    params = {'start_time': start_time, 'epoch': epoch}
+    if manifest is not None and manifest.up_to_date(sender, parser.ident(), params, inputs, lambda out: _output_exists(path, out)):
+        # parsed live, the raw outputs are archived now that the collectors have stopped
+        entry = manifest.get(sender)
+        fingerprints = dict(entry['inputs'])
+        if archive and _archive(path, inputs, fingerprints):
+            return dict(entry, inputs=fingerprints)
+        return None
+    missing = [name for name in names[:2] if name not in inputs]
+    if missing:
+        if all(_output_exists(path, out) for out in parser.outputs(sender, receiver)[:2]):
+            printC(f"Raw outputs of {sender} -> {receiver} are gone, keeping its csvs", "yellow", INFO)
+            return None
+        raise FileNotFoundError(f"{path}/{missing[0]}")
+
+    old = ((manifest.get(sender) if manifest is not None else None) or {}).get('inputs', {})
+    fingerprints = {name: fingerprint(file, old.get(name)) for name, file in inputs.items()}
+    parser.parse(path, flow, start_time, epoch, follower)
+    outputs = parser.outputs(sender, receiver)
+    if probes:
+        df = parse_tcp_probe_dir(path, str(flow[2]))
+        if not df.empty:
+            df.to_csv(f"{path}/csvs/{sender}_tcp_probe.csv", index=False)
+            outputs.append(f"csvs/{sender}_tcp_probe.csv")
+    if archive:
+        _archive(path, inputs, fingerprints)
+    return {'parser': parser.ident(), 'params': params, 'inputs': fingerprints,
+            'outputs': [out for out in outputs if os.path.exists(f"{path}/{out}")]}
+
+def _run_flow_job(args) -> tuple:
+    path, flow, start_time, epoch, manifest = args
+    try:
+        return str(flow[0]), run_flow(path, flow, start_time, epoch, manifest), None
+    except Exception:
+        return str(flow[0]), None, traceback.format_exc()
+
+def parse_flows(path: str, flows: list, start_times: dict, epoch=None, workers=None, force=False) -> list:
+    """
+    Parse every flow of a run that is not up to date in its manifest (all of them with `force`), one flow per process on up to
+    `workers` processes (all cores by default). `start_times` are the measured flow start times (emulation_info['flow_start_times']).
+    Returns the senders whose manifest entry changed (parsed, or only archived after a live parse). The manifest is saved
+    even if some flows fail, a RuntimeError names those afterwards.
+    """
+    manifest = Manifest(path)
+    jobs = []
+    for flow in flows:
+        sender, receiver = str(flow[0]), str(flow[1])
+        if not parser_for(flow[-2]).outputs(sender, receiver):
+            continue
+        start_time = start_times.get(sender, start_times.get(receiver, int(flow[-4])))
+        jobs.append((path, flow, start_time, epoch, None if force else manifest))
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        results = [_run_flow_job(job) for job in jobs]
+    else:
+        # a forkserver, not fork: process_raw_outputs runs on the emulation threads of the threaded drivers
+        with get_context('forkserver').Pool(workers, import_parsers, (parser_modules(),)) as pool:
+            results = pool.map(_run_flow_job, jobs)
+
+    parsed, failed = [], []
+    for sender, entry, error in results:
+        if error:
+            printC(f"Parsing the flow of {sender} failed:\n{error}", "red", ERRO)
+            failed.append(sender)
+        elif entry:
+            manifest.set(sender, entry)
+            parsed.append(sender)
+    manifest.save()
+    if failed:
+        raise RuntimeError(f"Parsing failed for {', '.join(failed)}")
+    return parsed
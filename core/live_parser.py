@@ -0,0 +1,93 @@
+import sys, signal, traceback
+from multiprocessing import get_context
+from queue import Empty
+from core.utils import *
+from core.ss_parser import SsFollower
+
+# Parsing that overlaps with the emulation instead of following it. A separate process (no GIL shared with the emulation's
+# timing threads) follows the ss script files of all senders while they grow, and as soon as both ends of a flow have written
+# their output it parses that flow with flow_parsers.run_flow. The flows it handled are recorded in the run's manifest, so
+# process_raw_outputs only parses what is left; their senders also end up in emulation_info['parsed_flows'].
+# Emulation stops a node's ss collector (script or sock_diag) before telling the parser the node is done, so the live parse
+# reads the final file. It only parses: archiving raw outputs is left to process_raw_outputs, which would still re-parse a
+# flow whose ss file changed after its live parse.
+# The process comes from a forkserver: Emulation.run() runs on the worker threads of the threaded drivers, forking them is not safe.
+
+def _live_parser(events, results, path: str, flows: list, epoch, poll_sec: float, modules: list) -> None:
+    """
+    Body of the parser process. `events` carries (node, flow_start_times) when a node's output is written and None at the end.
+    `modules` register the parsers defined outside core.flow_parsers.
+    """
+    from core.flow_parsers import run_flow, import_parsers
+    from core.manifest import Manifest
+    import_parsers(modules)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    followers = {str(flow[0]): SsFollower(f"{path}/{flow[0]}_ss.csv") for flow in flows}
+    finished, parsed = set(), []
+    manifest = Manifest(path)
+    pending = list(flows)
+    mkdirp(f"{path}/csvs")
+    while True:
+        try:
+            event = events.get(timeout=poll_sec)
+        except Empty:
+            for follower in followers.values():
+                try:
+                    follower.poll()
+                except Exception:
+                    pass
+            continue
+        if event is None:
+            break
+        node, flow_start_times = event
+        finished.add(node)
+        for flow in [f for f in pending if str(f[0]) in finished and str(f[1]) in finished]:
+            pending.remove(flow)
+            sender, receiver = str(flow[0]), str(flow[1])
+            start_time = flow_start_times.get(sender, flow_start_times.get(receiver, int(flow[-4])))
+            try:
+                entry = run_flow(path, flow, start_time, epoch, manifest, followers[sender], archive=False)
+                if entry:
+                    manifest.set(sender, entry)
+                    parsed.append(sender)
+            except Exception:
+                printC(f"Live parsing of {sender} -> {receiver} failed, left for process_raw_outputs:\n{traceback.format_exc()}", "red", ERRO)
+    manifest.save()
+    results.put(parsed)
+
+class LiveParser:
+    """
+    Parses the flows of one Emulation while it runs. `flows` are emulation_info['flows'] entries, `epoch` the run's wall clock epoch.
+    """
+    def __init__(self, path: str, flows: list, epoch=None, poll_sec=0.5):
+        self.flows = [f for f in flows if f[-2] not in ('tbf', 'netem', 'cross_traffic') and 'datagen' not in f[-2]]
+        from core.flow_parsers import parser_modules
+        context = get_context('forkserver')
+        self.events = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(target=_live_parser, args=(self.events, self.results, path, self.flows, epoch, poll_sec, parser_modules()), daemon=True)
+
+    def start(self) -> None:
+        self.process.start()
+
+    def node_finished(self, node: str, flow_start_times: dict) -> None:
+        """
+        Called once `node`'s output file is complete, with the flow start times measured so far.
+        """
+        self.events.put((node, dict(flow_start_times)))
+
+    def stop(self) -> list:
+        """
+        Finish the flows that are still being parsed and return the senders that were parsed.
+        """
+        self.events.put(None)
+        while True:
+            try:
+                parsed = self.results.get(timeout=1)
+                break
+            except Empty:
+                if not self.process.is_alive():
+                    parsed = []
+                    break
+        self.process.join()
+        return parsed
@@ -0,0 +1,80 @@
+import os, json, hashlib
+from core.utils import *
+
+# Processing manifest of a run directory ({run}/manifest.json). For every processed item (a flow, keyed by its sender, and the
+# result store) it records the parser and its version, the parameters, a fingerprint of every input and the files produced.
+# An item is up to date while all of that still matches and its outputs exist, so re-processing a corpus only parses what
+# changed or what a parser upgrade (a new FlowParser.version) invalidated. Fingerprints hash the decompressed content, so
+# archiving a raw file with compress_raw does not invalidate it, and keep size and mtime to skip rehashing unchanged files.
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# items made from the parsed flows rather than from raw outputs
+DERIVED_ITEMS = ('store', 'summary')
+
+def content_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open_raw(path, 'rb') as fin:
+        for block in iter(lambda: fin.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def fingerprint(path: str, old=None, sha1=None) -> dict:
+    """
+    {file, size, mtime_ns, sha1} of the existing file `path`. The hash of `old` is reused if the file did not change on disk,
+    `sha1` is the already known content hash (e.g. of the file before it was compressed).
+    """
+    st = os.stat(path)
+    fp = {'file': os.path.basename(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if sha1 is not None:
+        fp['sha1'] = sha1
+    elif old and all(old.get(k) == fp[k] for k in fp):
+        fp['sha1'] = old['sha1']
+    else:
+        fp['sha1'] = content_digest(path)
+    return fp
+
+class Manifest:
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(f"{path}/{MANIFEST_NAME}", 'r') as fin:
+                self.data = json.load(fin)
+        except (OSError, ValueError):
+            self.data = {}
+        if self.data.get('version') != MANIFEST_VERSION:
+            self.data = {'version': MANIFEST_VERSION, 'items': {}}
+
+    def get(self, key: str):
+        return self.data['items'].get(key)
+
+    def set(self, key: str, entry: dict) -> None:
+        self.data['items'][key] = entry
+
+    def up_to_date(self, key: str, parser: str, params: dict, inputs: dict, exists=None) -> bool:
+        """
+        Whether `key` was produced by `parser` with `params` from the same `inputs` ({name: existing file}) and its outputs are still
+        there. `exists(name)` tells whether an output is, by default whether {path}/{name} exists.
+        """
+        entry = self.get(key)
+        if not entry or entry['parser'] != parser or entry['params'] != params or set(entry['inputs']) != set(inputs):
+            return False
+        exists = exists or (lambda out: os.path.exists(f"{self.path}/{out}"))
+        if not all(exists(out) for out in entry['outputs']):
+            return False
+        return all(fingerprint(file, entry['inputs'][name])['sha1'] == entry['inputs'][name]['sha1'] for name, file in inputs.items())
+
+    def flows_digest(self) -> str:
+        """
+        Digest of what every flow was parsed from and by whom. It stands in for the csvs (which may be gone, see KEEP_CSVS)
+        in the parameters of the items derived from them.
+        """
+        flows = {key: [entry['parser'], entry['params'], {name: fp['sha1'] for name, fp in entry['inputs'].items()}]
+                 for key, entry in self.data['items'].items() if key not in DERIVED_ITEMS}
+        return hashlib.sha1(json.dumps(flows, sort_keys=True).encode()).hexdigest()
+
+    def save(self) -> None:
+        tmp = f"{self.path}/{MANIFEST_NAME}.tmp"
+        with open(tmp, 'w') as fout:
+            json.dump(self.data, fout, indent=1)
+        os.replace(tmp, f"{self.path}/{MANIFEST_NAME}")
@@ -0,0 +1,239 @@
+import os, json, glob
+import numpy as np
+import pandas as pd
+from core.utils import *
+from core.store import load_csv
+from core.manifest import Manifest, fingerprint
+from core.sysstat import read_sadf_log
+
+# Standard congestion control metrics of one run, computed once and kept as {run}/summary.json next to emulation_info.json.
+# Every series of a run is binned onto one grid of GRID_STEP seconds (np.bincount, no per-row Python), the flows of a run
+# form a (flow x time) matrix and the run metrics (aggregate goodput, Jain fairness, efficiency, ...) are column-wise
+# reductions of it. Figure scripts aggregate summaries (load_summaries) instead of re-reading the raw series of every run.
+#
+# Units follow the figure scripts: goodput and retransmissions in Mbps (bits / 2**20, retransmissions as 1500 byte packets),
+# delays in ms. A flow is measured over its configured active interval [start, start + duration).
+
+METRICS_VERSION = 1
+SUMMARY_NAME = "summary.json"
+GRID_STEP = 1.0
+PACKET_BITS = 1500 * 8
+MBIT = 2 ** 20
+# user space protocols the kernel's ETCP counters do not see, their retransmissions come from their own output
+USERSPACE_PROTOCOLS = ('vivace-uspace', 'aurora', 'genericcc')
+
+def to_grid(t, y, n: int, step=GRID_STEP, how='mean') -> np.ndarray:
+    """
+    Samples (t, y) on the grid 0, step, ..., (n - 1) * step: the mean (`how`='mean') or the sum ('sum') of the samples in
+    [k * step, (k + 1) * step) for point k, NaN for points without samples.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    ok = np.isfinite(t) & np.isfinite(y)
+    k = np.floor(t[ok] / step).astype(np.int64)
+    inside = (k >= 0) & (k < n)
+    k, y = k[inside], y[ok][inside]
+    counts = np.bincount(k, minlength=n)
+    sums = np.bincount(k, weights=y, minlength=n)
+    out = np.full(n, np.nan)
+    has = counts > 0
+    out[has] = sums[has] if how == 'sum' else sums[has] / counts[has]
+    return out
+
+def jain_index(m: np.ndarray) -> np.ndarray:
+    """
+    Jain's fairness index of every column of a (flow x time) matrix over its non-NaN values, NaN with fewer than two.
+    """
+    n = np.sum(np.isfinite(m), axis=0)
+    total = np.nansum(m, axis=0)
+    squares = np.nansum(np.square(m), axis=0)
+    out = np.full(m.shape[1], np.nan)
+    ok = (n >= 2) & (squares > 0)
+    out[ok] = np.square(total[ok]) / (n[ok] * squares[ok])
+    return out
+
+def min_max_ratio(m: np.ndarray) -> np.ndarray:
+    """
+    min / max of every column over its non-NaN values, NaN with fewer than two values or no goodput at all.
+    """
+    n = np.sum(np.isfinite(m), axis=0)
+    out = np.full(m.shape[1], np.nan)
+    ok = n >= 2
+    if ok.any():
+        lo, hi = np.nanmin(m[:, ok], axis=0), np.nanmax(m[:, ok], axis=0)
+        out[ok] = np.divide(lo, hi, out=np.full(len(lo), np.nan), where=hi > 0)
+    return out
+
+def _stats(x: np.ndarray, prefix: str, quantile=None) -> dict:
+    # mean and sample std (ddof=1, like the pandas the figure scripts used), None where there is nothing
+    x = x[np.isfinite(x)]
+    out = {f"{prefix}_mean": float(x.mean()) if len(x) else None,
+           f"{prefix}_std": float(x.std(ddof=1)) if len(x) > 1 else None}
+    if quantile is not None:
+        out[f"{prefix}_p{int(quantile * 100)}"] = float(np.quantile(x, quantile)) if len(x) else None
+    return out
+
+def _column(path: str, name: str, columns: list):
+    # first of `columns` the csv has, as (time, values), None if the run has neither the csv nor any of them
+    try:
+        df = load_csv(path, name)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
+    for c in columns:
+        if c in df.columns and 'time' in df.columns:
+            return pd.to_numeric(df['time'], errors='coerce').to_numpy(), pd.to_numeric(df[c], errors='coerce').to_numpy()
+    return None
+
+def _sysstat_time(path: str, timestamps: np.ndarray, epoch) -> np.ndarray:
+    # sadf timestamps onto the experiment time axis: the run's epoch, or a second before the first sysstat sample like the
+    # figure scripts did
+    if epoch is None:
+        first = [read_sadf_log(f, ['timestamp'])['timestamp'].min() for f in _sysstat_logs(path)]
+        first = [v for v in first if np.isfinite(v)]
+        epoch = (min(first) if first else np.nanmin(timestamps)) - 1
+    return timestamps - epoch
+
+def _sysstat_logs(path: str) -> list:
+    return sorted(glob.glob(f"{path}/sysstat/etcp_*.log")) + sorted(glob.glob(f"{path}/sysstat/dev_root.log"))
+
+def network_params(info: dict) -> tuple:
+    # bottleneck rate (Mbps) and base RTT (ms) from the link settings, None for runs recorded without them. netem delays only
+    # the first direction of a link unless it is bidir; of the host access links the shortest one counts (the fastest flow)
+    links = info.get('network') or []
+    rates = [float(link['bw']) for link in links if link.get('bw')]
+    rtt = lambda link: float(link['delay']) * (2 if link.get('bidir') else 1) if link.get('delay') else 0.0
+    core = [rtt(link) for link in links if link['node1'].startswith('s') and link['node2'].startswith('s')]
+    access = [rtt(link) for link in links if not (link['node1'].startswith('s') and link['node2'].startswith('s'))]
+    base = sum(core) + (min(access) if access else 0.0)
+    return (min(rates) if rates else None), (base or None)
+
+def summarize(path: str, bw=None, base_rtt=None, iface=None, util_window=None) -> dict:
+    """
+    Metric set of one run: per flow (keyed by sender) and for the run. `bw` (Mbps) and `base_rtt` (ms) default to what the
+    run's link settings give, `iface` (the dev_root.log interface utilisation is read from) to the busiest switch interface.
+    The utilisation covers the whole run, or only [start, end) seconds of `util_window`.
+    """
+    with open(f"{path}/emulation_info.json", 'r') as fin:
+        info = json.load(fin)
+    net_bw, net_rtt = network_params(info)
+    bw, base_rtt = bw or net_bw, base_rtt or net_rtt
+    epoch = info.get('epoch', {}).get('realtime')
+    flows = [f for f in info['flows'] if f[-2] not in ('tbf', 'netem', 'cross_traffic') and 'datagen' not in f[-2]]
+    n = int(np.ceil(max([float(f[4]) + float(f[5]) for f in flows], default=0) / GRID_STEP))
+
+    names, goodput, rtt, retr, records = [], [], [], [], {}
+    grid = np.arange(n) * GRID_STEP
+    for flow in flows:
+        sender, receiver = str(flow[0]), str(flow[1])
+        active = (grid >= float(flow[4])) & (grid < float(flow[4]) + float(flow[5]))
+        g = _column(path, receiver, ['bandwidth'])
+        if g is None:
+            continue
+        g = np.where(active, to_grid(*g, n), np.nan)
+        r = _column(path, f"{sender}_ss", ['rtt', 'srtt']) or _column(path, sender, ['srtt', 'rtt'])
+        r = np.where(active, to_grid(*r, n), np.nan) if r is not None else np.full(n, np.nan)
+        # retransmitted packets per second: the sender's ETCP counters, else the per-interval counts of its own output
+        etcp = f"{path}/sysstat/etcp_{sender}.log"
+        if os.path.exists(etcp) and not any(p in flow[-2] for p in USERSPACE_PROTOCOLS):
+            df = read_sadf_log(etcp, ['timestamp', 'retrans/s'])
+            x = to_grid(_sysstat_time(path, df['timestamp'].to_numpy(), epoch), df['retrans/s'].to_numpy(), n)
+        else:
+            x = _column(path, sender, ['retr'])
+            x = to_grid(*x, n, how='sum') if x is not None else np.full(n, np.nan)
+        x = np.where(active, x * PACKET_BITS / MBIT, np.nan)
+
+        names.append(sender)
+        goodput.append(g)
+        rtt.append(r)
+        retr.append(x)
+        record = {'receiver': receiver, 'protocol': flow[-2], 'start': float(flow[4]), 'end': float(flow[4]) + float(flow[5])}
+        record.update(_stats(g, 'goodput'))
+        record.update(_stats(r, 'rtt', quantile=0.95))
+        record.update(_stats(x, 'retr'))
+        record.update(_stats(r / base_rtt if base_rtt else np.full(n, np.nan), 'delay_norm'))
+        records[sender] = record
+
+    run = {}
+    if names:
+        g, r, x = np.vstack(goodput), np.vstack(rtt), np.vstack(retr)
+        # points where at least one flow is active
+        live = np.isfinite(g).any(axis=0)
+        total = np.where(live, np.nansum(g, axis=0), np.nan)
+        retr_total = np.where(live, np.nansum(x, axis=0), np.nan)
+        rtt_mean = np.full(n, np.nan)
+        has_rtt = np.isfinite(r).any(axis=0)
+        rtt_mean[has_rtt] = np.nanmean(r[:, has_rtt], axis=0)
+        run.update(_stats(total, 'goodput'))
+        run.update(_stats(rtt_mean, 'rtt'))
+        run.update(_stats(retr_total, 'retr'))
+        run.update(_stats(jain_index(g), 'jain'))
+        run.update(_stats(min_max_ratio(g), 'fairness'))
+        if bw and base_rtt:
+            # share of the bottleneck used per unit of queueing: 1 is full rate at the base RTT
+            run.update(_stats((total / bw) / (rtt_mean / base_rtt), 'efficiency1'))
+            run.update(_stats(((total - retr_total) / bw) / (rtt_mean / base_rtt), 'efficiency2'))
+
+    dev = f"{path}/sysstat/dev_root.log"
+    if os.path.exists(dev):
+        df = read_sadf_log(dev, ['timestamp', 'IFACE', 'txkB/s'])
+        if iface is None:
+            switch = df[df['IFACE'].astype(str).str.match(r's\d')]
+            iface = switch.groupby('IFACE')['txkB/s'].mean().idxmax() if not switch.empty else None
+        df = df[df['IFACE'] == iface]
+        if not df.empty:
+            util = to_grid(_sysstat_time(path, df['timestamp'].to_numpy(), epoch), df['txkB/s'].to_numpy() * 8 / 1024, n)
+            if util_window is not None:
+                util = np.where((grid >= util_window[0]) & (grid < util_window[1]), util, np.nan)
+            run.update(_stats(util, 'util'))
+            run['util_ratio'] = run['util_mean'] / bw if bw and run['util_mean'] is not None else None
+    return {'version': METRICS_VERSION, 'grid_step': GRID_STEP, 'bw': bw, 'base_rtt': base_rtt, 'iface': iface,
+            'flows': records, 'run': run}
+
+def run_summary(path: str, bw=None, base_rtt=None, iface=None, util_window=None, force=False, write=True) -> dict:
+    """
+    The run's summary.json, (re)computed and written when it is missing, older than the run's parsed flows or sysstat logs
+    (see core/manifest.py) or was computed with other `bw`, `base_rtt`, `iface` or `util_window`. Without `write` a summary
+    that has to be recomputed is only returned: readers with parameters of their own (figure scripts) do not overwrite the
+    one process_raw_outputs keeps.
+    """
+    manifest = Manifest(path)
+    params = {'flows': manifest.flows_digest(), 'bw': bw, 'base_rtt': base_rtt, 'iface': iface}
+    if util_window is not None:
+        params['util_window'] = list(util_window)
+    inputs = {f"sysstat/{os.path.basename(f)}": f for f in _sysstat_logs(path)}
+    if not force and manifest.up_to_date('summary', f"metrics/{METRICS_VERSION}", params, inputs):
+        try:
+            with open(f"{path}/{SUMMARY_NAME}", 'r') as fin:
+                return json.load(fin)
+        except (OSError, ValueError):
+            pass
+    summary = summarize(path, bw, base_rtt, iface, util_window)
+    if not write:
+        return summary
+    with open(f"{path}/{SUMMARY_NAME}.tmp", 'w') as fout:
+        json.dump(summary, fout, indent=1)
+    os.replace(f"{path}/{SUMMARY_NAME}.tmp", f"{path}/{SUMMARY_NAME}")
+    old = (manifest.get('summary') or {}).get('inputs', {})
+    manifest.set('summary', {'parser': f"metrics/{METRICS_VERSION}", 'params': params,
+                             'inputs': {name: fingerprint(file, old.get(name)) for name, file in inputs.items()},
+                             'outputs': [SUMMARY_NAME]})
+    manifest.save()
+    return summary
+
+def load_summaries(paths: list, level='run', **params) -> pd.DataFrame:
+    """
+    Summaries of many runs as one frame with a `path` column: a row per run (`level`='run') or per flow ('flow', with `flow`
+    the sender). `params` (bw, base_rtt, iface) go to run_summary. Runs that cannot be summarised are skipped.
+    """
+    rows = []
+    for path in paths:
+        try:
+            summary = run_summary(path, **params)
+        except (OSError, ValueError, KeyError) as e:
+            printC(f"No summary for {path}: {e}", "yellow", INFO)
+            continue
+        if level == 'run':
+            rows.append(dict(summary['run'], path=path))
+        else:
+            rows.extend(dict(record, path=path, flow=flow) for flow, record in summary['flows'].items())
+    return pd.DataFrame(rows)
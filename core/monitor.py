@@ -1,75 +1,290 @@
-import os, re
+import os, re, sys, signal, socket, threading
 from subprocess import Popen, PIPE
-from multiprocessing import Process
-from time import sleep, time
+from multiprocessing import Process, Pipe
+from time import sleep, monotonic
 from core.parsers import *
 from core.utils import *
+from core.netlink import QdiscSampler, TcpInfoSampler, TCP_INFINITE_SSTHRESH
+from core.samples import SampleWriter, samples_to_csv, samples_to_parquet
 
-def monitor_qlen(iface: str, interval_sec=0.1, path=default_dir) -> None:
-    mkdirp(path)
-    start = time()
-    fname=f"{path}/{iface}.txt"
-    pat_queued = re.compile(r'backlog\s+([\d]+\w+)\s+\d+p')
-    pat_dropped = re.compile(r'dropped\s+([\d]+)') 
-    cmd = f"tc -s qdisc show dev {iface}"
-    f = open(fname, 'w')
-    f.write("time,root_pkts,root_drp,child_pkts,child_drp\n")
-    f.close()
-    matches_dropped_root, matches_dropped_child = 0, 0
-    while 1:
-        p = Popen(cmd, shell=True, stdout=PIPE)
-        output = p.stdout.read()
-        tmp = ""
-        output = output.decode('utf-8')
-        matches_queued = pat_queued.findall(output)
-        matches_dropped = pat_dropped.findall(output)
-        if len(matches_queued) != len(matches_dropped):
-            print("WARNING: Two matches have different lengths!")
-            print(output)
-
-        if matches_queued and matches_dropped:
-            tmp += f"{time()-start},{to_bytes(matches_queued[0])},{int(matches_dropped[0]) - matches_dropped_root}"
-            matches_dropped_root = int(matches_dropped[0])
-            if len(matches_queued) > 1 and len(matches_dropped)> 1: 
-                tmp += f",{to_bytes(matches_queued[1])},{int(matches_dropped[1]) - matches_dropped_child}\n"
+QUEUE_FIELDS = ['time', 'root_pkts', 'root_drp', 'child_pkts', 'child_drp', 'interval']
+# tcp_info in the units and under the column names parse_ss_to_csv gives the `ss -tin` output: times in ms, rates in bps
+SS_FIELDS = ['time', 'local_ip', 'local_port', 'remote_ip', 'remote_port', 'tx_queue', 'rx_queue', 'ca_state', 'rto', 'rtt', 'rttvar', 'minrtt',
+             'mss', 'cwnd', 'ssthresh', 'unacked', 'lost', 'retrans', 'retrans_total', 'bytes_sent', 'bytes_retrans', 'bytes_acked',
+             'bytes_received', 'delivered', 'notsent', 'pacing_rate_bps', 'delivery_rate_bps', 'sample_interval']
+SS_FORMAT = "d" + "q" * 7 + "d" * 4 + "q" * 13 + "ddd"
 
+class SamplingSchedule:
+    """
+    Sampling interval as a function of experiment time: `fast_sec` from `before_sec` before to `after_sec` after each
+    of `change_times` (the tbf/netem changes of the run), `slow_sec` everywhere else.
+    """
+    def __init__(self, slow_sec=0.1, fast_sec=None, change_times=(), before_sec=0.5, after_sec=2.0):
+        self.slow_sec = slow_sec
+        self.fast_sec = fast_sec if fast_sec else slow_sec
+        self.windows = []
+        for t in sorted(change_times):
+            start, end = t - before_sec, t + after_sec
+            if self.windows and start <= self.windows[-1][1]:
+                self.windows[-1][1] = max(self.windows[-1][1], end)
             else:
-                tmp += ",,\n"
-        f = open(fname, 'a')
-        f.write(tmp)
-        f.close
-        sleep(interval_sec)
-    return
-
-def monitor_qlen_on_router(iface: str, mininode, interval_sec=0.1, path = default_dir) -> None:
-    mkdirp(path)
-    fname=f"{path}/{iface}.txt"
-    start = time()
-    pat_queued = re.compile(r'backlog\s+([\d]+\w+)\s+\d+p')
-    pat_dropped = re.compile(r'dropped\s+([\d]+)') 
-    cmd = f"tc -s qdisc show dev {iface}"
-    f = open(fname, 'w')
-    f.write("time,root_pkts,root_drp,child_pkts,child_drp\n")
-    f.close()
-    while 1:
-        output = mininode.cmd(cmd)
-        tmp = ""
-        matches_queued = pat_queued.findall(output)
-        matches_dropped = pat_dropped.findall(output)
-        if len(matches_queued) != len(matches_dropped):
-            print("WARNING: Two matches have different lengths!")
-            print(output)
-        if matches_queued and matches_dropped:
-            tmp += f"{time()-start},{matches_queued[0]},{matches_dropped[0]}"
-            if len(matches_queued) > 1 and len(matches_dropped)> 1: 
-                tmp += f",{matches_queued[1]},{matches_dropped[1]}\n"
-            else:
-                tmp += ",,\n"
-        f = open(fname, 'a')
-        f.write(tmp)
-        f.close
-        sleep(interval_sec)
-    return
+                self.windows.append([start, end])
+
+    @property
+    def min_interval(self) -> float:
+        return min(self.slow_sec, self.fast_sec)
+
+    def interval_at(self, t: float) -> float:
+        for start, end in self.windows:
+            if start <= t < end:
+                return self.fast_sec
+        return self.slow_sec
+
+    def windows_arg(self, epoch_realtime: float) -> str:
+        """
+        Windows as the `start:end` wall clock microsecond list taken by the ss scripts.
+        """
+        return ",".join(f"{int((epoch_realtime + start) * 1e6)}:{int((epoch_realtime + end) * 1e6)}" for start, end in self.windows)
+
+class QueueTarget:
+    """
+    Output side of one monitored interface: backlog is written in bytes and drops as the increase since the previous sample.
+    Samples go to a binary `{iface}.bin` SampleWriter file, converted with convert_samples once monitoring stops.
+    `start` is the experiment epoch on the monotonic clock, so `time` is on the same axis as every other collector of the run.
+    Every sample records the interval until the next one, which varies when the target has an adaptive SamplingSchedule.
+    """
+    def __init__(self, iface: str, path: str, interval_sec=0.1, netns_pid=None, start=None, schedule=None):
+        mkdirp(path)
+        self.iface = iface
+        self.schedule = schedule if schedule is not None else SamplingSchedule(interval_sec)
+        self.netns_pid = netns_pid
+        self.start = monotonic() if start is None else start
+        self.next_tick = 0
+        self.last_drops = [0, 0]
+        self.writer = SampleWriter(f"{path}/{iface}.bin", QUEUE_FIELDS, "dqqqqd")
+
+    def write(self, now: float, qdiscs: tuple, interval: float) -> None:
+        values = [now - self.start]
+        for i, qdisc in enumerate(qdiscs):
+            if qdisc is None:
+                values += [None, None]
+                continue
+            values += [qdisc.backlog, qdisc.drops - self.last_drops[i]]
+            self.last_drops[i] = qdisc.drops
+        self.writer.write(*values, interval)
+
+    def close(self) -> str:
+        self.writer.close()
+        return self.writer.path
+
+class SockTarget:
+    """
+    tcp_info of the established sockets of one node, one record per socket per sample, written to `{path}/{name}_ss.bin`.
+    Like the ss scripts, `sports`/`dports` narrow it down to the experiment's flows (e.g. the iperf3 data socket on port 11111).
+    """
+    def __init__(self, name: str, path: str, interval_sec=0.01, netns_pid=None, start=None, schedule=None, sports=(), dports=()):
+        mkdirp(path)
+        self.schedule = schedule if schedule is not None else SamplingSchedule(interval_sec)
+        self.netns_pid = netns_pid
+        self.start = monotonic() if start is None else start
+        self.next_tick = 0
+        self.sampler = TcpInfoSampler(sports, dports, netns_pid)
+        self.writer = SampleWriter(f"{path}/{name}_ss.bin", SS_FIELDS, SS_FORMAT)
+
+    def write(self, now: float, sockets: list, interval: float) -> None:
+        t = now - self.start
+        for s in sockets:
+            # ss prints Recv-Q first, which parse_ss_to_csv stores as tx_queue
+            self.writer.write(t, ipv4_to_int(s.src), s.sport, ipv4_to_int(s.dst), s.dport, s.rqueue, s.wqueue, s.ca_state,
+                              s.rto / 1000, s.rtt / 1000, s.rttvar / 1000, s.min_rtt / 1000,
+                              s.snd_mss, s.snd_cwnd, s.snd_ssthresh if s.snd_ssthresh < TCP_INFINITE_SSTHRESH else None,
+                              s.unacked, s.lost, s.retrans, s.total_retrans, s.bytes_sent, s.bytes_retrans, s.bytes_acked,
+                              s.bytes_received, s.delivered, s.notsent_bytes,
+                              s.pacing_rate * 8 if s.pacing_rate != 2**64 - 1 else None, s.delivery_rate * 8, interval)
+
+    def close(self) -> str:
+        self.sampler.close()
+        self.writer.close()
+        return self.writer.path
+
+def ipv4_to_int(address: str):
+    try:
+        return int.from_bytes(socket.inet_aton(address), 'big')
+    except OSError:
+        return None
+
+def convert_samples(bin_path: str, fmt=SAMPLES_FORMAT) -> None:
+    """
+    Turn a monitor's binary sample file into `.txt` (csv, compressed as set by RAW_COMPRESSION) or `.parquet` next to it and drop the binary.
+    """
+    base = os.path.splitext(bin_path)[0]
+    if fmt == 'parquet':
+        samples_to_parquet(bin_path, f"{base}.parquet")
+    else:
+        with open_raw(f"{base}.txt", 'wt') as fout:
+            samples_to_csv(bin_path, fout)
+
+def monitor_qlen(iface: str, interval_sec=0.1, path=default_dir, netns_pid=None) -> None:
+    """
+    Samples the qdiscs of `iface` over rtnetlink every `interval_sec` (down to 1 ms), from inside the namespace of `netns_pid` if given.
+    Standalone single interface monitor, Emulation goes through the shared MonitorService instead.
+    """
+    sampler = QdiscSampler([iface], netns_pid)
+    target = QueueTarget(iface, path, interval_sec, netns_pid)
+    # Process.terminate() sends SIGTERM, turn it into SystemExit so the file gets flushed and closed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        deadline = target.start
+        while 1:
+            target.write(monotonic(), sampler.sample()[iface], interval_sec)
+            # sleep until the next absolute deadline so the period does not drift with the sampling cost
+            deadline += interval_sec
+            sleep(max(0.0, deadline - monotonic()))
+    finally:
+        convert_samples(target.close())
+
+def _monitor_service(conn) -> None:
+    """
+    Body of the monitor service process. Waits for add/remove requests on `conn` between ticks, and on every tick
+    takes one timestamp, one rtnetlink dump per network namespace that has interfaces due and one sock_diag dump per socket target due.
+    Namespaces are entered with setns only to open their socket, so routers and hosts are sampled without their shells.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    samplers = {}
+    targets = {}
+    tick, n = None, 0
+    deadline = monotonic()
+    try:
+        while 1:
+            timeout = max(0.0, deadline - monotonic()) if targets else None
+            if conn.poll(timeout):
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    break
+                try:
+                    reply = None
+                    if request[0] == 'add':
+                        key, iface, path, interval_sec, netns_pid, start, schedule = request[1:]
+                        if netns_pid not in samplers:
+                            samplers[netns_pid] = QdiscSampler(netns_pid=netns_pid)
+                        samplers[netns_pid].add(iface)
+                        targets[key] = QueueTarget(iface, path, interval_sec, netns_pid, start, schedule)
+                    elif request[0] == 'add_sock':
+                        key, name, path, interval_sec, netns_pid, start, schedule, sports, dports = request[1:]
+                        targets[key] = SockTarget(name, path, interval_sec, netns_pid, start, schedule, sports, dports)
+                    elif request[0] == 'remove':
+                        target = targets.pop(request[1], None)
+                        if isinstance(target, SockTarget):
+                            reply = target.close()
+                        elif target is not None:
+                            sampler = samplers[target.netns_pid]
+                            # the sampler dumps by interface, keep it while another key still samples this (namespace, iface)
+                            if not any(isinstance(t, QueueTarget) and (t.netns_pid, t.iface) == (target.netns_pid, target.iface) for t in targets.values()):
+                                sampler.remove(target.iface)
+                            if not sampler.ifindex:
+                                samplers.pop(target.netns_pid).close()
+                            reply = target.close()
+                    conn.send(reply)
+                except Exception as e:
+                    conn.send(e)
+                # the tick is the smallest interval any schedule asks for, every target samples on a multiple of it
+                if targets:
+                    new_tick = min(t.schedule.min_interval for t in targets.values())
+                    if new_tick != tick:
+                        tick, n, deadline = new_tick, 0, monotonic()
+                        for t in targets.values():
+                            t.next_tick = 0
+                continue
+
+            now = monotonic()
+            due = [t for t in targets.values() if n >= t.next_tick]
+            stats = {}
+            for t in due:
+                stride = max(1, int(round(t.schedule.interval_at(now - t.start) / tick)))
+                t.next_tick = n + stride
+                if isinstance(t, SockTarget):
+                    t.write(now, t.sampler.dump(), stride * tick)
+                    continue
+                if t.netns_pid not in stats:
+                    stats[t.netns_pid] = samplers[t.netns_pid].sample()
+                t.write(now, stats[t.netns_pid][t.iface], stride * tick)
+            n += 1
+            deadline += tick
+            # if sampling overran, skip the missed ticks instead of bursting to catch up
+            if deadline < monotonic():
+                deadline = monotonic()
+    finally:
+        for target in targets.values():
+            target.close()
+        for sampler in samplers.values():
+            sampler.close()
+
+class MonitorService:
+    """
+    Handle to the single process that samples every monitored interface for all Emulation instances of this Python process,
+    e.g. the MAX_JOBS emulations of the gauntlet. Interfaces are sampled on one shared tick (the smallest requested interval),
+    so sample timestamps line up across interfaces, and results fan out to one file per interface.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=_monitor_service, args=(child_conn,), daemon=True)
+        self.process.start()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def start(cls) -> 'MonitorService':
+        """
+        Fork the service process if it is not running. Drivers that run emulations from worker threads call this in __main__
+        before the threads start: forking from a worker copies the locks other threads hold into the child.
+        """
+        with cls._instance_lock:
+            if cls._instance is None or not cls._instance.process.is_alive():
+                if threading.current_thread() is not threading.main_thread():
+                    raise RuntimeError("The MonitorService is not running, call MonitorService.start() from the main thread before starting the emulation threads")
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def get(cls) -> 'MonitorService':
+        """
+        The running service. Only the main thread starts it here (single emulation scripts), worker threads need MonitorService.start() first.
+        """
+        return cls.start()
+
+    def _request(self, *request):
+        with self.lock:
+            self.conn.send(request)
+            reply = self.conn.recv()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def add_queue(self, key: str, iface: str, path: str, interval_sec=0.1, netns_pid=None, start=None, schedule=None) -> None:
+        """
+        Start sampling `iface` into `{path}/{iface}.bin`. `netns_pid` is the pid of a process inside the node's namespace (Node.pid), None for the root namespace.
+        `start` is the monotonic experiment epoch (new_epoch()['monotonic']), sample times are relative to it.
+        An adaptive `schedule` (SamplingSchedule) overrides the fixed `interval_sec`.
+        """
+        self._request('add', key, iface, path, interval_sec, netns_pid, start, schedule)
+
+    def add_sock(self, key: str, name: str, path: str, interval_sec=0.01, netns_pid=None, start=None, schedule=None, sports=(), dports=()) -> None:
+        """
+        Start sampling tcp_info of the established sockets in the namespace of `netns_pid` into `{path}/{name}_ss.bin`,
+        in place of the ss scripts. The binary is left for process_raw_outputs, which turns it into the usual csvs/{name}_ss.csv.
+        """
+        self._request('add_sock', key, name, path, interval_sec, netns_pid, start, schedule, tuple(sports), tuple(dports))
+
+    def remove(self, key: str, fmt=SAMPLES_FORMAT) -> None:
+        """
+        Stop sampling and convert the samples to `fmt` (None keeps the binary). The conversion runs in the caller, not in the sampling process.
+        """
+        bin_path = self._request('remove', key)
+        if bin_path is not None and fmt:
+            convert_samples(bin_path, fmt)
 
 def start_sysstat(interval: int, count: int, folder: str, node=None) -> None:
     mkdirp(f"{folder}/sysstat")
@@ -0,0 +1,286 @@
+import os, socket, struct, ctypes
+from collections import namedtuple
+from contextlib import contextmanager
+
+# Minimal rtnetlink and sock_diag clients, just enough to dump qdisc statistics without forking `tc` and tcp_info without forking `ss`.
+# Constants come from linux/netlink.h, linux/rtnetlink.h, linux/pkt_sched.h, linux/gen_stats.h, linux/inet_diag.h and linux/tcp.h
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+RTM_NEWQDISC = 36
+RTM_GETQDISC = 38
+
+TCA_KIND = 1
+TCA_STATS = 3
+TCA_STATS2 = 7
+
+TCA_STATS_BASIC = 1
+TCA_STATS_QUEUE = 3
+
+TC_H_ROOT = 0xFFFFFFFF
+TC_H_INGRESS = 0xFFFFFFF1
+
+_NLMSGHDR = struct.Struct("=LHHLL")
+_TCMSG = struct.Struct("=BxxxiIII")
+_RTATTR = struct.Struct("=HH")
+_GNET_BASIC = struct.Struct("=QI")
+_GNET_QUEUE = struct.Struct("=IIIII")
+_TC_STATS = struct.Struct("=QIIIIIII")
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+
+INET_DIAG_REQ_BYTECODE = 1
+INET_DIAG_INFO = 2
+INET_DIAG_CONG = 4
+
+INET_DIAG_BC_JMP = 1
+INET_DIAG_BC_S_GE = 2
+INET_DIAG_BC_S_LE = 3
+INET_DIAG_BC_D_GE = 4
+INET_DIAG_BC_D_LE = 5
+
+TCP_ESTABLISHED = 1
+TCP_INFINITE_SSTHRESH = 0x7FFFFFFF
+
+_INET_DIAG_REQ_V2 = struct.Struct("=BBBxI48x")
+_INET_DIAG_MSG = struct.Struct("=BBBB2s2s16s16sI8sIIIII")
+_INET_DIAG_BC_OP = struct.Struct("=BBH")
+
+CLONE_NEWNET = 0x40000000
+
+# struct tcp_info up to tcpi_bytes_retrans (4.19+). Older kernels send a shorter struct, the missing tail reads as 0.
+TCP_INFO_FIELDS = ['state', 'ca_state', 'retransmits', 'probes', 'backoff', 'options', 'wscale', 'flags',
+                   'rto', 'ato', 'snd_mss', 'rcv_mss', 'unacked', 'sacked', 'lost', 'retrans', 'fackets',
+                   'last_data_sent', 'last_ack_sent', 'last_data_recv', 'last_ack_recv', 'pmtu', 'rcv_ssthresh', 'rtt', 'rttvar',
+                   'snd_ssthresh', 'snd_cwnd', 'advmss', 'reordering', 'rcv_rtt', 'rcv_space', 'total_retrans',
+                   'pacing_rate', 'max_pacing_rate', 'bytes_acked', 'bytes_received',
+                   'segs_out', 'segs_in', 'notsent_bytes', 'min_rtt', 'data_segs_in', 'data_segs_out',
+                   'delivery_rate', 'busy_time', 'rwnd_limited', 'sndbuf_limited', 'delivered', 'delivered_ce', 'bytes_sent', 'bytes_retrans']
+_TCP_INFO = struct.Struct("=8B24I4Q6I4Q2I2Q")
+
+TcpInfo = namedtuple("TcpInfo", ['family', 'src', 'sport', 'dst', 'dport', 'rqueue', 'wqueue', 'cong'] + TCP_INFO_FIELDS)
+
+QdiscStats = namedtuple("QdiscStats", ['ifindex', 'handle', 'parent', 'kind', 'bytes', 'packets', 'qlen', 'backlog', 'drops', 'requeues', 'overlimits'])
+
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+def parse_attrs(data: bytes, offset: int = 0, end: int = None) -> dict:
+    """
+    Walk a run of netlink attributes and return {type: payload}. Nested attributes are left as raw bytes.
+    """
+    attrs = {}
+    end = len(data) if end is None else end
+    while offset + _RTATTR.size <= end:
+        length, kind = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        attrs[kind & 0x3FFF] = data[offset + _RTATTR.size: offset + length]
+        offset += _align(length)
+    return attrs
+
+def iter_messages(sock: socket.socket, seq: int, bufsize: int = 65536):
+    """
+    Yield (type, payload) for every message of a dump until NLMSG_DONE. Raises OSError on NLMSG_ERROR.
+    """
+    while True:
+        data = sock.recv(bufsize)
+        offset = 0
+        while offset + _NLMSGHDR.size <= len(data):
+            length, msg_type, flags, msg_seq, pid = _NLMSGHDR.unpack_from(data, offset)
+            if length < _NLMSGHDR.size:
+                return
+            payload = data[offset + _NLMSGHDR.size: offset + length]
+            offset += _align(length)
+            if msg_seq != seq:
+                continue
+            if msg_type == NLMSG_DONE:
+                return
+            if msg_type == NLMSG_ERROR:
+                error = struct.unpack_from("=i", payload)[0]
+                if error != 0:
+                    raise OSError(-error, os.strerror(-error))
+                return
+            yield msg_type, payload
+
+def _parse_qdisc(payload: bytes) -> QdiscStats:
+    family, ifindex, handle, parent, info = _TCMSG.unpack_from(payload)
+    attrs = parse_attrs(payload, _TCMSG.size)
+    kind = attrs.get(TCA_KIND, b'').rstrip(b'\0').decode()
+    nbytes = packets = qlen = backlog = drops = requeues = overlimits = 0
+    if TCA_STATS2 in attrs:
+        stats = parse_attrs(attrs[TCA_STATS2])
+        if TCA_STATS_BASIC in stats:
+            nbytes, packets = _GNET_BASIC.unpack_from(stats[TCA_STATS_BASIC])
+        if TCA_STATS_QUEUE in stats:
+            qlen, backlog, drops, requeues, overlimits = _GNET_QUEUE.unpack_from(stats[TCA_STATS_QUEUE])
+    elif TCA_STATS in attrs:
+        # Old struct tc_stats, only used by kernels without TCA_STATS2
+        nbytes, packets, drops, overlimits, bps, pps, qlen, backlog = _TC_STATS.unpack_from(attrs[TCA_STATS])
+    return QdiscStats(ifindex, handle, parent, kind, nbytes, packets, qlen, backlog, drops, requeues, overlimits)
+
+def setns(fd: int, nstype=CLONE_NEWNET) -> None:
+    if hasattr(os, 'setns'):
+        os.setns(fd, nstype)
+        return
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.setns(fd, nstype) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+@contextmanager
+def netns(pid: int = None):
+    """
+    Run the body with the calling thread inside the network namespace of `pid` (e.g. a Mininet node's shell pid),
+    then switch back. Sockets created inside keep talking to that namespace after the switch back,
+    which is how one process can sample every node without going through the nodes' shells. pid=None is a no-op.
+    """
+    if pid is None:
+        yield
+        return
+    own = os.open("/proc/thread-self/ns/net", os.O_RDONLY)
+    target = os.open(f"/proc/{pid}/ns/net", os.O_RDONLY)
+    try:
+        setns(target)
+        try:
+            yield
+        finally:
+            setns(own)
+    finally:
+        os.close(target)
+        os.close(own)
+
+def split_root_child(qdiscs: list) -> tuple:
+    """
+    Returns (root, child) QdiscStats, either can be None. The child is the first non-root qdisc,
+    which is what the old `tc -s qdisc show` regex picked up as the second match.
+    """
+    root = child = None
+    for qdisc in qdiscs:
+        if qdisc.parent == TC_H_ROOT:
+            root = qdisc
+        elif child is None:
+            child = qdisc
+    return root, child
+
+class QdiscSampler:
+    """
+    Reads qdisc statistics for a set of interfaces over a single rtnetlink socket.
+    One RTM_GETQDISC dump returns every qdisc in the namespace, so sampling N interfaces costs one round trip, not N forks.
+    The socket is opened in the network namespace of `netns_pid`, or of the calling thread if None.
+    """
+    def __init__(self, ifaces: list = None, netns_pid: int = None):
+        self.netns_pid = netns_pid
+        with netns(netns_pid):
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((0, 0))
+        self.seq = 0
+        self.ifindex = {}
+        for iface in (ifaces or []):
+            self.add(iface)
+
+    def add(self, iface: str) -> None:
+        with netns(self.netns_pid):
+            self.ifindex[socket.if_nametoindex(iface)] = iface
+
+    def remove(self, iface: str) -> None:
+        self.ifindex = {k: v for k, v in self.ifindex.items() if v != iface}
+
+    def dump(self) -> list:
+        """
+        Return a QdiscStats for every qdisc of the watched interfaces, in kernel dump order (root first).
+        """
+        self.seq += 1
+        request = _TCMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        header = _NLMSGHDR.pack(_NLMSGHDR.size + len(request), RTM_GETQDISC, NLM_F_REQUEST | NLM_F_DUMP, self.seq, 0)
+        self.sock.send(header + request)
+        qdiscs = []
+        for msg_type, payload in iter_messages(self.sock, self.seq):
+            if msg_type != RTM_NEWQDISC:
+                continue
+            qdisc = _parse_qdisc(payload)
+            if qdisc.ifindex in self.ifindex and qdisc.parent != TC_H_INGRESS:
+                qdiscs.append(qdisc)
+        return qdiscs
+
+    def sample(self) -> dict:
+        """
+        Returns {iface: (root, child)}, see split_root_child.
+        """
+        out = {iface: [] for iface in self.ifindex.values()}
+        for qdisc in self.dump():
+            out[self.ifindex[qdisc.ifindex]].append(qdisc)
+        return {iface: split_root_child(qdiscs) for iface, qdiscs in out.items()}
+
+    def close(self) -> None:
+        self.sock.close()
+
+def port_bytecode(sports=(), dports=()) -> bytes:
+    """
+    inet_diag filter program accepting sockets whose source port is in `sports` or destination port is in `dports`,
+    laid out like the bytecode `ss` compiles for `sport = :a or dport = :b`. Every port is a range check of two ops;
+    passing both falls through to a JMP to the end (accept), failing moves on to the next port and failing the last one
+    jumps past the end (reject). The kernel only accepts jumps that land on the chain of `yes` offsets, hence the JMPs.
+    """
+    checks = [(INET_DIAG_BC_S_GE, INET_DIAG_BC_S_LE, port) for port in sports] + [(INET_DIAG_BC_D_GE, INET_DIAG_BC_D_LE, port) for port in dports]
+    code = b''
+    for ge, le, port in reversed(checks):
+        # built back to front, `code` is everything after this check. A failed op skips the 16 bytes of the check plus the
+        # 4 byte JMP, which is the next check, or just past the end for the last one
+        block = _INET_DIAG_BC_OP.pack(ge, 8, 20) + _INET_DIAG_BC_OP.pack(0, 0, port)
+        block += _INET_DIAG_BC_OP.pack(le, 8, 12) + _INET_DIAG_BC_OP.pack(0, 0, port)
+        if code:
+            block += _INET_DIAG_BC_OP.pack(INET_DIAG_BC_JMP, 4, len(code) + 4)
+        code = block + code
+    return code
+
+def _address(family: int, raw: bytes) -> str:
+    return socket.inet_ntop(family, raw[:4] if family == socket.AF_INET else raw)
+
+def _parse_tcp_info(payload: bytes) -> TcpInfo:
+    family, state, timer, retrans, sport, dport, src, dst, ifindex, cookie, expires, rqueue, wqueue, uid, inode = _INET_DIAG_MSG.unpack_from(payload)
+    attrs = parse_attrs(payload, _INET_DIAG_MSG.size)
+    info = attrs.get(INET_DIAG_INFO, b'')[:_TCP_INFO.size]
+    info = _TCP_INFO.unpack(info + b'\0' * (_TCP_INFO.size - len(info)))
+    cong = attrs.get(INET_DIAG_CONG, b'').rstrip(b'\0').decode()
+    return TcpInfo(family, _address(family, src), int.from_bytes(sport, 'big'), _address(family, dst), int.from_bytes(dport, 'big'), rqueue, wqueue, cong, *info)
+
+class TcpInfoSampler:
+    """
+    Reads tcp_info of the established TCP sockets of a network namespace over NETLINK_SOCK_DIAG, what `ss -tin` prints but
+    without the fork and the text. `sports`/`dports` are filtered in the kernel, no filter returns every established socket.
+    """
+    def __init__(self, sports=(), dports=(), netns_pid: int = None, families=(socket.AF_INET,)):
+        self.netns_pid = netns_pid
+        with netns(netns_pid):
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_SOCK_DIAG)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((0, 0))
+        self.seq = 0
+        bytecode = port_bytecode(sports, dports)
+        if bytecode:
+            bytecode = _RTATTR.pack(_RTATTR.size + len(bytecode), INET_DIAG_REQ_BYTECODE) + bytecode
+        ext = (1 << (INET_DIAG_INFO - 1)) | (1 << (INET_DIAG_CONG - 1))
+        self.requests = [_INET_DIAG_REQ_V2.pack(family, socket.IPPROTO_TCP, ext, 1 << TCP_ESTABLISHED) + bytecode for family in families]
+
+    def dump(self) -> list:
+        """
+        Return a TcpInfo for every matching socket.
+        """
+        sockets = []
+        for request in self.requests:
+            self.seq += 1
+            header = _NLMSGHDR.pack(_NLMSGHDR.size + len(request), SOCK_DIAG_BY_FAMILY, NLM_F_REQUEST | NLM_F_DUMP, self.seq, 0)
+            self.sock.send(header + request)
+            for msg_type, payload in iter_messages(self.sock, self.seq):
+                if msg_type == SOCK_DIAG_BY_FAMILY:
+                    sockets.append(_parse_tcp_info(payload))
+        return sockets
+
+    def close(self) -> None:
+        self.sock.close()
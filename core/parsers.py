@@ -1,43 +1,44 @@
-import re, csv, json, os, io, pandas as pd
+import re, csv, json, os, io, socket, struct, numpy as np, pandas as pd
 from core.utils import *
-from collections import defaultdict
-
-
-_NUM = re.compile(r"^\s*\d+(?:\.\d+)?\s*$")
-
-def parse_genericcc_output(file: str, offset: float = 0.0) -> pd.DataFrame:
-    with open(file, "r", encoding="utf-8", errors="ignore") as f:
-        lines = f.read().replace("\ufeff", "").splitlines()
-
-    # find header
-    start = next((i for i, ln in enumerate(lines) if ln.strip().startswith("time,")), None)
-    if start is None:
-        return pd.DataFrame()
-
-    header = lines[start].strip()
-    ncols = len(next(csv.reader([header])))
-
-    rows = [header]
-    for ln in lines[start + 1:]:
-        s = ln.strip()
-        if "," not in s:
-            continue
-        try:
-            r = next(csv.reader([s]))
-        except Exception:
-            continue
-        if len(r) != ncols or not _NUM.match(r[0].strip()):
-            continue
-        rows.append(s)
-
-    if len(rows) == 1:
+from core.samples import read_samples
+from core.ss_parser import parse_ss_columns, ss_columns_to_frame
+from collections import defaultdict, namedtuple
+
+
+def parse_genericcc_output(file: str, offset: float = 0.0, chunk_chars: int = 16 << 20) -> pd.DataFrame:
+    """
+    genericCC (Copa) sender and receiver logs: a `time,...` csv header followed by rows, with the program's stderr interleaved.
+    The log is read in blocks of about `chunk_chars`, each validated in a single regex pass (as many fields as the header,
+    numeric time) and converted by the C csv reader, so 10 ms logs of long runs stay fast without holding the whole text.
+    Line endings are stripped before matching, \r\n logs parse like \n ones. Non numeric values become NaN.
+    """
+    columns, row_re, parts = None, None, []
+    with open_raw(file, "rt", encoding="utf-8", errors="ignore", newline="") as f:
+        while True:
+            lines = f.readlines(chunk_chars)
+            if not lines:
+                break
+            text = "\n".join(line.rstrip("\r\n") for line in lines).replace("\ufeff", "")
+            start = 0
+            if columns is None:
+                # find header
+                header = re.search(r"^\s*(time,.*?)\s*$", text, re.M)
+                if header is None:
+                    continue
+                columns = [c.strip() for c in header.group(1).split(",")]
+                row_re = re.compile(r"^[ \t]*\d+(?:\.\d+)?[ \t]*(?:,[^,\n]*){%d}$" % (len(columns) - 1), re.M)
+                start = header.end()
+            rows = row_re.findall(text, start)
+            if rows:
+                parts.append(pd.read_csv(io.StringIO("\n".join(rows)), header=None, names=columns, skipinitialspace=True))
+    if not parts:
         return pd.DataFrame()
 
-    df = pd.read_csv(io.StringIO("\n".join(rows) + "\n"), engine="python", on_bad_lines="skip")
-    df.columns = [c.strip() for c in df.columns]
+    df = pd.concat(parts, ignore_index=True)
     for c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df.dropna(subset=["time"]).sort_values("time").reset_index(drop=True)
+        if not pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = df.dropna(subset=["time"]).sort_values("time", kind="stable").reset_index(drop=True)
     df["time"] = df["time"] + (offset or 0.0)
     return df
 
@@ -77,8 +78,42 @@ def parse_tc_show_output(output: str) -> dict:
     
     return ret
 
-def parse_ss_to_csv(in_path: str, out_path: str, offset=0.0) -> bool:
-    ts_re = re.compile(r'^(\d+\.\d+),')
+def parse_ss_to_csv(in_path: str, out_path: str, offset=0.0, epoch=None, workers=None) -> bool:
+    '''
+    Parse `ss | ts` output into a csv with the fixed-schema parser of core.ss_parser, on `workers` processes (all cores by default).
+    With `epoch` (the run's wall clock epoch, emulation_info['epoch']['realtime']) times are seconds since the experiment epoch,
+    otherwise they are rebased on the first line and shifted by `offset`. Returns False if the file cannot be read or has no samples,
+    errors of the parser itself (or its workers) are raised.
+    '''
+    try:
+        cols = parse_ss_columns(in_path, workers)
+    except (OSError, ValueError) as e:
+        printC(f"Could not parse {in_path}: {e}", "red", ERRO)
+        return False
+    return ss_columns_to_csv(cols, out_path, offset, epoch)
+
+def ss_columns_to_csv(cols: dict, out_path: str, offset=0.0, epoch=None) -> bool:
+    '''
+    Write parsed ss columns (parse_ss_columns, SsFollower.columns) with the time axis of parse_ss_to_csv.
+    '''
+    if not len(cols['time']):
+        return False
+    if epoch is not None:
+        t0, offset = epoch, 0.0
+    else:
+        t0 = np.nanmin(cols['time'])
+    cols['time'] = (cols['time'] - t0) + (offset or 0.0)
+    ss_columns_to_frame(cols).to_csv(out_path, index=False)
+    return True
+
+def parse_ss_to_csv_generic(in_path: str, out_path: str, offset=0.0, epoch=None) -> bool:
+    '''
+    Regex based parser that discovers columns line by line, kept for ss output the fixed schema does not know.
+    Parse `ss | ts` output into a csv. With `epoch` (the run's wall clock epoch, emulation_info['epoch']['realtime']) times are
+    seconds since the experiment epoch, otherwise they are rebased on the first line and shifted by `offset`.
+    Lines from the adaptive ss scripts also carry the polling interval, kept as `sample_interval`.
+    '''
+    ts_re = re.compile(r'^(\d+\.\d+),(?:(\d+(?:\.\d+)?),)?')
     ip_port_re = re.compile(r'([\da-fA-F:.]+):(\d+)')
     keyval_colon = re.compile(r'([a-zA-Z_][\w\-]*):([^\s]+)')
     keyval_space = re.compile(r'([a-zA-Z_][\w\-]*)\s+([^\s:]+)')
@@ -140,7 +175,7 @@ def parse_ss_to_csv(in_path: str, out_path: str, offset=0.0) -> bool:
     try:
         rows, keys = [], set(base_cols)
 
-        with open(in_path, 'r', encoding='utf-8', errors='ignore') as f:
+        with open_raw(in_path, "rt", encoding="utf-8", errors="ignore") as f:
             for line in f:
                 line = line.strip()
                 if not line or ' ESTAB ' not in line:
@@ -158,6 +193,9 @@ def parse_ss_to_csv(in_path: str, out_path: str, offset=0.0) -> bool:
 
                 row = {k: None for k in base_cols}
                 row['time'], row['state'] = ts, 'ESTAB'
+                if m.group(2):
+                    row['sample_interval'] = float(m.group(2))
+                    keys.add('sample_interval')
 
                 tx = tokens[ei+1] if ei+1 < len(tokens) and tokens[ei+1].isdigit() else None
                 rx = tokens[ei+2] if ei+2 < len(tokens) and tokens[ei+2].isdigit() else None
@@ -214,8 +252,11 @@ def parse_ss_to_csv(in_path: str, out_path: str, offset=0.0) -> bool:
         if not rows:
             return False  # nothing parsed
 
-        # Make time relative from 0.0 (plus optional offset)
-        t0 = min(r['time'] for r in rows if r['time'] is not None)
+        # Make time relative to the experiment epoch, or from 0.0 (plus optional offset) for runs without one
+        if epoch is not None:
+            t0, offset = epoch, 0.0
+        else:
+            t0 = min(r['time'] for r in rows if r['time'] is not None)
         for r in rows:
             r['time'] = (r['time'] - t0) + (offset or 0.0)
 
@@ -233,53 +274,154 @@ def parse_ss_to_csv(in_path: str, out_path: str, offset=0.0) -> bool:
         print(e)
         return False
 
-def parse_iperf_json(file: str, offset: int) -> pd.DataFrame:
-
-    with open(file, 'r') as fin:
-        iperfOutput = json.load(fin)
-    
-    snd_mss = iperfOutput['start']['tcp_mss_default']
-
-    time = []
-    transferred = []
-    bandwidth = []
-    retr = []
-    cwnd = []
-    rtt = []
-    rttvar = []
-    bytes_total = 0
-    for interval in iperfOutput['intervals']:
-        interval_data = interval['streams'][0]
-        bytes_total = bytes_total + (interval_data['bytes'] / (2**20))
-        time.append(interval_data['end'] + offset)
-        transferred.append(bytes_total)
-        bandwidth.append(interval_data['bits_per_second'] / (2**20))
-        if 'retransmits' in list(interval_data.keys()):
-            retr.append(interval_data['retransmits'])
-        if 'snd_cwnd' in list(interval_data.keys()):
-            cwnd.append(interval_data['snd_cwnd'] / snd_mss)
-        if 'rtt' in list(interval_data.keys()):
-            rtt.append(interval_data['rtt'] / 1000)
-        if 'rttvar' in list(interval_data.keys()):
-            rttvar.append(interval_data['rttvar'] / 1000)
-
-
-    data_dict = {'time': time, 'transferred': transferred, 'bandwidth': bandwidth}
-    if len(retr) > 0:
-        data_dict['retr'] = retr
-    if len(cwnd) > 0:
-        data_dict['cwnd'] = cwnd
-    if len(rtt) > 0:
-        data_dict['srtt'] = rtt
-    if len(rttvar) > 0:
-        data_dict['rttvar'] = rttvar
-    
-
-    df = pd.DataFrame(data_dict)
-    return df
+def parse_ss_samples_to_csv(in_path: str, out_path: str) -> bool:
+    '''
+    Write the tcp_info samples of a sock_diag collector (MonitorService.add_sock) as the csv parse_ss_to_csv produces.
+    Times are already seconds since the experiment epoch. Returns False (and reports why) for a missing, corrupt or empty file.
+    '''
+    try:
+        df = read_samples(in_path)
+    except (OSError, ValueError, struct.error) as e:
+        printC(f"Could not read the samples of {in_path}: {e}", "red", ERRO)
+        return False
+    if df.empty:
+        printC(f"No samples in {in_path}", "red", ERRO)
+        return False
+    for col in ('local_ip', 'remote_ip'):
+        df[col] = [socket.inet_ntoa(int(ip).to_bytes(4, 'big')) if pd.notna(ip) else None for ip in df[col]]
+    df.insert(1, 'state', 'ESTAB')
+    df.to_csv(out_path, index=False)
+    return True
+
+IPERF_STREAM_FIELDS = ['socket', 'start', 'end', 'seconds', 'bytes', 'bits_per_second', 'retransmits', 'snd_cwnd', 'snd_wnd',
+                       'rtt', 'rttvar', 'pmtu', 'omitted']
+IPERF_SUM_FIELDS = ['start', 'end', 'seconds', 'bytes', 'bits_per_second', 'retransmits', 'omitted']
+
+IperfRun = namedtuple('IperfRun', ['start', 'streams', 'sum', 'end', 'complete'])
+
+def _iperf_sections(fin, chunk_chars=1 << 20):
+    """
+    Yield ('start', obj), ('interval', obj) for every interval and ('end', obj) from an iperf3 --json output without loading it whole:
+    the top level object is walked key by key and the intervals array one interval at a time. A truncated file just ends the iteration.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        data = fin.read(chunk_chars)
+        eof = not data
+        buf, pos = buf[pos:] + data, 0
+        return not eof
+
+    def skip(chars: str) -> str:
+        # skip whitespace and `chars`, return the next character ('' at the end of the file)
+        nonlocal pos
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] in chars):
+                pos += 1
+            if pos < len(buf) or not more():
+                return buf[pos:pos + 1]
+
+    def value():
+        nonlocal pos
+        while True:
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+                return obj
+            except json.JSONDecodeError:
+                if not more():
+                    raise EOFError
+
+    # anything the node printed before the json object
+    while '{' not in buf[pos:]:
+        if not more():
+            return
+    pos = buf.index('{', pos) + 1
+    try:
+        while skip(',') == '"':
+            key = value()
+            if skip(':') == '':
+                return
+            if key != 'intervals':
+                yield key, value()
+                continue
+            skip('[')
+            while skip(',') == '{':
+                yield 'interval', value()
+            pos += 1
+    except EOFError:
+        return
+
+def parse_iperf_streams(file: str) -> IperfRun:
+    """
+    Streaming parse of an iperf3 --json output into {field: array} columns for every stream (IPERF_STREAM_FIELDS plus `stream`,
+    the index of the stream in the run) and for the `sum` entries (IPERF_SUM_FIELDS). Missing values are NaN.
+    `complete` is False for outputs cut short by a killed run, the intervals read so far are kept.
+    """
+    start, end = {}, None
+    streams = {f: [] for f in ['stream'] + IPERF_STREAM_FIELDS}
+    sums = {f: [] for f in IPERF_SUM_FIELDS}
+    sockets = {}
+    with open_raw(file, 'rt', errors='ignore') as fin:
+        for key, obj in _iperf_sections(fin):
+            if key == 'interval':
+                for stream in obj.get('streams', []):
+                    streams['stream'].append(sockets.setdefault(stream.get('socket'), len(sockets)))
+                    for f in IPERF_STREAM_FIELDS:
+                        streams[f].append(stream.get(f, np.nan))
+                total = obj.get('sum', {})
+                for f in IPERF_SUM_FIELDS:
+                    sums[f].append(total.get(f, np.nan))
+            elif key == 'start':
+                start = obj
+            elif key == 'end':
+                end = obj
+    streams = {f: np.array(v, dtype=np.float64) for f, v in streams.items()}
+    sums = {f: np.array(v, dtype=np.float64) for f, v in sums.items()}
+    return IperfRun(start, streams, sums, end, end is not None)
+
+def _iperf_frame(cols: dict, mss: float, offset: float) -> pd.DataFrame:
+    """
+    The parse_iperf_json columns of one stream (or the sum): MB transferred so far, Mbps, cwnd in packets, rtt in ms.
+    Columns iperf3 did not report (retransmits, cwnd and rtt on the receiver) are left out.
+    """
+    data_dict = {'time': cols['end'] + offset, 'transferred': np.nancumsum(cols['bytes']) / (2**20), 'bandwidth': cols['bits_per_second'] / (2**20)}
+    for name, field, scale in (('retr', 'retransmits', 1), ('cwnd', 'snd_cwnd', mss), ('srtt', 'rtt', 1000), ('rttvar', 'rttvar', 1000)):
+        if field in cols and not np.isnan(cols[field]).all():
+            data_dict[name] = cols[field] / scale
+    return pd.DataFrame(data_dict)
+
+def parse_iperf_json(file: str, offset: int, stream=0) -> pd.DataFrame:
+    """
+    One stream of an iperf3 --json output, the first one by default, or the aggregate of all streams with stream='sum'.
+    """
+    run = parse_iperf_streams(file)
+    if stream == 'sum':
+        return _iperf_frame(run.sum, np.nan, offset)
+    mss = run.start.get('tcp_mss_default', np.nan)
+    keep = run.streams['stream'] == stream
+    return _iperf_frame({f: v[keep] for f, v in run.streams.items()}, mss, offset)
+
+def parse_iperf_json_streams(file: str, offset: int) -> tuple:
+    """
+    (every stream with a `stream` column, the sum) of an iperf3 --json output, for runs with parallel streams (-P).
+    """
+    run = parse_iperf_streams(file)
+    mss = run.start.get('tcp_mss_default', np.nan)
+    frames = []
+    for stream in np.unique(run.streams['stream']):
+        keep = run.streams['stream'] == stream
+        df = _iperf_frame({f: v[keep] for f, v in run.streams.items()}, mss, offset)
+        df.insert(0, 'stream', int(stream))
+        frames.append(df)
+    streams = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['stream', 'time', 'transferred', 'bandwidth'])
+    return streams, _iperf_frame(run.sum, np.nan, offset)
 
 def parse_orca_output(file: str, offset: int) -> pd.DataFrame:
-    with open(file, 'r') as fin:
+    with open_raw(file) as fin:
         orcaOutput = fin.read()
     start_index = orcaOutput.find("----START----")
     end_index = orcaOutput.find("----END----")
@@ -306,8 +448,8 @@ def parse_orca_output(file: str, offset: int) -> pd.DataFrame:
     
     return df
 
-def parse_astraea_output(file, offset):
-    with open(file, 'r') as fin:
+def parse_astraea_output(file, offset, epoch=None):
+    with open_raw(file) as fin:
         out = fin.read()
     start_index = out.find("----START----")
     end_index = out.find("----END----")
@@ -326,6 +468,10 @@ def parse_astraea_output(file, offset):
     df = pd.DataFrame(data, columns=columns)
     # Convert columns to appropriate types
     df["time"] = df["time"].astype(int)
+    if epoch is not None:
+        # astraea stamps in wall clock ms, map straight onto the experiment time axis
+        df["time"] = df["time"] / 1000 - epoch
+        return df
     min_rtt = df["time"].min()    
     df["time"] = df["time"] - min_rtt 
     df["time"] = df["time"]/ 1000
@@ -338,13 +484,13 @@ def parse_astraea_output(file, offset):
     return df
 
 def parse_vivace_uspace_output(file, offset):
-    df = pd.read_csv(
-        file,
-        encoding="utf-8",
-        skip_blank_lines=True,
-        engine="python",      
-        on_bad_lines="skip" 
-    )
+    with open_raw(file, "rt", encoding="utf-8") as fin:
+        df = pd.read_csv(
+            fin,
+            skip_blank_lines=True,
+            engine="python",
+            on_bad_lines="skip"
+        )
 
     if "time" not in df.columns:
         raise ValueError("Input must contain a column named 'time'.")
@@ -356,7 +502,7 @@ def parse_vivace_uspace_output(file, offset):
     return df
     
 def parse_aurora_output(file, offset):
-    with open(file, 'r') as fin:
+    with open_raw(file) as fin:
         auroraOutput = fin.read()
 
     start_index = auroraOutput.find("new connection")
@@ -0,0 +1,56 @@
+import threading, traceback
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from core.utils import *
+
+# Per-run plotting as its own stage. The emulation threads of a driver only submit() the path of a finished run and go on
+# with the next emulation, a pool of PLOT_JOBS processes renders the plots. The plots use the object-oriented Figure API, no
+# pyplot state is shared. Workers come from a forkserver: forking the threaded driver (mininet, emulation timers) is not safe.
+
+def _plots() -> dict:
+    from core.analysis import plot_all_mn, plot_all_cpu
+    return {'mn': plot_all_mn, 'cpu': plot_all_cpu}
+
+def render_run(path: str, plots=('mn', 'cpu')) -> None:
+    """
+    Render the per-run `plots` of one processed run: 'mn' (plot.pdf) and 'cpu' (cpu_plot.pdf).
+    """
+    available = _plots()
+    for name in plots:
+        available[name](path)
+    change_all_user_permissions(path)
+
+class PlotPool:
+    """
+    Process pool rendering per-run plots of finished runs, `workers` processes (PLOT_JOBS by default). Thread safe,
+    close() (or leaving the with block) waits for everything submitted and returns the paths whose plots failed.
+    """
+    def __init__(self, workers=None, plots=('mn', 'cpu')):
+        self.plots = tuple(plots)
+        self.executor = ProcessPoolExecutor(max_workers=workers or PLOT_JOBS, mp_context=get_context('forkserver'))
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def submit(self, path: str) -> None:
+        future = self.executor.submit(render_run, path, self.plots)
+        with self.lock:
+            self.futures[future] = path
+
+    def close(self) -> list:
+        with self.lock:
+            futures = dict(self.futures)
+        wait(futures)
+        failed = []
+        for future, path in futures.items():
+            if future.exception() is not None:
+                error = ''.join(traceback.format_exception(future.exception()))
+                printC(f"Plotting {path} failed:\n{error}", "red", ERRO)
+                failed.append(path)
+        self.executor.shutdown()
+        return failed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Time binning for the figure scripts, which bring every flow's series to whole seconds before comparing flows. The idiom
+# they used, df['time'] = df['time'].astype(float).astype(int) then drop_duplicates('time') (or groupby('time').mean()),
+# then set_index('time') and a join per flow, becomes bin_series plus align: one np.floor and one sort-based reduction per
+# column instead of per-row Python and one groupby per column. how='first' is exactly what drop_duplicates kept (the first
+# sample of every bin), the other reductions make that choice explicit.
+
+HOWS = ('first', 'last', 'mean', 'max', 'min', 'sum', 'count')
+
+def _bins(t: np.ndarray, step) -> np.ndarray:
+    return np.floor(t / step).astype(np.int64)
+
+def _between(x, start, end, inclusive: str) -> np.ndarray:
+    keep = np.ones(len(x), dtype=bool)
+    if start is not None:
+        keep &= (x >= start) if inclusive in ('both', 'left') else (x > start)
+    if end is not None:
+        keep &= (x <= end) if inclusive in ('both', 'right') else (x < end)
+    return keep
+
+def bin_series(df: pd.DataFrame, step=1, how='first', columns=None, start=None, end=None, inclusive='both', origin=0,
+               time='time') -> pd.DataFrame:
+    """
+    `df` on a grid of `step` seconds: sample times are floored to the grid (after subtracting `origin`, e.g. the flow's
+    start) and the samples of every bin reduced with `how` (one of HOWS, NaNs are skipped except by 'first'/'last', which
+    keep whole rows like drop_duplicates). Only bins between `start` and `end` are kept, the ends included as in
+    pd.Series.between(inclusive=...). Returns the `columns` (all but `time`, numeric ones only for the reducing `how`s)
+    indexed by the bin times, named `time`, as integers for whole-second steps.
+    """
+    if how not in HOWS:
+        raise ValueError(f"Unknown binning {how}, expected one of {HOWS}")
+    t = pd.to_numeric(df[time], errors='coerce').to_numpy(dtype=np.float64) - origin
+    ok = np.isfinite(t)
+    k = _bins(t[ok], step)
+    integral = float(step).is_integer()
+    grid = k * int(step) if integral else k * step
+    keep = _between(grid, start, end, inclusive)
+    rows = np.flatnonzero(ok)[keep]
+    k, grid = k[keep], grid[keep]
+
+    columns = [c for c in df.columns if c != time] if columns is None else list(columns)
+    if how in ('first', 'last'):
+        if how == 'first':
+            uniq, pick = np.unique(k, return_index=True)
+        else:
+            uniq, pick = np.unique(k[::-1], return_index=True)
+            pick = len(k) - 1 - pick
+        out = df[columns].iloc[rows[pick]].reset_index(drop=True)
+        out.index = pd.Index(grid[pick], name=time)
+        return out
+
+    # the reductions: sort by bin once, reduceat over the runs of equal bins
+    order = np.argsort(k, kind='stable')
+    ks = k[order]
+    starts = np.flatnonzero(np.r_[True, ks[1:] != ks[:-1]]) if len(ks) else np.zeros(0, dtype=np.int64)
+    index = pd.Index(grid[order][starts], name=time)
+    out = {}
+    for c in columns:
+        if not pd.api.types.is_numeric_dtype(df[c]):
+            continue
+        v = df[c].to_numpy(dtype=np.float64)[rows][order]
+        valid = ~np.isnan(v)
+        if not len(starts):
+            out[c] = np.zeros(0)
+            continue
+        n = np.add.reduceat(valid.astype(np.int64), starts)
+        if how == 'count':
+            out[c] = n
+            continue
+        if how in ('mean', 'sum'):
+            total = np.add.reduceat(np.where(valid, v, 0.0), starts)
+            out[c] = total if how == 'sum' else np.divide(total, n, out=np.full(len(n), np.nan), where=n > 0)
+        else:
+            # fmax/fmin skip NaNs unless a bin has nothing else
+            out[c] = (np.fmax if how == 'max' else np.fmin).reduceat(v, starts)
+    return pd.DataFrame(out, index=index)
+
+def align(series, join='inner', grid=None) -> pd.DataFrame:
+    """
+    Binned series of several flows side by side: a dict {name: Series} (or a list, named 0..n-1) becomes one frame with a
+    column per flow, on the bins all of them have (`join`='inner') or any has ('outer'), or reindexed onto `grid`.
+    """
+    if not isinstance(series, dict):
+        series = dict(enumerate(series))
+    out = pd.concat(series, axis=1, join=join)
+    if grid is not None:
+        out = out.reindex(grid)
+    return out.sort_index()
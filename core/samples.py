@@ -0,0 +1,103 @@
+import os, json, mmap, struct
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Binary sample files written by the monitors. Layout:
+#   0   b'SMPL'
+#   4   u32 length of the JSON header (padded so records start 8-byte aligned)
+#   8   u64 number of committed records
+#   16  JSON header {"fields": [...], "format": "<struct format of one record>"}
+#   ... fixed-width records
+# The file is preallocated and memory mapped, so a sample costs one struct.pack_into and the kernel writes pages back in
+# batches. The record count lives in the mapping too, so a monitor that gets killed still leaves a readable file.
+
+MAGIC = b'SMPL'
+MISSING = -(2**63)
+_PREAMBLE = struct.Struct("=4sIQ")
+
+class SampleWriter:
+    """
+    Appends fixed-width records described by `fields` and a struct `fmt` (one code per field, 'd' for floats, 'q' for ints).
+    Missing values are written as NaN for floats and MISSING for ints.
+    """
+    def __init__(self, path: str, fields: list, fmt: str, capacity=65536):
+        self.path = path
+        self.fields = list(fields)
+        self.record = struct.Struct("=" + fmt)
+        self.missing = tuple(float('nan') if code == 'd' else MISSING for code in fmt)
+        header = json.dumps({'fields': self.fields, 'format': fmt}).encode()
+        header += b' ' * (-(_PREAMBLE.size + len(header)) % 8)
+        self.data_offset = _PREAMBLE.size + len(header)
+        self.count = 0
+        self.capacity = capacity
+        self.file = open(path, 'w+b')
+        self.file.write(_PREAMBLE.pack(MAGIC, len(header), 0) + header)
+        self._map()
+
+    def _map(self) -> None:
+        self.file.truncate(self.data_offset + self.capacity * self.record.size)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+    def write(self, *values) -> None:
+        if self.count == self.capacity:
+            # preallocate the next batch of records and remap
+            self.mm.close()
+            self.capacity *= 2
+            self._map()
+        values = tuple(self.missing[i] if v is None else v for i, v in enumerate(values))
+        self.record.pack_into(self.mm, self.data_offset + self.count * self.record.size, *values)
+        self.count += 1
+        struct.pack_into("=Q", self.mm, 8, self.count)
+
+    def flush(self) -> None:
+        self.mm.flush()
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        self.mm.flush()
+        self.mm.close()
+        self.file.truncate(self.data_offset + self.count * self.record.size)
+        self.file.close()
+
+def read_samples(path: str) -> pd.DataFrame:
+    """
+    Load a SampleWriter file. Int columns with missing values come back as nullable Int64.
+    """
+    with open(path, 'rb') as f:
+        magic, header_len, count = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a sample file")
+        header = json.loads(f.read(header_len))
+    dtype = np.dtype([(name, '<f8' if code == 'd' else '<i8') for name, code in zip(header['fields'], header['format'])])
+    records = np.fromfile(path, dtype=dtype, count=count, offset=_PREAMBLE.size + header_len)
+    df = pd.DataFrame({name: records[name] for name in header['fields']})
+    for name, code in zip(header['fields'], header['format']):
+        if code == 'q' and (df[name] == MISSING).any():
+            df[name] = df[name].astype('Int64').mask(df[name] == MISSING)
+    return df
+
+def samples_to_csv(path: str, out_path, remove_binary=True) -> pd.DataFrame:
+    """
+    `out_path` can also be an open text file, e.g. a compressing one.
+    """
+    df = read_samples(path)
+    df.to_csv(out_path, index=False)
+    if remove_binary:
+        os.remove(path)
+    return df
+
+def samples_to_parquet(path: str, out_path: str, remove_binary=True) -> pd.DataFrame:
+    if pa is None:
+        raise ImportError("pyarrow is required to write parquet")
+    df = read_samples(path)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), out_path)
+    if remove_binary:
+        os.remove(path)
+    return df
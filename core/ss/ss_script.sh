@@ -1,12 +1,54 @@
 #!/bin/bash
 
 # Ensure the script receives the required arguments
-if [ "$#" -ne 2 ]; then
-    echo "Usage: $0 <interval> <experiment_path>"
+# Optional adaptive mode: poll every <fast_interval> inside <windows>, a comma separated list of start:end wall clock
+# times in microseconds (same clock as $EPOCHREALTIME), and every <interval> elsewhere.
+# Each line is prefixed with its timestamp and the interval it was sampled at.
+# Optional compression: SS_COMPRESS is a compressor command reading stdin (e.g. "gzip -3" or "zstd -q -3"). Lines are
+# buffered and appended as one compressed member about every second; concatenated gzip members or zstd frames are
+# still one valid stream, and a kill at the end of a run loses at most the last second. Nothing is appended for seconds
+# without sockets. SIGTERM (Emulation.stop_ss, once the node's flow is done) writes what is buffered and stops the loop.
+if [ "$#" -ne 2 ] && [ "$#" -ne 4 ]; then
+    echo "Usage: $0 <interval> <experiment_path> [<fast_interval> <windows>]"
     exit 1
 fi
 
-while true; do
-    ss -OHtin | ts '%.s,' >> "$2" 
-    sleep "$1"
-done &
+IFS=',' read -ra WINDOWS <<< "${4:-}"
+out="$2"
+buf=""
+flushed=${EPOCHREALTIME/./}
+
+flush() {
+    if [ -n "$buf" ]; then
+        printf '%s' "$buf" | $SS_COMPRESS >> "$out"
+        buf=""
+    fi
+    flushed=${EPOCHREALTIME/./}
+}
+
+{
+    # traps are not inherited by the background subshell, set it inside
+    trap 'flush; exit 0' TERM
+    while true; do
+        iv="$1"
+        now=${EPOCHREALTIME/./}
+        for w in "${WINDOWS[@]}"; do
+            if (( now >= ${w%:*} && now < ${w#*:} )); then
+                iv="$3"
+                break
+            fi
+        done
+        if [ -n "$SS_COMPRESS" ]; then
+            lines="$(ss -OHtin | ts "%.s,$iv,")"
+            if [ -n "$lines" ]; then
+                buf+="$lines"$'\n'
+            fi
+            if (( now - flushed >= 1000000 )); then
+                flush
+            fi
+        else
+            ss -OHtin | ts "%.s,$iv," >> "$out"
+        fi
+        sleep "$iv"
+    done
+} &
@@ -0,0 +1,237 @@
+import os
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+from core.utils import *
+
+# Fixed-schema parser for `ss -OHtin | ts` output. Every line is split once on whitespace and the known tcp_info keys go
+# straight into preallocated NumPy columns, no per-line dicts or regexes. Plain files are cut into byte ranges that are
+# parsed on all cores; compressed files are decompressed as a stream and handed to the workers in blocks of lines.
+# SsFollower parses a file incrementally while the run is still writing it (see core/live_parser.py).
+
+STR_COLUMNS = ['state', 'local_ip', 'remote_ip', 'cong']
+INT_COLUMNS = ['tx_queue', 'rx_queue', 'local_port', 'remote_port', 'advmss', 'app_limited', 'backoff', 'busy_ms', 'bytes_acked',
+               'bytes_received', 'bytes_retrans', 'bytes_sent', 'cwnd', 'data_segs_in', 'data_segs_out', 'delivered', 'delivered_ce',
+               'dsack_dups', 'fackets', 'lastack', 'lastrcv', 'lastsnd', 'lost', 'mss', 'notsent', 'pmtu', 'rcv_space', 'rcv_ssthresh',
+               'rcv_wnd', 'rcvmss', 'reord_seen', 'reordering', 'retrans', 'retrans_total', 'rwnd_limited_ms', 'sacked', 'segs_in',
+               'segs_out', 'snd_wnd', 'sndbuf_limited_ms', 'ssthresh', 'unacked', 'wscale_rcv', 'wscale_snd']
+FLOAT_COLUMNS = ['time', 'ato', 'bbr_bw_bps', 'bbr_cwnd_gain', 'bbr_mrtt', 'bbr_pacing_gain', 'delivery_rate_bps', 'minrtt',
+                 'pacing_rate_bps', 'rcv_rtt', 'rto', 'rtt', 'rttvar', 'rwnd_limited_pct', 'sample_interval', 'send_bps', 'sndbuf_limited_pct']
+
+BASE_COLUMNS = ['time', 'state', 'tx_queue', 'rx_queue', 'local_ip', 'local_port', 'remote_ip', 'remote_port', 'cong']
+# same order parse_ss_to_csv always wrote: the fixed columns, then everything else sorted
+SS_COLUMNS = BASE_COLUMNS + sorted(set(STR_COLUMNS + INT_COLUMNS + FLOAT_COLUMNS) - set(BASE_COLUMNS))
+
+# key:a/b and key:a,b tokens
+_PAIRS = {'rtt': ('rtt', 'rttvar'), 'retrans': ('retrans', 'retrans_total'), 'wscale': ('wscale_snd', 'wscale_rcv')}
+# key:12ms(3.4%) tokens
+_MS_PCT = {'busy': 'busy_ms', 'rwnd_limited': 'rwnd_limited_ms', 'sndbuf_limited': 'sndbuf_limited_ms'}
+# `key value` tokens
+_SPACED = {'send': 'send_bps', 'pacing_rate': 'pacing_rate_bps', 'delivery_rate': 'delivery_rate_bps'}
+_FLAGS = {'app_limited'}
+_SCALE = {'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+
+def _bps(v: str) -> str:
+    v = v.split('/', 1)[0]
+    if v.endswith('bps'):
+        v = v[:-3]
+    if v and v[-1] in _SCALE:
+        return repr(float(v[:-1]) * _SCALE[v[-1]])
+    return v
+
+def _address(token: str) -> tuple:
+    ip, _, port = token.rpartition(':')
+    return ip.strip('[]'), port
+
+def _to_float(values: list) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        # a malformed value somewhere in the block, convert one by one
+        out = np.full(len(values), np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                pass
+        return out
+
+def parse_ss_lines(lines: list) -> dict:
+    """
+    Parse `ss | ts` lines into {column: array}. Strings are object arrays, everything else float64 with NaN for missing.
+    Only ESTAB sockets are kept, like parse_ss_to_csv. Values are collected as strings and converted column-wise by NumPy.
+    """
+    n = len(lines)
+    cols = {c: ['nan'] * n for c in INT_COLUMNS + FLOAT_COLUMNS}
+    for c in STR_COLUMNS:
+        cols[c] = [None] * n
+    time, interval, state, tx, rx = cols['time'], cols['sample_interval'], cols['state'], cols['tx_queue'], cols['rx_queue']
+    lip, lport, rip, rport, cong = cols['local_ip'], cols['local_port'], cols['remote_ip'], cols['remote_port'], cols['cong']
+    i = 0
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) < 6 or tokens[1] != 'ESTAB':
+            continue
+        stamp = tokens[0].split(',')
+        time[i] = stamp[0]
+        if len(stamp) > 2 and stamp[1]:
+            interval[i] = stamp[1]
+        state[i] = 'ESTAB'
+        tx[i], rx[i] = tokens[2], tokens[3]
+        lip[i], lport[i] = _address(tokens[4])
+        rip[i], rport[i] = _address(tokens[5])
+        j = 6
+        if j < len(tokens) and ':' not in tokens[j] and tokens[j] not in _SPACED and tokens[j] not in _FLAGS:
+            cong[i] = tokens[j]
+            j += 1
+        ntokens = len(tokens)
+        while j < ntokens:
+            key, sep, value = tokens[j].partition(':')
+            j += 1
+            if not sep:
+                if key in _SPACED and j < ntokens:
+                    cols[_SPACED[key]][i] = _bps(tokens[j])
+                    j += 1
+                elif key in _FLAGS:
+                    cols[key][i] = '1'
+                continue
+            if key in _PAIRS:
+                a, _, b = value.replace(',', '/').partition('/')
+                first, second = _PAIRS[key]
+                cols[first][i] = a
+                if b:
+                    cols[second][i] = b
+            elif key in cols:
+                cols[key][i] = value
+            elif key in _MS_PCT:
+                ms, _, pct = value.partition('ms')
+                cols[_MS_PCT[key]][i] = ms
+                if pct and key + '_pct' in cols:
+                    cols[key + '_pct'][i] = pct.strip('(%)')
+            elif value.startswith('('):
+                # bbr:(bw:1bps,mrtt:2,pacing_gain:3,cwnd_gain:4)
+                for item in value.strip('()').split(','):
+                    k, _, v = item.partition(':')
+                    k = f"{key}_{k}"
+                    if k + '_bps' in cols:
+                        cols[k + '_bps'][i] = _bps(v)
+                    elif k in cols:
+                        cols[k][i] = v
+            elif '-' in key and key.replace('-', '_') in cols:
+                cols[key.replace('-', '_')][i] = value
+        i += 1
+    out = {c: np.array(cols[c][:i], dtype=object) for c in STR_COLUMNS}
+    for c in INT_COLUMNS + FLOAT_COLUMNS:
+        out[c] = _to_float(cols[c][:i])
+    return out
+
+def _parse_range(args) -> dict:
+    path, start, end = args
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return parse_ss_lines(data.decode('utf-8', errors='ignore').splitlines())
+
+def _ranges(path: str, n: int) -> list:
+    """
+    Cut a plain file into about `n` byte ranges that start and end on line boundaries.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for k in range(1, n):
+            f.seek(max(bounds[-1], size * k // n))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(path, a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+def _line_blocks(path: str, block_bytes: int):
+    with open_raw(path, 'rt', encoding='utf-8', errors='ignore') as f:
+        while True:
+            lines = f.readlines(block_bytes)
+            if not lines:
+                return
+            yield lines
+
+def parse_ss_columns(path: str, workers: int = None, chunk_bytes: int = 16 << 20, mp_context=None) -> dict:
+    """
+    Parse a raw ss file (plain, .gz or .zst, see open_raw) into {column: array} on up to `workers` processes (all cores by default).
+    Plain files are split into byte ranges of about `chunk_bytes`, a file of a single range is parsed in process.
+    The processes come from `mp_context`, a forkserver by default: this runs on the emulation threads of the threaded drivers.
+    """
+    workers = workers or os.cpu_count() or 1
+    mp_context = mp_context or get_context('forkserver')
+    found = find_raw(path)
+    if found is None:
+        raise FileNotFoundError(path)
+    if found == path:
+        chunks = _ranges(path, max(1, os.path.getsize(path) // chunk_bytes))
+        if len(chunks) <= 1 or workers == 1:
+            parts = [_parse_range(c) for c in chunks]
+        else:
+            with mp_context.Pool(min(workers, len(chunks))) as pool:
+                parts = list(pool.imap(_parse_range, chunks))
+    elif workers == 1:
+        parts = [parse_ss_lines(block) for block in _line_blocks(path, chunk_bytes)]
+    else:
+        with mp_context.Pool(workers) as pool:
+            parts = list(pool.imap(parse_ss_lines, _line_blocks(path, chunk_bytes)))
+    return concat_columns(parts)
+
+def concat_columns(parts: list) -> dict:
+    if not parts:
+        return parse_ss_lines([])
+    return {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+
+class SsFollower:
+    """
+    Follows an ss script file while the script is still appending to it. Every poll() parses the complete lines written since the
+    last one, columns() returns everything so far. Compressed files (one member per second) are only parsed whole, by columns().
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.pos = 0
+        self.tail = b''
+        self.parts = []
+
+    def poll(self) -> int:
+        if find_raw(self.path) != self.path:
+            return 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.pos)
+            data = f.read()
+        self.pos += len(data)
+        data = self.tail + data
+        end = data.rfind(b'\n') + 1
+        self.tail = data[end:]
+        if end:
+            self.parts.append(parse_ss_lines(data[:end].decode('utf-8', errors='ignore').splitlines()))
+        return end
+
+    def columns(self) -> dict:
+        found = find_raw(self.path)
+        if found is None:
+            raise FileNotFoundError(self.path)
+        if found != self.path:
+            return parse_ss_columns(self.path, workers=1)
+        self.poll()
+        parts = self.parts + [parse_ss_lines(self.tail.decode('utf-8', errors='ignore').splitlines())]
+        return concat_columns(parts)
+
+def ss_columns_to_frame(cols: dict) -> pd.DataFrame:
+    """
+    DataFrame in SS_COLUMNS order, integer columns as nullable Int64. Columns that no line had are left out,
+    so the header is the one parse_ss_to_csv used to discover line by line.
+    """
+    frame = {}
+    for c in SS_COLUMNS:
+        values = cols[c]
+        if c in STR_COLUMNS:
+            if c in BASE_COLUMNS or any(v is not None for v in values):
+                frame[c] = values
+            continue
+        if c not in BASE_COLUMNS and np.isnan(values).all():
+            continue
+        frame[c] = pd.array(values, dtype='Int64') if c in INT_COLUMNS else values
+    return pd.DataFrame(frame)
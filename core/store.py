@@ -0,0 +1,197 @@
+import os, json, glob
+from collections import defaultdict
+import pandas as pd
+from core.utils import *
+from core.manifest import Manifest, fingerprint
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Per-run columnar result store written by process_raw_outputs: {run}/store/{table}.parquet, one typed file per table with the
+# csvs of every flow stacked under a `flow` column (the node name, the interface name for queues). Rows are sorted by flow and
+# time and written in small row groups, so a load() with a time window only decodes the row groups whose time statistics
+# overlap it and only the requested columns. store/index.json maps every former csv name to its table, flow and columns.
+# Runs without a store (older runs, no pyarrow) are read from csvs/ by the same loaders. update_store only rewrites the store
+# when the run's manifest shows that a flow was re-parsed or the queue samples changed.
+
+STORE_TABLES = ['sender', 'receiver', 'ss', 'tcp_probe', 'streams', 'sum', 'queue']
+STORE_VERSION = 1
+ROW_GROUP_SIZE = 16384
+
+# csv name suffix -> table, names without one are the sender or receiver csv of a node
+_SUFFIXES = [('_tcp_probe', 'tcp_probe'), ('_streams', 'streams'), ('_sum', 'sum'), ('_ss', 'ss')]
+
+def _classify(name: str, senders: set) -> tuple:
+    for suffix, table in _SUFFIXES:
+        if name.endswith(suffix):
+            return table, name[:-len(suffix)]
+    return ('sender' if name in senders else 'receiver'), name
+
+def _queue_files(path: str) -> list:
+    return sorted(glob.glob(f"{path}/queues/*.txt") + glob.glob(f"{path}/queues/*.txt.gz") +
+                  glob.glob(f"{path}/queues/*.txt.zst") + glob.glob(f"{path}/queues/*.parquet"))
+
+def _read_index(path: str) -> dict:
+    try:
+        with open(f"{path}/store/index.json", 'r') as fin:
+            return json.load(fin)
+    except (OSError, ValueError):
+        return {}
+
+def write_store(path: str, remove_csvs=False) -> bool:
+    """
+    Gather csvs/*.csv and the queue samples of a processed run into {path}/store. With `remove_csvs` the csvs that went into
+    the store are deleted, every loader of this module reads the store instead. Results of an earlier store that have no csv
+    anymore are carried over.
+    """
+    if pa is None:
+        printC("pyarrow is not installed, results stay in csvs/", "yellow", INFO)
+        return False
+    with open(f"{path}/emulation_info.json", 'r') as fin:
+        senders = {str(flow[0]) for flow in json.load(fin)['flows']}
+
+    tables, index, stored = defaultdict(list), {}, []
+    for csv_path in sorted(glob.glob(f"{path}/csvs/*.csv")):
+        name = os.path.basename(csv_path)[:-len(".csv")]
+        table, flow = _classify(name, senders)
+        try:
+            df = pd.read_csv(csv_path)
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame()
+        index[name] = {'table': table, 'flow': flow, 'columns': list(df.columns)}
+        df.insert(0, 'flow', flow)
+        tables[table].append(df)
+        stored.append(csv_path)
+    for name, entry in _read_index(path).items():
+        if name in index or entry['table'] == 'queue':
+            continue
+        df = load_csv(path, name)
+        index[name] = entry
+        df.insert(0, 'flow', entry['flow'])
+        tables[entry['table']].append(df)
+    for queue_path in _queue_files(path):
+        iface = os.path.basename(queue_path).split('.')[0]
+        if queue_path.endswith('.parquet'):
+            df = pd.read_parquet(queue_path)
+        else:
+            with open_raw(queue_path) as fin:
+                df = pd.read_csv(fin)
+        index[f"queues/{iface}"] = {'table': 'queue', 'flow': iface, 'columns': list(df.columns)}
+        df.insert(0, 'flow', iface)
+        tables['queue'].append(df)
+
+    mkdirp(f"{path}/store")
+    for table, frames in tables.items():
+        df = pd.concat(frames, ignore_index=True)
+        if 'time' in df.columns:
+            df['time'] = pd.to_numeric(df['time'], errors='coerce')
+            df = df.sort_values(['flow', 'time'], kind='stable')
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), f"{path}/store/{table}.parquet",
+                       row_group_size=ROW_GROUP_SIZE, compression='zstd')
+    with open(f"{path}/store/index.json", 'w') as fout:
+        json.dump(index, fout)
+    if remove_csvs:
+        for csv_path in stored:
+            remove(csv_path)
+    return True
+
+def update_store(path: str, remove_csvs=False) -> bool:
+    """
+    write_store, unless the run's manifest shows the store was written from the flows and queue samples the run has now.
+    Returns whether the store was written.
+    """
+    manifest = Manifest(path)
+    params = {'flows': manifest.flows_digest()}
+    inputs = {f"queues/{os.path.basename(file)}": file for file in _queue_files(path)}
+    if manifest.up_to_date('store', f"store/{STORE_VERSION}", params, inputs):
+        return False
+    old = (manifest.get('store') or {}).get('inputs', {})
+    fingerprints = {name: fingerprint(file, old.get(name)) for name, file in inputs.items()}
+    if not write_store(path, remove_csvs):
+        return False
+    outputs = ["store/index.json"] + [f"store/{table}.parquet" for table in STORE_TABLES if os.path.exists(f"{path}/store/{table}.parquet")]
+    manifest.set('store', {'parser': f"store/{STORE_VERSION}", 'params': params, 'inputs': fingerprints, 'outputs': outputs})
+    manifest.save()
+    return True
+
+def load(path: str, table: str, columns=None, flows=None, time_range=None) -> pd.DataFrame:
+    """
+    Rows of one store table, with only `columns` (plus `flow`), only `flows` and only times in [start, end) of `time_range`.
+    Filters are pushed down to the parquet reader. Runs without a store are read from their csvs with the same filters.
+    """
+    filters = []
+    if flows is not None:
+        filters.append(('flow', 'in', list(flows)))
+    if time_range is not None:
+        filters += [('time', '>=', time_range[0]), ('time', '<', time_range[1])]
+    file = f"{path}/store/{table}.parquet"
+    if pa is not None and os.path.exists(file):
+        names = pq.read_schema(file).names
+        if columns is not None:
+            columns = [c for c in dict.fromkeys(['flow'] + list(columns)) if c in names]
+        return pq.read_table(file, columns=columns, filters=filters or None).to_pandas()
+
+    frames = []
+    with open(f"{path}/emulation_info.json", 'r') as fin:
+        senders = {str(flow[0]) for flow in json.load(fin)['flows']}
+    for csv_path in sorted(glob.glob(f"{path}/csvs/*.csv")):
+        name = os.path.basename(csv_path)[:-len(".csv")]
+        csv_table, flow = _classify(name, senders)
+        if csv_table != table or (flows is not None and flow not in flows):
+            continue
+        df = load_csv(path, name, columns, time_range)
+        df.insert(0, 'flow', flow)
+        frames.append(df)
+    if table == 'queue':
+        for queue_path in _queue_files(path):
+            iface = os.path.basename(queue_path).split('.')[0]
+            if flows is not None and iface not in flows:
+                continue
+            if queue_path.endswith('.parquet'):
+                df = pd.read_parquet(queue_path)
+            else:
+                with open_raw(queue_path) as fin:
+                    df = pd.read_csv(fin)
+            if time_range is not None:
+                df = df[(df['time'] >= time_range[0]) & (df['time'] < time_range[1])]
+            if columns is not None:
+                df = df[[c for c in columns if c in df.columns]]
+            df.insert(0, 'flow', iface)
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def has_csv(path: str, name: str) -> bool:
+    """
+    Whether the run has the results that used to be csvs/{name}.csv, in the store or as a csv.
+    """
+    return name in _read_index(path) or os.path.exists(f"{path}/csvs/{name}.csv")
+
+def csv_sources(path: str, name: str) -> list:
+    """
+    The files load_csv(path, name) reads, for caches that key on them (core/cache.py).
+    """
+    entry = _read_index(path).get(name)
+    if entry is not None and pa is not None:
+        return [f"{path}/store/index.json", f"{path}/store/{entry['table']}.parquet"]
+    return [f"{path}/csvs/{name}.csv"]
+
+def load_csv(path: str, name: str, columns=None, time_range=None) -> pd.DataFrame:
+    """
+    What pd.read_csv(f"{path}/csvs/{name}.csv") used to return, from the store if the run has one, with only `columns`
+    and only times in [start, end) of `time_range`. Raises FileNotFoundError like read_csv when the run has neither.
+    """
+    entry = _read_index(path).get(name)
+    if entry is not None and pa is not None:
+        df = load(path, entry['table'], columns, [entry['flow']], time_range)
+        keep = [c for c in entry['columns'] if c in df.columns]
+        return df[keep].reset_index(drop=True)
+    wanted = None if columns is None else set(columns) | ({'time'} if time_range is not None else set())
+    df = pd.read_csv(f"{path}/csvs/{name}.csv", usecols=None if wanted is None else (lambda c: c in wanted))
+    if time_range is not None:
+        df = df[(df['time'] >= time_range[0]) & (df['time'] < time_range[1])].reset_index(drop=True)
+        if columns is not None and 'time' not in columns:
+            df = df.drop(columns='time')
+    return df
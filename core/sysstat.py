@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pandas as pd
+from core.utils import *
+
+# Reader for the `sadf -d -U -- -P ALL` cpu logs written by stop_sysstat (sysstat/cpu_*.log). One typed read with pandas' C
+# parser instead of the python engine and per-column coercion, the columns are cached next to the log ({log}.npz) and reused
+# while the log is unchanged. core_matrix turns the per-core rows into a (core x time) array for the heatmap of plot_all_cpu,
+# read_sadf_log reads the other reports (dev, etcp, ...) by their header.
+
+CPU_METRICS = ["%user", "%nice", "%system", "%iowait", "%steal", "%idle"]
+CPU_LOG_COLUMNS = ["hostname", "interval", "timestamp", "CPU"] + CPU_METRICS
+# per-core utilisation from which a core counts as saturated
+CPU_SATURATION_PCT = 95
+CACHE_SUFFIX = ".npz"
+
+def _empty_cpu() -> dict:
+    cols = {'timestamp': np.zeros(0), 'cpu': np.zeros(0, dtype=np.int32)}
+    cols.update({m: np.zeros(0, dtype=np.float32) for m in CPU_METRICS})
+    return cols
+
+def _parse_cpu_log(file: str) -> dict:
+    read = dict(sep=';', comment='#', header=None, names=CPU_LOG_COLUMNS, usecols=CPU_LOG_COLUMNS[2:], engine='c')
+    try:
+        df = pd.read_csv(file, dtype={'timestamp': np.float64, 'CPU': np.int32, **{m: np.float32 for m in CPU_METRICS}}, **read)
+        cpu = df['CPU'].to_numpy()
+    except pd.errors.EmptyDataError:
+        return _empty_cpu()
+    except (ValueError, TypeError):
+        # 'all' instead of -1, LINUX-RESTART records or a truncated last line: the same read untyped, coerced column-wise
+        df = pd.read_csv(file, dtype=str, **read)
+        df['timestamp'] = pd.to_numeric(df['timestamp'], errors='coerce')
+        cpu_str = df['CPU'].str.strip().str.lower()
+        cpu = np.where(cpu_str == 'all', -1, pd.to_numeric(cpu_str, errors='coerce'))
+        for m in CPU_METRICS:
+            df[m] = pd.to_numeric(df[m], errors='coerce')
+        keep = (df['timestamp'].notna() & np.isfinite(cpu)).to_numpy()
+        df, cpu = df[keep], cpu[keep]
+    cols = {'timestamp': df['timestamp'].to_numpy(dtype=np.float64), 'cpu': np.asarray(cpu, dtype=np.int32)}
+    cols.update({m: df[m].to_numpy(dtype=np.float32) for m in CPU_METRICS})
+    return cols
+
+def read_cpu_log(file: str, cache=True) -> pd.DataFrame:
+    """
+    A sadf cpu log as columns timestamp (epoch seconds), cpu (core number, -1 for the all-cores rows) and CPU_METRICS.
+    With `cache` the columns are stored as {file}.npz and read from there while it is newer than the log.
+    """
+    cached = file + CACHE_SUFFIX
+    if cache and os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(file):
+        try:
+            with np.load(cached) as data:
+                return pd.DataFrame({k: data[k] for k in data.files})
+        except (OSError, ValueError):
+            pass
+    cols = _parse_cpu_log(file)
+    if cache:
+        try:
+            with open(cached + ".tmp", 'wb') as fout:
+                np.savez(fout, **cols)
+            os.replace(cached + ".tmp", cached)
+        except OSError:
+            remove(cached + ".tmp")
+    return pd.DataFrame(cols)
+
+def core_matrix(df: pd.DataFrame) -> tuple:
+    """
+    (timestamps, cores, busy) of the per-core rows of a cpu log, busy[core, time] = 100 - %idle and NaN where a core has no sample.
+    """
+    per_core = df[df['cpu'] >= 0]
+    times, t_idx = np.unique(per_core['timestamp'].to_numpy(), return_inverse=True)
+    cores, c_idx = np.unique(per_core['cpu'].to_numpy(), return_inverse=True)
+    busy = np.full((len(cores), len(times)), np.nan, dtype=np.float32)
+    busy[c_idx, t_idx] = 100.0 - per_core['%idle'].to_numpy()
+    return times, cores, busy
+
+def read_sadf_log(file: str, columns=None) -> pd.DataFrame:
+    """
+    Any other `sadf -d -U` report (dev_*.log, etcp_*.log, ...) with the column names of its '# hostname;...' header,
+    only `columns` if given. Numeric columns come out as float64, IFACE and the like stay strings.
+    """
+    with open(file, 'r') as fin:
+        header = fin.readline()
+    if not header.startswith('#'):
+        raise ValueError(f"{file} has no sadf header")
+    names = [c.strip() for c in header.lstrip('#').strip().split(';')]
+    df = pd.read_csv(file, sep=';', comment='#', header=None, names=names, engine='c',
+                     usecols=None if columns is None else [c for c in names if c in set(columns)])
+    # LINUX-RESTART records and repeated headers leave a column as strings, the C parser types the clean ones itself
+    for c in df.columns:
+        if c not in ('hostname', 'IFACE') and not pd.api.types.is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors='coerce')
+    return df
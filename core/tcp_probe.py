@@ -0,0 +1,112 @@
+import os, re, sys, signal, glob
+from multiprocessing import get_context
+from time import monotonic
+import pandas as pd
+from core.utils import *
+from core.samples import SampleWriter, read_samples
+
+# Per-ACK congestion control tracing through the tcp:tcp_probe tracepoint. Every emulation gets its own tracefs instance
+# (own ring buffer, own filter) with trace_clock=mono, so event times are on the same CLOCK_MONOTONIC as the experiment epoch.
+# A reader process turns trace_pipe into one SampleWriter file per flow, parse_tcp_probe gives them the parse_ss_to_csv columns.
+
+TRACEFS_PATHS = ['/sys/kernel/tracing', '/sys/kernel/debug/tracing']
+
+PROBE_FIELDS = ['time', 'data_len', 'snd_nxt', 'snd_una', 'snd_cwnd', 'ssthresh', 'snd_wnd', 'srtt', 'rcv_wnd']
+
+_PROBE_RE = re.compile(r'\s(\d+\.\d+): tcp_probe: family=AF_INET6? src=\[?([\w.:]+?)\]?:(\d+) dest=\[?([\w.:]+?)\]?:(\d+) mark=\w+ data_len=(\d+) '
+                       r'snd_nxt=(0x[\da-f]+|0) snd_una=(0x[\da-f]+|0) snd_cwnd=(\d+) ssthresh=(\d+) snd_wnd=(\d+) srtt=(\d+) rcv_wnd=(\d+)')
+
+def tracefs() -> str:
+    for path in TRACEFS_PATHS:
+        if os.path.exists(f"{path}/instances"):
+            return path
+    raise FileNotFoundError("tracefs is not mounted, try `mount -t tracefs nodev /sys/kernel/tracing`")
+
+def _write(path: str, value: str) -> None:
+    with open(path, 'w') as f:
+        f.write(value)
+
+def _read_trace_pipe(pipe: str, path: str, start: float) -> None:
+    """
+    Body of the reader process, appends every event to `{path}/{src}_{sport}-{dst}_{dport}.bin` with time relative to `start`.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    writers = {}
+    try:
+        with open(pipe, 'r') as fin:
+            for line in fin:
+                m = _PROBE_RE.search(line)
+                if not m:
+                    continue
+                flow = m.group(2, 3, 4, 5)
+                if flow not in writers:
+                    writers[flow] = SampleWriter(f"{path}/{flow[0]}_{flow[1]}-{flow[2]}_{flow[3]}.bin", PROBE_FIELDS, "dqqqqqqqq")
+                writers[flow].write(float(m.group(1)) - start, int(m.group(6)), int(m.group(7), 16), int(m.group(8), 16),
+                                    *(int(x) for x in m.group(9, 10, 11, 12, 13)))
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+class TcpProbeTracer:
+    """
+    Records tcp:tcp_probe events of sockets with a source port in `sports` into `{path}/tcp_probe`.
+    The tracepoint is global, so flows are told apart by their addresses and ports, not by namespace.
+    `start` is the monotonic experiment epoch.
+    """
+    def __init__(self, path: str, sports=(11111,), start=None, buffer_size_kb=16384):
+        self.path = f"{path}/tcp_probe"
+        self.sports = list(sports)
+        self.start = monotonic() if start is None else start
+        self.instance = f"{tracefs()}/instances/mn_{os.getpid()}_{id(self)}"
+        self.buffer_size_kb = buffer_size_kb
+        self.process = None
+
+    def start_tracing(self) -> None:
+        mkdirp(self.path)
+        if not os.path.exists(self.instance):
+            os.mkdir(self.instance)
+        _write(f"{self.instance}/trace_clock", "mono")
+        _write(f"{self.instance}/buffer_size_kb", str(self.buffer_size_kb))
+        if self.sports:
+            _write(f"{self.instance}/events/tcp/tcp_probe/filter", " || ".join(f"sport == {port}" for port in self.sports))
+        # from a forkserver: Emulation.run() starts the tracer on the worker threads of the threaded drivers, forking them is not safe.
+        # Events before the reader opens trace_pipe wait in the instance's ring buffer
+        self.process = get_context('forkserver').Process(target=_read_trace_pipe, args=(f"{self.instance}/trace_pipe", self.path, self.start), daemon=True)
+        self.process.start()
+        _write(f"{self.instance}/events/tcp/tcp_probe/enable", "1")
+
+    def stop_tracing(self) -> None:
+        if self.process is None:
+            return
+        _write(f"{self.instance}/events/tcp/tcp_probe/enable", "0")
+        self.process.terminate()
+        self.process.join()
+        self.process = None
+        try:
+            os.rmdir(self.instance)
+        except OSError as e:
+            printC(f"Could not remove tracefs instance {self.instance}: {e}", "red", ERRO)
+
+def parse_tcp_probe(in_path: str) -> pd.DataFrame:
+    """
+    One flow's tcp_probe samples with the parse_ss_to_csv column names: time, addresses, cwnd, ssthresh, rtt in ms,
+    plus the raw sequence numbers and windows. One row per ACK (or received segment) of the flow.
+    """
+    name = os.path.basename(in_path)[:-len(".bin")]
+    (local_ip, local_port), (remote_ip, remote_port) = (side.rsplit('_', 1) for side in name.split('-'))
+    df = read_samples(in_path)
+    out = pd.DataFrame({'time': df['time'], 'state': 'ESTAB', 'local_ip': local_ip, 'local_port': int(local_port),
+                        'remote_ip': remote_ip, 'remote_port': int(remote_port), 'cwnd': df['snd_cwnd'],
+                        'ssthresh': df['ssthresh'].where(df['ssthresh'] < 0x7FFFFFFF), 'rtt': df['srtt'] / 1000,
+                        'bytes_in_flight': (df['snd_nxt'] - df['snd_una']) % 2**32, 'snd_nxt': df['snd_nxt'],
+                        'snd_una': df['snd_una'], 'snd_wnd': df['snd_wnd'], 'rcv_wnd': df['rcv_wnd'], 'data_len': df['data_len']})
+    return out
+
+def parse_tcp_probe_dir(path: str, local_ip: str) -> pd.DataFrame:
+    """
+    All flows of `{path}/tcp_probe` sent from `local_ip`, concatenated in time order.
+    """
+    files = sorted(glob.glob(f"{path}/tcp_probe/{local_ip}_*.bin"))
+    if not files:
+        return pd.DataFrame()
+    return pd.concat([parse_tcp_probe(f) for f in files]).sort_values('time', kind='stable').reset_index(drop=True)
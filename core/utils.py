@@ -1,8 +1,13 @@
-import sys,os, pwd, grp, re
+import sys,os, pwd, grp, re, time, io, gzip, shutil
 import subprocess
 from collections import namedtuple
 from core.config import *
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 NetworkConf = namedtuple("NetworkConf", ['node1', 'node2', 'bw', 'delay', 'qsize', 'bidir', 'aqm', 'loss' ])
 TrafficConf = namedtuple("TrafficConf", ['source', 'dest', 'start', 'duration', 'protocol', 'params'])
@@ -65,6 +70,116 @@ def to_bytes(value: str) -> int:
     mul = {'': 1, 'b': 1, 'kb': 1_000, 'mb': 1_000_000, 'gb': 1_000_000_000, }
     return n * mul.get(suffix, 1)
 
+def new_epoch() -> dict:
+    """
+    Zero of an experiment's time axis, read from both clocks at the same instant. Our own samplers stamp with CLOCK_MONOTONIC
+    and subtract 'monotonic', collectors stamped with wall clock time (ss | ts, sadf) subtract 'realtime'.
+    """
+    return {'realtime': time.time(), 'monotonic': time.monotonic()}
+
+RAW_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+# command line compressors the ss scripts pipe through (SS_COMPRESS)
+RAW_COMPRESSORS = {'gzip': 'gzip -{level}', 'zstd': 'zstd -q -{level}'}
+
+def raw_path(path: str, compression=RAW_COMPRESSION) -> str:
+    """
+    Name a raw collector output `path` ends up with, the compressor's suffix is appended when raw output is compressed.
+    """
+    return path + RAW_SUFFIXES.get(compression, '')
+
+def find_raw(path: str):
+    """
+    Existing file for raw output `path`: itself, or its .gz/.zst form. None if there is none.
+    """
+    for candidate in [path] + [path + suffix for suffix in RAW_SUFFIXES.values()]:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def find_archive(path: str):
+    """
+    Compressed form (.gz/.zst) of raw output `path` if there is one, whether or not the plain file exists too.
+    """
+    for suffix in RAW_SUFFIXES.values():
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return None
+
+def remove_raw(path: str) -> None:
+    found = find_raw(path)
+    if found:
+        remove(found)
+
+def compress_raw(path: str, compression=ARCHIVE_COMPRESSION, level=RAW_COMPRESSION_LEVEL) -> str:
+    """
+    Compress the plain raw output `path` into raw_path(path, compression) and remove the plain file. Returns the file
+    that holds the output now, outputs that are already compressed (or everything, with `compression` None) are left alone.
+    Only for outputs whose collector has stopped. An existing archive is never overwritten: a plain file next to one is what
+    was written after it, and is appended to it (gzip members and zstd frames concatenate) in the archive's own format.
+    """
+    if compression is None or not os.path.exists(path):
+        return find_raw(path)
+    archive = find_archive(path)
+    if archive is not None:
+        compression = next(name for name, suffix in RAW_SUFFIXES.items() if archive == path + suffix)
+    with open(path, 'rb') as fin, open_raw(path, 'ab' if archive else 'wb', compression, level) as fout:
+        shutil.copyfileobj(fin, fout, 1 << 20)
+    remove(path)
+    return raw_path(path, compression)
+
+class _Truncated(io.RawIOBase):
+    """
+    Ends a decompressing stream quietly at a truncated tail (collector killed mid-member) instead of raising EOFError.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        try:
+            data = self.stream.read(len(b))
+        except EOFError:
+            return 0
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        self.stream.close()
+        super().close()
+
+def open_raw(path: str, mode='rt', compression=RAW_COMPRESSION, level=RAW_COMPRESSION_LEVEL, **kwargs):
+    """
+    open() for raw collector output. Reading finds `path` or its compressed form (find_raw) and stream-decompresses
+    by suffix. Writing compresses with `compression` into raw_path(path). Extra kwargs (encoding, errors) go to the text layer.
+    """
+    if 'r' in mode:
+        found = find_raw(path)
+        if found is None:
+            raise FileNotFoundError(path)
+        if found.endswith('.gz'):
+            stream = gzip.open(found, 'rb')
+        elif found.endswith('.zst'):
+            if zstandard is None:
+                raise ImportError("zstandard is required to read .zst files")
+            stream = zstandard.ZstdDecompressor().stream_reader(open(found, 'rb'), read_across_frames=True, closefd=True)
+        else:
+            return open(found, mode, **kwargs)
+        stream = io.BufferedReader(_Truncated(stream))
+    else:
+        path = raw_path(path, compression)
+        binary = ('a' if 'a' in mode else 'w') + 'b'
+        if compression == 'gzip':
+            stream = gzip.open(path, binary, compresslevel=level)
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise ImportError("zstandard is required to write .zst files")
+            stream = zstandard.open(path, binary, cctx=zstandard.ZstdCompressor(level=level))
+        else:
+            return open(path, mode, **kwargs)
+    return stream if 'b' in mode else io.TextIOWrapper(stream, **kwargs)
+
 def dump_system_config(path: str) -> None:
     with open(f'{path}/sysctl.txt', 'w') as fout:
         fout.write(subprocess.check_output(['sysctl', 'net.core.netdev_max_backlog']) + '\n')
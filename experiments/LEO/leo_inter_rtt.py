@@ -108,6 +108,8 @@ if __name__ == '__main__':
                         jobs.append((protocol, bw, delay, qmult, run))
     random.shuffle(jobs)
     printC(f"Total jobs: {len(jobs)}", "green", INFO)
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(_worker, *job) for job in jobs]
         for fut in as_completed(futures):
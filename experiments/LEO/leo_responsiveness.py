@@ -70,6 +70,7 @@ def run_emulation(protocol: str, params: dict, bw: int, delay: int, qmult:int, r
     em.configure_network()
     em.configure_traffic()
     em.set_monitors([f"s1{params['ex_idx']}-eth1", f"s2{params['ex_idx']}-eth2"])
+    em.set_adaptive_sampling()
     em.run()
 
     em.dump_info()
@@ -101,6 +102,8 @@ if __name__ == '__main__':
             for run in RUNS:
                 jobs.append( (protocol, bw, DELAYS[0], QMULTS[0], run) )
 
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(run_worker, *job) for job in jobs]
         for fut in as_completed(futures):
@@ -83,6 +83,7 @@ def run_emulation(topology, protocol, params, bw, delay, qmult, tcp_buffer_mult=
 
         
     em.set_monitors(monitors)
+    em.set_adaptive_sampling()
     em.run()
     em.dump_info()
     net.stop()
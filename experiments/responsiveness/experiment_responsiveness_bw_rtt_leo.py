@@ -81,6 +81,7 @@ def run_emulation(topology, protocol, params, bw, delay, qmult, tcp_buffer_mult=
     monitors = ['s1-eth1', 's2-eth2', 'sysstat']
 
     em.set_monitors(monitors)
+    em.set_adaptive_sampling()
     em.run()
     em.dump_info()
     net.stop()
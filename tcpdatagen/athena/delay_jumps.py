@@ -187,6 +187,8 @@ if __name__ == '__main__':
                     for i, run in enumerate(RUNS):
                         delay2 = max(1, STEPS[i % len(STEPS)](delay))  # prevent 0
                         jobs.append((protocol, bw, bw, delay, delay2, qmult, run))
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(_worker, *job) for job in jobs]
 
@@ -120,6 +120,8 @@ if __name__ == '__main__':
                         bw2 = max(1, STEPS[i % len(STEPS)](bw))  # prevent 0
                         jobs.append((protocol, bw, bw2, delay, qmult, run))
 
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(_worker, *job) for job in jobs]
         for fut in as_completed(futures):
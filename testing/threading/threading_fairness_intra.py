@@ -12,6 +12,7 @@ from core.analysis import *
 from core.utils import *
 from core.emulation import *
 from core.config import *
+from core.plot_pool import PlotPool
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
@@ -27,7 +28,8 @@ DELAY_CHANGE = 30
 _run_id_lock = threading.Lock()
 _mn_clean_lock = threading.Lock()
 _run_id_counter = itertools.count(1)
-_print_lock = threading.Lock()
+# renders the plots of processed runs on PLOT_JOBS processes, set up in __main__
+plot_pool = None
 
 
 def next_ex_idx() -> int:
@@ -40,10 +42,7 @@ paths = []
 def process_raw_out(path: str) -> None:
     change_all_user_permissions(path)
     process_raw_outputs(path)
-    change_all_user_permissions(path)
-    with _print_lock:
-        plot_all_mn(path)
-    # plot_all_cpu(path)
+    plot_pool.submit(path)
 
 
 def run_emulation(topology: str, protocol: str, params, bw: int, delay:int, qmult:float, tcp_buffer_mult=3, run=0, aqm='fifo', loss=None, n_flows=2) -> None:
@@ -125,6 +124,8 @@ if __name__ == '__main__':
                     for run in RUNS:
                         jobs_emu.append((protocol, bw, delay, qmult, run))
 
+    # the queue/tcp_info sampler is forked here, not from the emulation threads
+    MonitorService.start()
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(run_worker, *job) for job in jobs_emu]
         for fut in as_completed(futures):
@@ -134,9 +135,11 @@ if __name__ == '__main__':
     for path in paths:
         jobs_proc.append((path,))
 
+    plot_pool = PlotPool(PLOT_JOBS, plots=('mn',))
     with ThreadPoolExecutor(max_workers=MAX_JOBS) as ex:
         futures = [ex.submit(process_raw_out, *job) for job in jobs_proc]
         for fut in as_completed(futures):
                 fut.result()
 
     plot_avg_across_runs(paths, out_path=os.path.join(PARENT_DIR, "testing/threading/avg_metrics.pdf"), dt=0.2)
+    plot_pool.close()
@@ -0,0 +1,48 @@
+import os, sys, json, sqlite3, threading
+from contextlib import closing
+import pytest
+
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '..')
+sys.path.append( mymodule_dir )
+import core.catalog as catalog
+from core.catalog import register, find_runs, index_runs, CATALOG_VERSION
+
+INFO = {'topology': 'Dumbell', 'flows': [['c1', 'x1', '10.0.0.1', '10.0.0.2', 0, 10, 'cubic', None]],
+        'network': [{'node1': 's2', 'node2': 's3', 'bw': 100, 'delay': 10, 'qsize': 150000, 'aqm': 'fifo', 'loss': None}]}
+
+def make_run(root, name: str) -> str:
+    path = f"{root}/{name}/run1"
+    os.makedirs(path)
+    with open(f"{path}/emulation_info.json", 'w') as fout:
+        json.dump(INFO, fout)
+    return path
+
+def test_concurrent_first_connections_keep_every_run(tmp_path):
+    # the threads of a driver all open the new catalog at once, none may drop the table another already wrote to
+    db = str(tmp_path / "catalog.db")
+    paths = [make_run(tmp_path / "runs", f"exp{i}") for i in range(16)]
+    barrier = threading.Barrier(len(paths))
+    def worker(path):
+        barrier.wait()
+        register(path, info=INFO, db=db)
+    threads = [threading.Thread(target=worker, args=(path,)) for path in paths]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(find_runs(db=db)['path']) == sorted(os.path.abspath(p) for p in paths)
+
+def test_newer_catalog_is_not_dropped(tmp_path):
+    db = str(tmp_path / "catalog.db")
+    register(make_run(tmp_path, "exp"), info=INFO, db=db)
+    with closing(sqlite3.connect(db)) as conn:
+        conn.execute(f"PRAGMA user_version = {CATALOG_VERSION + 1}")
+    assert len(find_runs(db=db)) == 1
+
+def test_no_catalog_is_a_clear_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, 'CATALOG', None)
+    with pytest.raises(ValueError, match="CATALOG"):
+        find_runs(str(tmp_path))
+    with pytest.raises(ValueError, match="CATALOG"):
+        index_runs(str(tmp_path))
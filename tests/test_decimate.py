@@ -0,0 +1,35 @@
+import os, sys
+import numpy as np
+
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '..')
+sys.path.append( mymodule_dir )
+from core.decimate import decimate
+
+def series_with_gap(n: int) -> tuple:
+    # a flow that stops for the middle third of the run
+    x = np.arange(n) * 0.01
+    y = np.sin(x) + 2
+    y[n // 3: 2 * n // 3] = np.nan
+    return x, y
+
+def test_short_series_is_left_as_it_is():
+    x, y = series_with_gap(300)
+    dx, dy = decimate(x, y, 200)
+    assert np.array_equal(dx, x) and np.array_equal(dy, y, equal_nan=True)
+
+def test_gap_survives_decimation():
+    x, y = series_with_gap(30000)
+    for method in ('minmax', 'lttb'):
+        dx, dy = decimate(x, y, 100, method)
+        assert len(dx) < 1000
+        gaps = np.flatnonzero(np.isnan(dy))
+        assert len(gaps) == 1
+        # no line across the gap: the points around the NaN are its two edges
+        assert dx[gaps[0] - 1] < x[10000] and dx[gaps[0] + 1] >= x[20000]
+        assert np.all(np.diff(dx) >= 0)
+
+def test_series_without_gaps_has_no_nan():
+    x = np.arange(30000) * 0.01
+    dx, dy = decimate(x, np.cos(x), 100)
+    assert np.isfinite(dy).all() and dx[0] == x[0] and dx[-1] == x[-1]
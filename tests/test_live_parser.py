@@ -0,0 +1,110 @@
+import os, sys, threading, time
+import pandas as pd
+
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '..')
+sys.path.append( mymodule_dir )
+from core.utils import *
+from core.flow_parsers import FlowParser, register, parse_flows
+from core.live_parser import LiveParser
+from core.manifest import Manifest
+
+SS_LINE = ("{t:.6f},0.01, ESTAB 0      0      10.0.0.1:11111 10.0.0.2:5201 cubic wscale:9,9 rto:204 rtt:{rtt:.3f}/1.000 "
+           "mss:1448 cwnd:{cwnd} bytes_sent:{sent} bytes_acked:{sent} delivery_rate 10000000bps minrtt:20.000\n")
+
+@register
+class ToyParser(FlowParser):
+    # both ends write `time,bandwidth` csv text, the sender also has an ss script file
+    protocols = ('toycc',)
+    sender_ss = True
+
+    def read_output(self, file: str, start_time: float, epoch=None) -> pd.DataFrame:
+        with open_raw(file) as fin:
+            return pd.read_csv(fin)
+
+FLOW = ['c1', 'x1', '10.0.0.1', '10.0.0.2', 0, 10, 'toycc', None]
+
+def ss_lines(start: int, n: int) -> str:
+    return "".join(SS_LINE.format(t=1700000000 + i * 0.01, rtt=20 + i % 7, cwnd=10 + i, sent=1448 * i) for i in range(start, start + n))
+
+def appender(path: str, stop: threading.Event, written: list) -> None:
+    # the ss script: `ss ... >> "$2"` every few ms until the run is stopped
+    i = written[0]
+    while not stop.is_set():
+        with open(path, 'a') as fout:
+            fout.write(ss_lines(i, 5))
+        i += 5
+        written[0] = i
+        time.sleep(0.005)
+
+def test_live_parse_leaves_growing_ss_file_and_reprocess_archives_it(tmp_path):
+    path = str(tmp_path)
+    for node in ('c1', 'x1'):
+        with open(f"{path}/{node}_output.txt", 'w') as fout:
+            fout.write("time,bandwidth\n" + "".join(f"{t},{10 + t}\n" for t in range(10)))
+    ss_file = f"{path}/c1_ss.csv"
+    with open(ss_file, 'w') as fout:
+        fout.write(ss_lines(0, 100))
+
+    stop, written = threading.Event(), [100]
+    writer = threading.Thread(target=appender, args=(ss_file, stop, written))
+    writer.start()
+    try:
+        live = LiveParser(path, [FLOW], poll_sec=0.01)
+        live.start()
+        time.sleep(0.1)
+        live.node_finished('c1', {})
+        live.node_finished('x1', {})
+        assert live.stop() == ['c1']
+        time.sleep(0.05)
+    finally:
+        stop.set()
+        writer.join()
+
+    # parsed live from what was there, nothing archived under the running script
+    assert os.path.exists(f"{path}/csvs/c1_ss.csv")
+    assert find_archive(ss_file) is None and find_archive(f"{path}/c1_output.txt") is None
+    live_rows = len(pd.read_csv(f"{path}/csvs/c1_ss.csv"))
+    assert 100 <= live_rows < written[0]
+
+    # the collectors have stopped: the grown ss file is parsed again, then every text output is archived
+    assert parse_flows(path, [FLOW], {}, workers=1) == ['c1']
+    assert not os.path.exists(ss_file)
+    assert find_raw(ss_file) == ss_file + '.gz'
+    with open_raw(ss_file) as fin:
+        assert fin.read() == ss_lines(0, written[0])
+    assert len(pd.read_csv(f"{path}/csvs/c1_ss.csv")) == written[0]
+    entry = Manifest(path).get('c1')
+    assert entry['inputs']['c1_ss.csv']['file'] == 'c1_ss.csv.gz'
+
+    # up to date now, and the archive stays as it is
+    size = os.path.getsize(ss_file + '.gz')
+    assert parse_flows(path, [FLOW], {}, workers=1) == []
+    assert os.path.getsize(ss_file + '.gz') == size
+
+def test_compress_raw_appends_to_an_existing_archive(tmp_path):
+    raw = f"{tmp_path}/c1_ss.csv"
+    with open(raw, 'w') as fout:
+        fout.write(ss_lines(0, 50))
+    assert compress_raw(raw) == raw + '.gz'
+    # written after the archive, e.g. by a collector that was still running
+    with open(raw, 'w') as fout:
+        fout.write(ss_lines(50, 3))
+    assert compress_raw(raw) == raw + '.gz'
+    assert not os.path.exists(raw)
+    with open_raw(raw) as fin:
+        assert fin.read() == ss_lines(0, 53)
+
+def test_parse_flows_workers_know_the_registered_parsers(tmp_path):
+    # the pool's processes come from a forkserver, ToyParser has to be registered there too
+    path = str(tmp_path)
+    flows = [[f'c{i}', f'x{i}', '10.0.0.1', '10.0.0.2', 0, 10, 'toycc', None] for i in (1, 2)]
+    os.makedirs(f"{path}/csvs")
+    for flow in flows:
+        for node in flow[:2]:
+            with open(f"{path}/{node}_output.txt", 'w') as fout:
+                fout.write("time,bandwidth\n" + "".join(f"{t},{10 + t}\n" for t in range(10)))
+        with open(f"{path}/{flow[0]}_ss.csv", 'w') as fout:
+            fout.write(ss_lines(0, 20))
+    assert sorted(parse_flows(path, flows, {}, workers=2)) == ['c1', 'c2']
+    assert len(pd.read_csv(f"{path}/csvs/c2_ss.csv")) == 20
@@ -0,0 +1,55 @@
+import os, sys, gzip
+import numpy as np
+
+script_dir = os.path.dirname( __file__ )
+mymodule_dir = os.path.join( script_dir, '..')
+sys.path.append( mymodule_dir )
+from core.parsers import parse_genericcc_output
+from core.ss_parser import parse_ss_columns
+
+def genericcc_log(n: int, eol: str) -> str:
+    # Copa's csv with stderr lines in between, as the sender writes it
+    lines = ["Sender starting", "time,rate,cwnd,rtt"]
+    for i in range(n):
+        lines.append(f"{i * 0.01:.2f},{10 + i},{20 + i},{0.03 + i * 1e-4:.4f}")
+        if i % 7 == 3:
+            lines.append("Warning: no ack received")
+    return eol.join(lines) + eol
+
+def test_genericcc_crlf_rows_parse_like_lf(tmp_path):
+    lf, crlf = tmp_path / "lf.txt", tmp_path / "crlf.txt"
+    lf.write_bytes(genericcc_log(50, "\n").encode())
+    crlf.write_bytes(genericcc_log(50, "\r\n").encode())
+    expected = parse_genericcc_output(str(lf), 5.0)
+    df = parse_genericcc_output(str(crlf), 5.0)
+    assert list(df.columns) == ['time', 'rate', 'cwnd', 'rtt']
+    assert len(df) == 50
+    assert df.equals(expected)
+    assert np.isclose(df['time'].iloc[0], 5.0)
+
+def test_genericcc_blocks_match_a_single_pass(tmp_path):
+    # compressed pty capture (\r\n) read in blocks far smaller than the file
+    path = tmp_path / "copa.txt.gz"
+    with gzip.open(path, 'wb') as fout:
+        fout.write(genericcc_log(1000, "\r\n").encode())
+    whole = parse_genericcc_output(str(tmp_path / "copa.txt"))
+    blocks = parse_genericcc_output(str(tmp_path / "copa.txt"), chunk_chars=256)
+    assert len(whole) == 1000
+    assert blocks.equals(whole)
+
+SS_LINE = ("{t:.6f},0.01, ESTAB 0      0      10.0.0.1:11111 10.0.0.2:5201 cubic wscale:9,9 rto:204 rtt:{rtt:.3f}/1.000 "
+           "mss:1448 cwnd:{cwnd} bytes_sent:{sent} bytes_acked:{sent} delivery_rate 10000000bps minrtt:20.000\n")
+
+def test_ss_columns_on_worker_processes_match_in_process(tmp_path):
+    # plain and compressed files split over forkserver workers
+    text = "".join(SS_LINE.format(t=1700000000 + i * 0.01, rtt=20 + i % 7, cwnd=10 + i, sent=1448 * i) for i in range(2000))
+    plain = tmp_path / "c1_ss.csv"
+    plain.write_text(text)
+    with gzip.open(tmp_path / "c2_ss.csv.gz", 'wt') as fout:
+        fout.write(text)
+    expected = parse_ss_columns(str(plain), workers=1)
+    for path in (plain, tmp_path / "c2_ss.csv"):
+        cols = parse_ss_columns(str(path), workers=2, chunk_bytes=32 << 10)
+        assert len(cols['time']) == 2000
+        for column, values in expected.items():
+            np.testing.assert_array_equal(cols[column], values)